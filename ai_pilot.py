@@ -1,15 +1,39 @@
 import cv2
+import os
+import importlib.util
 import time
 import threading
+import atexit
+import functools
 import numpy as np
-from ultralytics import YOLO
 from backend import DroneBackend
+from clock import get_clock
+from frame_grabber import FrameGrabber
+from detectors import create_detector, NCNN_MODEL_DIR, NCNN_INT8_MODEL_DIR
+from vision_pipeline import VisionPipeline
+from inference_server import InferenceServer
+from tracker import Tracker, TRACKED, LOW_CONF as TRACK_LOW_CONF
+from tiling import TiledDetector, MODE_ROI
+from frame_scheduler import FrameScheduler
+from geotag_index import GeotagIndex
+from geotag_db import GeotagDB
 
 # --- CONFIGURATION ---
-MODEL_PATH = "yolov8n.pt"  # Assumes model is in the same directory
+DETECTOR_BACKEND = "ncnn"  # "ncnn" (no torch, fast on the RPi) | "onnx" | "opencv" | "ultralytics"
+MODEL_PATH = "yolov8n.pt"  # Assumes model is in the same directory (ultralytics backend)
+FALLBACK_BACKEND = "ultralytics" # used when the ncnn runtime or model.ncnn.bin is missing (weights are not in the repo)
+DETECTOR_THREADS = 4       # ncnn / onnx / opencv; pick with bench_detectors.py per machine
+NCNN_INT8 = False          # ncnn: fly the INT8 model built (and recall-gated) by quantize_ncnn.py
+SHARED_INFERENCE = True    # one model + batching server for every drone in this process
 CONFIDENCE_THRESHOLD = 0.5
 TARGET_CLASS_ID = 0  # 0 is usually 'person' in COCO
 
+# TRACKING
+USE_TRACKER = True         # stable target IDs (tracker.py); detector fed low-score boxes too
+DETECT_EVERY = 3           # while a target is tracked, run the detector on every Nth frame only
+TARGET_COAST_S = 0.5       # s the locked track is still steered on after its last detection
+TILED_INFERENCE = True     # magnified crop around the locked target, tiles for large frames (tiling.py)
+
 # STREAMING CONFIG
 USE_REMOTE_STREAM = True
 RPI_IP = "172.25.137.84"
@@ -27,6 +51,11 @@ CENTER_X = FRAME_WIDTH // 2
 CENTER_Y = FRAME_HEIGHT // 2
 DEADZONE_PIXELS = 30   # Reduced for lower resolution
 LOCK_DURATION = 1.0    # Seconds to hold lock before geotagging
+GEOTAG_HOVER_S = 1.0   # s hovering over a fresh tag before the mission resumes (frames keep flowing)
+MAX_FRAME_AGE = 0.5    # s, older frames are shown but not acted on (stream stalled)
+CONTROL_DEADLINE = 0.100   # s capture -> command budget the frame scheduler holds
+ADAPTIVE_SCHEDULER = True  # skip late frames, lower detector input size under CPU load (frame_scheduler.py)
+STATS_LOG_INTERVAL = 10.0  # s between pipeline stage timing logs
 
 # PID GAINS (Simple P-Controller for now)
 YAW_KP = 0.002       # Rotational speed per pixel error
@@ -50,126 +79,344 @@ MAX_YAW_RATE = 20.0  # deg/s (Need to convert to rad/s or use raw if backend han
 ENABLE_YAW_CONTROL = False # Set True if we implement yaw rate in backend
 LATERAL_KP = 0.005 # m/s per pixel error
 
+# Readiness states (AIPilot.status)
+STATUS_IDLE = "IDLE"
+STATUS_LOADING = "LOADING"        # model load (+ stream connect in parallel)
+STATUS_WARMING = "WARMING"        # first inferences on a blank frame
+STATUS_CONNECTING = "CONNECTING"  # model ready, waiting for the stream
+STATUS_READY = "READY"
+STATUS_ERROR = "ERROR"
+
+_server = None
+_server_lock = threading.Lock()
+_geotag_db = None
+_geotag_db_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None) # decided (and warned about) once per process
+def pilot_backend():
+    """DETECTOR_BACKEND, or FALLBACK_BACKEND when the NCNN backend cannot load here"""
+    if DETECTOR_BACKEND != "ncnn":
+        return DETECTOR_BACKEND
+    weights = os.path.join(NCNN_INT8_MODEL_DIR if NCNN_INT8 else NCNN_MODEL_DIR, "model.ncnn.bin")
+    if importlib.util.find_spec("ncnn") is None:
+        print(f"[AI Pilot] ⚠️ ncnn not installed, falling back to {FALLBACK_BACKEND}")
+    elif not os.path.exists(weights):
+        print(f"[AI Pilot] ⚠️ NCNN weights not found ({weights}), falling back to {FALLBACK_BACKEND}")
+    else:
+        return "ncnn"
+    return FALLBACK_BACKEND
+
+def create_pilot_detector():
+    backend = pilot_backend()
+    options = {'model_path': MODEL_PATH} if backend == "ultralytics" else {'threads': DETECTOR_THREADS}
+    if backend == "ncnn" and NCNN_INT8:
+        options['model_dir'] = NCNN_INT8_MODEL_DIR
+    conf = TRACK_LOW_CONF if USE_TRACKER else CONFIDENCE_THRESHOLD # tracker re-thresholds (ByteTrack 2nd pass)
+    return create_detector(backend, conf=conf, classes=[TARGET_CLASS_ID], **options)
+
+def shared_inference_server(on_warmup=None):
+    """The process-wide InferenceServer, model loaded on first use. on_warmup(): called before its warm-up"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            server = InferenceServer(create_pilot_detector())
+            if on_warmup:
+                on_warmup()
+            server.detector.warmup((FRAME_HEIGHT, FRAME_WIDTH, 3)) # first real frame skips allocation / JIT cost
+            server.start()
+            _server = server
+        return _server
+
+def shared_geotag_db():
+    """The process-wide GeotagDB (geotags.db + evidence/), opened on first use"""
+    global _geotag_db
+    with _geotag_db_lock:
+        if _geotag_db is None:
+            _geotag_db = GeotagDB()
+            atexit.register(_geotag_db.close) # queued rows and frames reach the disk
+        return _geotag_db
+
 class AIPilot:
-    def __init__(self, backend, mission_mgr=None, callback_frame=None, callback_geotag=None):
+    def __init__(self, backend, mission_mgr=None, callback_frame=None, callback_geotag=None, clock=None, callback_status=None,
+                 geotags=None, geotag_db=None):
         self.backend = backend
         self.mission_mgr = mission_mgr
+        self.clock = clock or get_clock() # time()/sleep() source (see clock.py)
         self.running = False
-        self.thread = None
         self.enabled = False # Toggle from GUI
         
         # Callbacks
         self.callback_frame = callback_frame
         self.callback_geotag = callback_geotag
+        self.callback_status = callback_status # (status, detail), called from worker threads
+        
+        # Readiness (start() is asynchronous)
+        self.status = STATUS_IDLE
+        self.status_detail = ""
+        self.start_requested = None
+        self.first_result_s = None  # s from start() to the first processed frame
         
         # Vision State
-        self.cap = None
+        self.grabber = None
         self.model = None
+        self.pipeline = None
+        self.last_stats_log = 0
         self.latest_frame = None
+        self.frame_age = None  # s between capture and the end of inference, last frame
+        self.tracker = Tracker(classes=[TARGET_CLASS_ID]) if USE_TRACKER else None
+        self.target_track_id = None # track the state machine is locked onto
+        self.tagged_tracks = set()  # already geotagged, not picked again
+        self.last_tracks = []
+        self.target_conf = 0.0      # detector score of the current target
         
         # Logic State
-        self.state = "SEARCH" # SEARCH, TRACK, LOCK, GEOTAG
+        self.state = "SEARCH" # SEARCH, TRACK, LOCK, GEOTAG, HOVER
         self.target_locked_time = 0
         self.last_detection_time = 0
         self.resume_mode = None # To store 'AUTO' if we interrupt it
         
         # Output
         self.geotagged_locations = []
+        self.geotags = geotags if geotags is not None else GeotagIndex() # share one across the fleet to dedup between drones
+        self.last_known_tag = None  # tag the current sighting was merged into (not re-engaged)
+        self.geotag_db = geotag_db  # GeotagDB, shared_geotag_db() at start() when not given
+        self.hover_until = 0
+
+    def _set_status(self, status, detail=""):
+        self.status = status
+        self.status_detail = detail
+        if self.callback_status:
+            try:
+                self.callback_status(status, detail)
+            except Exception as e:
+                print(f"[AI Pilot] Status callback error: {e}")
+
+    def is_ready(self):
+        return self.status == STATUS_READY
 
     def start(self):
+        """Returns at once; model load, warm-up and stream connection run on a worker"""
+        if self.status in (STATUS_LOADING, STATUS_WARMING, STATUS_CONNECTING):
+            self.running = True # stop() + start() during startup: just keep going
+            return
         if self.running: return
-        
-        print("[AI Pilot] Loading YOLO Model...")
-        self.model = YOLO(MODEL_PATH)
-        
-        print("[AI Pilot] Opening Camera...")
-        
-        source = STREAM_URL if USE_REMOTE_STREAM else 0
-        print(f"[AI Pilot] Opening Camera Source: {source}...")
-        
-        self.cap = cv2.VideoCapture(source)
-        if not self.cap.isOpened():
-             print(f"FAILED TO OPEN CAMERA: {source}")
-             # self.cap = cv2.VideoCapture(0) # Fallback?
-        else:
-             # Some remote streams don't support setting props successfully, but we try
-             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-        
         self.running = True
-        self.thread = threading.Thread(target=self._loop, daemon=True)
-        self.thread.start()
-        print("[AI Pilot] Started.")
+        self.start_requested = time.perf_counter()
+        self.first_result_s = None
+        self._set_status(STATUS_LOADING, pilot_backend())
+        threading.Thread(target=self._startup, daemon=True, name="ai-startup").start()
 
-    def stop(self):
-        self.running = False
-        if self.cap:
-            self.cap.release()
+    def _startup(self):
+        t0 = self.start_requested
+        try:
+            source = STREAM_URL if USE_REMOTE_STREAM else 0
+            print(f"[AI Pilot] Opening Camera Source: {source}...")
             
-    def _loop(self):
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                time.sleep(0.1)
-                continue
-                
-            self.latest_frame = frame
-            
-            # 1. DETECT
-            h, w = frame.shape[:2]
-            center_x = w // 2
-            center_y = h // 2
-            
-            results = self.model.predict(frame, conf=CONFIDENCE_THRESHOLD, verbose=False)
-            detections = results[0].boxes
+            # Capture runs on its own thread; inference always takes the newest frame.
+            # Connecting (seconds on a bad link) overlaps the model load.
+            self.grabber = FrameGrabber(source, FRAME_WIDTH, FRAME_HEIGHT, clock=self.clock)
+            connect = threading.Thread(target=self.grabber.start, daemon=True)
+            connect.start()
+            self._db() # open the geotag database here, not on the first tag
             
-            target = None
-            # Find best target (e.g., closest to center or highest confidence)
-            for box in detections:
-                 cls_id = int(box.cls[0])
-                 if cls_id == TARGET_CLASS_ID:
-                        # Found a human
-                        x1, y1, x2, y2 = box.xyxy[0]
-                        cx = int((x1 + x2) / 2)
-                        cy = int((y1 + y2) / 2)
-                        target = (cx, cy, x1, y1, x2, y2)
-                        break # Take the first high conf one
-            
-            # 2. DECIDE & ACT
-            self._update_state_machine(target, center_x, center_y)
+            if SHARED_INFERENCE:
+                print(f"[AI Pilot] Using shared YOLO model ({pilot_backend()})...")
+                # Loads + warms once per process: a pilot joining a warm server has nothing left to warm
+                server = shared_inference_server(on_warmup=lambda: self._set_status(STATUS_WARMING))
+                if self.status != STATUS_WARMING:
+                    self._set_status(STATUS_WARMING)
+                self.model = server.client(self.backend.log_prefix)
+            else:
+                print(f"[AI Pilot] Loading YOLO Model ({pilot_backend()})...")
+                self.model = create_pilot_detector()
+                self._set_status(STATUS_WARMING)
+                self.model.warmup((FRAME_HEIGHT, FRAME_WIDTH, 3))
+            net = self.model.server.detector if SHARED_INFERENCE else self.model
+            base_size = net.imgsz if net.resizable else None # fixed shapes / predict(): scheduler trades frequency instead
+            if TILED_INFERENCE:
+                self.model = TiledDetector(self.model)
+            t_model = time.perf_counter() - t0
             
-            # 3. VISUALIZE (Optional, for debug view)
-            if target:
-                cx, cy, _, _, _, _ = target
-                cv2.rectangle(frame, (int(target[2]), int(target[3])), (int(target[4]), int(target[5])), (0, 255, 0), 2)
-                cv2.circle(frame, (cx, cy), 5, (0, 0, 255), -1)
+            self._set_status(STATUS_CONNECTING, str(source))
+            connect.join()
+            if not self.running: # stopped while loading
+                self._cleanup()
+                self._set_status(STATUS_IDLE)
+                return
             
-            # Draw Deadzone
-            cv2.rectangle(frame, 
-                          (center_x - DEADZONE_PIXELS, center_y - DEADZONE_PIXELS),
-                          (center_x + DEADZONE_PIXELS, center_y + DEADZONE_PIXELS),
-                          (255, 255, 0), 1)
-                          
-            cv2.putText(frame, f"State: {self.state}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # preprocess / infer / postprocess+control / render each on their own worker
+            scheduler = FrameScheduler(CONTROL_DEADLINE, base_size, adaptive=ADAPTIVE_SCHEDULER, clock=self.clock)
+            self.pipeline = VisionPipeline(self.grabber, self.model, self._on_detections, self._render,
+                                           clock=self.clock, scheduler=scheduler)
+            self.pipeline.start()
+            t_ready = time.perf_counter() - t0
+            self._set_status(STATUS_READY, "" if self.grabber.is_opened() else "no camera yet, retrying")
+            print(f"[AI Pilot] ✅ Ready in {t_ready:.2f}s (model + warm-up {t_model:.2f}s)")
+        except Exception as e:
+            print(f"[AI Pilot] ❌ Start failed: {e}")
+            self.running = False
+            self._cleanup()
+            self._set_status(STATUS_ERROR, str(e))
+
+    def stop(self):
+        self.running = False
+        if self.status == STATUS_READY:
+            self._cleanup()
+            self._set_status(STATUS_IDLE)
+        # still starting up: _startup sees running == False and cleans up itself
+
+    def _cleanup(self):
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
+        if hasattr(self.model, 'close'):
+            self.model.close() # leave the shared server's batch
+        self.model = None
             
-            # CALLBACK OR SHOW
-            if self.callback_frame:
-                # Convert to RGB for Tkinter/PIL usually, but let's pass BGR or convert here
-                # Tkinter usually needs RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                self.callback_frame(frame_rgb)
+    def _pick_target(self, detections):
+        # Best (highest conf) human; rows are sorted, the detector already filtered classes
+        hits = detections[(detections[:, 5] == TARGET_CLASS_ID) & (detections[:, 4] >= CONFIDENCE_THRESHOLD)]
+        if not len(hits):
+            return None
+        x1, y1, x2, y2 = hits[0, :4].tolist()
+        self.target_conf = float(hits[0, 4])
+        return (int((x1 + x2) / 2), int((y1 + y2) / 2), x1, y1, x2, y2)
+
+    def _pick_track(self, tracks, captured, center_x, center_y):
+        """Target from the locked track; in SEARCH, lock the confirmed track nearest the centre"""
+        track = None
+        if self.state != "SEARCH" and self.target_track_id is not None:
+            track = self.tracker.get(self.target_track_id)
+            if track is None: # track died, the state machine's lost timer takes over
+                self.target_track_id = None
+        else:
+            candidates = [t for t in tracks if t.state == TRACKED and t.id not in self.tagged_tracks]
+            if candidates:
+                track = min(candidates, key=lambda t: (t.center[0] - center_x) ** 2 + (t.center[1] - center_y) ** 2)
+            self.target_track_id = track.id if track else None
+        if track is None or captured - track.last_seen > TARGET_COAST_S:
+            return None
+        x1, y1, x2, y2 = track.box.tolist()
+        cx, cy = track.center
+        self.target_conf = track.score
+        return (int(cx), int(cy), x1, y1, x2, y2)
+
+    def _on_detections(self, frame, detections, captured):
+        """Pipeline control stage: runs before any drawing (detections is None on tracker-only frames)"""
+        if self.first_result_s is None:
+            self.first_result_s = time.perf_counter() - self.start_requested
+            print(f"[AI Pilot] ⏱️ Time to first detection: {self.first_result_s:.2f}s after start")
+        self.latest_frame = frame
+        h, w = frame.shape[:2]
+        if self.tracker:
+            if detections is None:
+                self.last_tracks = self.tracker.propagate(frame, captured)
             else:
-                cv2.imshow("AI Pilot Eyes", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                    
-        if not self.callback_frame:
-            cv2.destroyAllWindows()
+                self.last_tracks = self.tracker.update(detections, captured, frame)
+            target = self._pick_track(self.last_tracks, captured, w // 2, h // 2)
+            if hasattr(self.model, 'set_roi'): # look closer at the target, search the whole frame otherwise
+                self.model.set_roi(target[2:] if target else None)
+            # Skip the detector between frames only while there is something to follow
+            self.pipeline.detect_every = DETECT_EVERY if self.target_track_id is not None else 1
+        else:
+            target = self._pick_target(detections)
+        
+        # DECIDE & ACT (on fresh frames only)
+        self.frame_age = self.clock.time() - captured
+        if self.frame_age <= MAX_FRAME_AGE:
+            prev_state = self.state
+            self._update_state_machine(target, w // 2, h // 2, captured)
+            if self.state == "SEARCH" and prev_state != "SEARCH": # geotagged or lost: next target
+                if prev_state == "HOVER" and self.target_track_id is not None:
+                    self.tagged_tracks.add(self.target_track_id)
+                self.target_track_id = None
 
-    def _update_state_machine(self, target, center_x, center_y):
-        current_time = time.time()
+    def _render(self, frame, detections, captured):
+        """Pipeline render stage: annotate and hand the frame to the GUI"""
+        h, w = frame.shape[:2]
+        center_x = w // 2
+        center_y = h // 2
+        frame = frame.copy() # the control stage may still save this frame as evidence
+        
+        # VISUALIZE (Optional, for debug view)
+        if self.tracker:
+            target = None
+            for t in self.last_tracks:
+                x1, y1, x2, y2 = t.box.astype(int).tolist()
+                color = (0, 255, 0) if t.id == self.target_track_id else (0, 165, 255)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2 if t.state == TRACKED else 1)
+                cv2.putText(frame, f"#{t.id}", (x1, max(y1 - 4, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+                if t.id == self.target_track_id:
+                    cx, cy = t.center
+                    cv2.circle(frame, (int(cx), int(cy)), 5, (0, 0, 255), -1)
+            window = getattr(self.model, 'window', None)
+            if window and self.model.mode == MODE_ROI:
+                cv2.rectangle(frame, window[:2], window[2:], (255, 0, 255), 1)
+        else:
+            target = self._pick_target(detections) if detections is not None else None
+        if target:
+            cx, cy, _, _, _, _ = target
+            cv2.rectangle(frame, (int(target[2]), int(target[3])), (int(target[4]), int(target[5])), (0, 255, 0), 2)
+            cv2.circle(frame, (cx, cy), 5, (0, 0, 255), -1)
+        
+        # Draw Deadzone
+        cv2.rectangle(frame, 
+                      (center_x - DEADZONE_PIXELS, center_y - DEADZONE_PIXELS),
+                      (center_x + DEADZONE_PIXELS, center_y + DEADZONE_PIXELS),
+                      (255, 255, 0), 1)
+                      
+        cv2.putText(frame, f"State: {self.state}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        age = self.clock.time() - captured
+        age_color = (0, 255, 0) if age <= MAX_FRAME_AGE else (0, 0, 255)
+        cv2.putText(frame, f"Age: {age * 1000:.0f} ms", (10, h - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, age_color, 1)
+        
+        now = self.clock.time()
+        if now - self.last_stats_log >= STATS_LOG_INTERVAL:
+            self.last_stats_log = now
+            print(f"[AI Pilot] ⏱️ {self.pipeline.format_stats()}")
+        
+        # CALLBACK OR SHOW
+        if self.callback_frame:
+            # Tkinter usually needs RGB
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self.callback_frame(frame_rgb)
+        else:
+            cv2.imshow("AI Pilot Eyes", frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                self.running = False
+                self.pipeline.running = False
+                cv2.destroyAllWindows()
+
+    def _known_target(self, timestamp):
+        """Sighting near an existing geotag: update that tag instead of pausing to tag it again"""
+        tag = self.geotags.observe(self.backend.state['lat'], self.backend.state['lon'], self.target_conf, timestamp)
+        if tag is None:
+            return False
+        if self.target_track_id is not None:
+            self.tagged_tracks.add(self.target_track_id) # don't pick this track again
+            self.target_track_id = None
+        self._db().update(tag)
+        if tag is not self.last_known_tag:
+            print(f"[AI Pilot] 📍 Target near tag #{tag.id} ({tag.sightings} sightings, conf {tag.confidence:.2f}), not re-tagging")
+        self.last_known_tag = tag
+        return True
+
+    def _db(self):
+        if self.geotag_db is None: # start() opens it off the vision thread; this is for direct callers
+            self.geotag_db = shared_geotag_db()
+        return self.geotag_db
+
+    def _update_state_machine(self, target, center_x, center_y, frame_time=None):
+        """frame_time: capture time of the frame the target came from (defaults to now)"""
+        current_time = self.clock.time()
+        seen_time = current_time if frame_time is None else frame_time
         
         if self.state == "SEARCH":
+            if target and self.enabled and self._known_target(seen_time):
+                return # tagged before: confidence updated, mission keeps going
             if target and self.enabled:
                 print("[AI Pilot] Target Detected! Engaging Tracking.")
                 
@@ -180,9 +427,10 @@ class AIPilot:
                 # Ensure GUIDED (Usually already is, but safety check)
                 if self.backend.state['mode'] != "GUIDED":
                     self.backend.set_mode("GUIDED")
-                    time.sleep(0.2)
+                    self.clock.sleep(0.2)
                 
                 self.state = "TRACK"
+                self.last_detection_time = self.clock.time() if frame_time is None else frame_time # Lost-target timer starts at engage
                 
         elif self.state == "TRACK":
             if not target:
@@ -197,7 +445,7 @@ class AIPilot:
                          self.mission_mgr.resume_mission()
                 return
 
-            self.last_detection_time = current_time
+            self.last_detection_time = seen_time
             cx, cy, _, _, _, _ = target
             
             # Calculate Errors
@@ -241,29 +489,33 @@ class AIPilot:
                 self.state = "GEOTAG"
                 
         elif self.state == "GEOTAG":
-            # Perform Geotag
+            # Perform Geotag (nothing here waits for the disk: GeotagDB encodes and writes in the background)
             lat = self.backend.state['lat']
             lon = self.backend.state['lon']
             alt = self.backend.state['alt_rel']
             
-            print(f"!!! GEOTAGGED TARGET !!! At {lat}, {lon}")
-            self.geotagged_locations.append((lat, lon, alt, time.ctime()))
+            tag, new = self.geotags.add(lat, lon, alt, self.target_conf, current_time,
+                                        drone=getattr(self.backend, 'drone_id', None), track=self.target_track_id)
+            if new:
+                print(f"!!! GEOTAGGED TARGET !!! At {lat}, {lon}")
+                self.geotagged_locations.append((lat, lon, alt, time.ctime()))
+                self._db().record(tag, self.latest_frame)
+            else: # someone tagged this spot while we were locking on
+                print(f"[AI Pilot] 📍 Tag #{tag.id} confirmed, {tag.sightings} sightings, conf {tag.confidence:.2f}")
+                self._db().update(tag)
             
             # CALLBACK TO GUI
-            if self.callback_geotag:
+            if self.callback_geotag and new:
                 self.callback_geotag(lat, lon)
             
-            # Save Image
-            if self.latest_frame is not None:
-                filename = f"geotag_{int(current_time)}.jpg"
-                try: # Write image
-                    cv2.imwrite(filename, self.latest_frame)
-                    print(f"Saved evidence: {filename}")
-                except:
-                    pass
+            # Hover a bit, timed on the frames that keep coming
+            self.state = "HOVER"
+            self.hover_until = current_time + GEOTAG_HOVER_S
             
+        elif self.state == "HOVER":
+            if current_time < self.hover_until:
+                return
             print("[AI Pilot] Resume Search/Mission...")
-            time.sleep(1) # Hover a bit
             
             # RESUME MISSION
             if self.mission_mgr:
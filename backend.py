@@ -1,6 +1,6 @@
 import threading
-import time
 from pymavlink import mavutil
+from clock import get_clock
 
 # --- CONFIGURATION ---
 DEFAULT_CONNECTION_STRING = '/dev/ttyACM0'
@@ -25,10 +25,11 @@ class DroneBackend:
     Handles Mavlink communication in a separate thread.
     Manages connection, telemetry, and basic commands.
     """
-    def __init__(self, drone_id=1, connect_str=DEFAULT_CONNECTION_STRING, baud_rate=DEFAULT_BAUD):
+    def __init__(self, drone_id=1, connect_str=DEFAULT_CONNECTION_STRING, baud_rate=DEFAULT_BAUD, clock=None):
         self.drone_id = drone_id
+        self.clock = clock or get_clock() # time()/sleep() source (see clock.py)
         self.last_prearm_poll = 0
-        self.last_attitude_time = time.time() # Track data flow
+        self.last_attitude_time = self.clock.time() # Track data flow
         
         # Log Prefix matching GUI expectation [D0] / [D1]
         self.log_prefix = f"[D{self.drone_id-1}]"
@@ -43,6 +44,7 @@ class DroneBackend:
             'lat': 0, 'lon': 0, 'alt': 0, 'alt_rel': 0, 
             'pitch': 0, 'roll': 0, 'yaw': 0, 'heading': 0,
             'speed': 0, 'climb': 0,
+            'vn': 0, 've': 0, 'vd': 0, # NED ground velocity (m/s)
             'gps_fix': 0, 'gps_sats': 0, 'gps_hdop': 100.0,
             'voltage': 0, 'current': 0, 'battery_remaining': 0,
             'armed': False, 'system_status': 0, 'mode': 'UNKNOWN',
@@ -65,6 +67,24 @@ class DroneBackend:
         self.lock = threading.Lock()
         self.thread = None
 
+        # Telemetry Event Listeners: callback(backend, event)
+        # Events: 'mode', 'armed', 'position', 'attitude', 'connected'
+        self.listeners = []
+
+    def add_listener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _emit(self, event):
+        for cb in list(self.listeners):
+            try:
+                cb(self, event)
+            except Exception as e:
+                print(f"{self.log_prefix} Listener error ({event}): {e}")
 
     def get_state(self):
         """Thread-safe access to state copy"""
@@ -97,6 +117,7 @@ class DroneBackend:
                 self.master.wait_heartbeat(timeout=3)
                 print(f"{self.log_prefix} Heartbeat received from System {self.master.target_system}")
                 self.connected = True
+                self._emit('connected')
                 
                 # Request Data Streams (Modern)
                 self._request_message_interval(mavutil.mavlink.MAVLINK_MSG_ID_GPS_RAW_INT, 1) # 1Hz
@@ -116,12 +137,12 @@ class DroneBackend:
                 
             except Exception as e:
                 print(f"{self.log_prefix} Connection failed: {e}")
-                time.sleep(2)
+                self.clock.sleep(2)
         
         # Main Loop
         while self.running:
             if not self.connected:
-                time.sleep(1)
+                self.clock.sleep(1)
                 continue
                 
             try:
@@ -133,7 +154,7 @@ class DroneBackend:
                 )
 
                 # Poll Pre-Arm Checks (Every 2 seconds approx)
-                current_time = time.time()
+                current_time = self.clock.time()
                 if current_time - self.last_prearm_poll > 2.0:
                     self.trigger_prearm_checks()
                     self.last_prearm_poll = current_time
@@ -145,12 +166,12 @@ class DroneBackend:
                         break
                     self._process_message(msg)
                     
-                time.sleep(0.1) # 10Hz Loop
+                self.clock.sleep(0.1) # 10Hz Loop
                 
                 # AGGRESSIVE DATA STREAM CHECK
                 # If we haven't received Attitude for >2s, re-request EVERYTHING
                 # This fixes the "Nothing Updating" issue on some flight controllers
-                if time.time() - self.last_attitude_time > 2.0:
+                if self.clock.time() - self.last_attitude_time > 2.0:
                      print(f"{self.log_prefix} Data Stalled. Re-requesting Streams...")
                      try:
                         self.master.mav.request_data_stream_send(
@@ -160,7 +181,7 @@ class DroneBackend:
                         # Also extra heartbeats
                         self._request_message_interval(mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, 10)
                      except: pass
-                     self.last_attitude_time = time.time() # Reset to avoid spamming too fast
+                     self.last_attitude_time = self.clock.time() # Reset to avoid spamming too fast
 
                 
             except Exception as e:
@@ -168,6 +189,7 @@ class DroneBackend:
                 
     def _process_message(self, msg):
         type_ = msg.get_type()
+        events = []
         with self.lock:
             if type_ == 'HEARTBEAT':
                 # Only process hearbeats from the target vehicle (usually system 1)
@@ -177,6 +199,8 @@ class DroneBackend:
                 # Log mode changes
                 if new_mode != old_mode and old_mode != 'UNKNOWN':
                     print(f"{self.log_prefix} 🔄 Mode: {new_mode}")
+                if new_mode != old_mode:
+                    events.append('mode')
                 
                 self.state['mode'] = new_mode
                 self.state['raw_mode_base'] = msg.base_mode
@@ -188,6 +212,7 @@ class DroneBackend:
                         print(f"{self.log_prefix} 🔴 ARMED")
                     else:
                         print(f"{self.log_prefix} 🟢 DISARMED")
+                    events.append('armed')
                 self.state['armed'] = new_armed
                 self.state['system_status'] = msg.system_status
                 
@@ -213,6 +238,9 @@ class DroneBackend:
                 vy = msg.vy / 100.0
                 vz = msg.vz / 100.0
                 self.state['speed'] = (vx**2 + vy**2)**0.5
+                self.state['vn'] = vx
+                self.state['ve'] = vy
+                self.state['vd'] = vz
                 self.state['climb'] = -vz # NED convention, z down is positive
                 
                 # Set Home if first 3D fix
@@ -227,9 +255,14 @@ class DroneBackend:
                         self.state['home_lat'], self.state['home_lon'],
                         curr_lat, curr_lon
                     )
+                events.append('position')
                 
             elif type_ == 'SYS_STATUS':
                 self.state['voltage'] = msg.voltage_battery / 1000.0
+                if msg.current_battery != -1:
+                    self.state['current'] = msg.current_battery / 100.0 # cA to A
+                if msg.battery_remaining != -1:
+                    self.state['battery_remaining'] = msg.battery_remaining
                 # Capture Sensor Health Bitmap
                 self.state['sensor_health'] = msg.onboard_control_sensors_health
 
@@ -237,7 +270,8 @@ class DroneBackend:
                 self.state['roll'] = msg.roll
                 self.state['pitch'] = msg.pitch
                 self.state['yaw'] = msg.yaw
-                self.last_attitude_time = time.time() # Mark alive
+                self.last_attitude_time = self.clock.time() # Mark alive
+                events.append('attitude')
 
 
             elif type_ == 'STATUSTEXT':
@@ -284,6 +318,10 @@ class DroneBackend:
                 self.state['ekf_pos_vert_var'] = msg.pos_vert_variance
                 self.state['ekf_compass_var'] = msg.compass_variance
                 self.state['ekf_flags'] = msg.flags
+
+        # Fire events outside the lock so listeners may call get_state()
+        for event in events:
+            self._emit(event)
                 
     def _request_message_interval(self, message_id, frequency_hz):
         if not self.master: return
@@ -382,6 +420,33 @@ class DroneBackend:
             0, 0 # yaw, yaw_rate
         )
 
+    def send_position_target(self, lat, lon, alt, vn=None, ve=None, vd=None):
+        """
+        GUIDED global position target (relative alt).
+        If a velocity (NED, m/s) is given it is sent as feed-forward alongside the position.
+        """
+        if not self.master: return
+        if vn is None:
+            type_mask = 0b0000111111111000 # only pos enabled
+            vn = ve = vd = 0
+        else:
+            type_mask = 0b0000111111000000 # pos + vel
+            ve = ve or 0
+            vd = vd or 0
+        self.master.mav.set_position_target_global_int_send(
+            0, # time_boot_ms
+            self.master.target_system,
+            self.master.target_component,
+            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
+            type_mask,
+            int(lat * 1e7),
+            int(lon * 1e7),
+            alt,
+            vn, ve, vd, # velocities
+            0, 0, 0, # accel
+            0, 0 # yaw
+        )
+
     def set_home(self, lat=0, lon=0, alt=0, set_current=False):
         if not self.master: return
         
@@ -533,7 +598,7 @@ class DroneBackend:
             # 1. STOP & BRAKE
             self.set_mode("GUIDED")
             self.send_velocity(0, 0, 0)
-            time.sleep(0.5)
+            self.clock.sleep(0.5)
             
             # 2. ASCEND TO 4M (Relative)
             print(f"{self.log_prefix} Ascending/Moving to 4m Altitude...")
@@ -551,12 +616,12 @@ class DroneBackend:
             )
             
             # Wait for ascent (simulated wait)
-            time.sleep(4) 
+            self.clock.sleep(4) 
             
             # 3. HOVER 3 SECONDS
             print(f"{self.log_prefix} Hovering for 3 seconds...")
             self.send_velocity(0, 0, 0)
-            time.sleep(3)
+            self.clock.sleep(3)
             
             # 4. LAND
             print(f"{self.log_prefix} Landing...")
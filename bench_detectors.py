@@ -0,0 +1,250 @@
+"""
+Detector benchmark: latency, throughput, peak memory and accuracy per backend.
+
+    python bench_detectors.py <image folder | video file> [--backends ncnn,onnx,opencv,ultralytics]
+                              [--imgsz N] [--threads N] [--max-frames N] [--conf 0.25]
+
+Image folders may carry YOLO labels (`class cx cy w h`, normalized) either next to
+each image or in a sibling `labels/` folder; mAP is reported when they exist.
+Every backend runs in its own subprocess so peak RSS is not polluted by the others.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import cv2
+import detectors
+
+# --- CONFIGURATION ---
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+WARMUP = 5                 # frames run before timing starts (lazy init, caches)
+MAX_FRAMES = 300
+EVAL_CONF = 0.25           # low threshold for mAP, the precision/recall curve needs the tail
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+# --- DATA ---
+
+def _label_path(image_path):
+    base = os.path.splitext(image_path)[0]
+    beside = base + ".txt"
+    if os.path.exists(beside):
+        return beside
+    d, name = os.path.split(base)
+    parent, leaf = os.path.split(d)
+    if leaf == "images":
+        sibling = os.path.join(parent, "labels", name + ".txt")
+        if os.path.exists(sibling):
+            return sibling
+    return None
+
+def load_labels(path, shape):
+    """YOLO txt -> (M, 5) class, x1, y1, x2, y2 in pixels"""
+    h, w = shape[:2]
+    rows = []
+    with open(path) as fp:
+        for line in fp:
+            f = line.split()
+            if len(f) < 5:
+                continue
+            c, cx, cy, bw, bh = int(f[0]), float(f[1]) * w, float(f[2]) * h, float(f[3]) * w, float(f[4]) * h
+            rows.append((c, cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2))
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+def iter_frames(source, max_frames=MAX_FRAMES):
+    """Yields (frame, labels or None) from an image folder or a video file"""
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                       if p.lower().endswith(IMAGE_EXTS))
+        for p in paths[:max_frames]:
+            frame = cv2.imread(p)
+            if frame is None:
+                continue
+            lp = _label_path(p)
+            yield frame, (load_labels(lp, frame.shape) if lp else None)
+    else:
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video: {source}")
+        n = 0
+        while n < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            n += 1
+            yield frame, None
+        cap.release()
+
+
+# --- ACCURACY ---
+
+def average_precision(tp, conf, n_gt):
+    """COCO 101-point interpolated AP from per-detection TP flags"""
+    if n_gt == 0:
+        return None
+    if len(tp) == 0:
+        return 0.0
+    order = np.argsort(-conf, kind='stable')
+    tp = tp[order]
+    tpc = np.cumsum(tp)
+    fpc = np.cumsum(1 - tp)
+    recall = tpc / n_gt
+    precision = tpc / (tpc + fpc)
+    precision = np.maximum.accumulate(precision[::-1])[::-1] # monotone envelope
+    grid = np.linspace(0, 1, 101)
+    idx = np.searchsorted(recall, grid, side='left')
+    return float(np.where(idx < len(precision), precision[np.minimum(idx, len(precision) - 1)], 0.0).mean())
+
+def evaluate(predictions, labels, iou_thresholds=IOU_THRESHOLDS):
+    """
+    predictions: per image (N, 6) x1 y1 x2 y2 conf cls; labels: per image (M, 5) cls x1 y1 x2 y2.
+    Returns (mAP@0.5, mAP@0.5:0.95) over the classes present in the labels.
+    """
+    classes = sorted({int(c) for lab in labels for c in lab[:, 0]})
+    if not classes:
+        return None, None
+    ap = np.zeros((len(classes), len(iou_thresholds)))
+    for ci, c in enumerate(classes):
+        n_gt = 0
+        tps, confs = [], []
+        for pred, lab in zip(predictions, labels):
+            p = pred[pred[:, 5] == c]
+            g = lab[lab[:, 0] == c, 1:]
+            n_gt += len(g)
+            if len(p) == 0:
+                continue
+            p = p[np.argsort(-p[:, 4], kind='stable')]
+            confs.append(p[:, 4])
+            tp = np.zeros((len(p), len(iou_thresholds)))
+            if len(g):
+                iou = detectors.box_iou(p[:, :4], g)
+                for ti, thr in enumerate(iou_thresholds):
+                    taken = np.zeros(len(g), dtype=bool)
+                    for k in range(len(p)): # greedy, best-confidence first
+                        cand = np.where(~taken & (iou[k] >= thr))[0]
+                        if len(cand):
+                            j = cand[iou[k, cand].argmax()]
+                            taken[j] = True
+                            tp[k, ti] = 1
+            tps.append(tp)
+        tp_all = np.concatenate(tps) if tps else np.zeros((0, len(iou_thresholds)))
+        conf_all = np.concatenate(confs) if confs else np.zeros(0)
+        for ti in range(len(iou_thresholds)):
+            ap[ci, ti] = average_precision(tp_all[:, ti], conf_all, n_gt) or 0.0
+    return float(ap[:, 0].mean()), float(ap.mean())
+
+def recall(predictions, labels, cls=0, conf=0.0, iou_threshold=0.5):
+    """Share of one class's ground-truth boxes found by predictions with score >= conf (None without labels)"""
+    found = n_gt = 0
+    for pred, lab in zip(predictions, labels):
+        g = lab[lab[:, 0] == cls, 1:]
+        p = pred[(pred[:, 5] == cls) & (pred[:, 4] >= conf)]
+        n_gt += len(g)
+        if len(g) and len(p):
+            iou = detectors.box_iou(g, p[:, :4])
+            while True: # one prediction per ground-truth box, best overlap first
+                i, j = np.unravel_index(iou.argmax(), iou.shape)
+                if iou[i, j] < iou_threshold:
+                    break
+                found += 1
+                iou[i, :] = -1
+                iou[:, j] = -1
+    return found / n_gt if n_gt else None
+
+
+# --- SINGLE BACKEND RUN ---
+
+def run_backend(backend, source, imgsz=None, threads=None, conf=EVAL_CONF, max_frames=MAX_FRAMES):
+    """Loads one backend, runs it over the source, returns a result dict"""
+    kwargs = {'conf': conf}
+    if imgsz: kwargs['imgsz'] = imgsz
+    if threads and backend != "ultralytics": kwargs['threads'] = threads
+    t0 = time.perf_counter()
+    det = detectors.create_detector(backend, **kwargs)
+    load_s = time.perf_counter() - t0
+
+    frames = list(iter_frames(source, max_frames))
+    if not frames:
+        raise ValueError(f"No frames in {source}")
+    for frame, _ in frames[:WARMUP]:
+        det.detect(frame)
+
+    times, predictions = [], []
+    t_start = time.perf_counter()
+    for frame, _ in frames:
+        t0 = time.perf_counter()
+        predictions.append(det.detect(frame))
+        times.append(time.perf_counter() - t0)
+    total = time.perf_counter() - t_start
+
+    result = {
+        'backend': backend, 'frames': len(frames), 'load_s': load_s,
+        'p50_ms': float(np.percentile(times, 50) * 1000),
+        'p95_ms': float(np.percentile(times, 95) * 1000),
+        'fps': len(frames) / total,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, # KiB on Linux
+        'map50': None, 'map50_95': None,
+    }
+    labels = [lab for _, lab in frames]
+    if all(lab is not None for lab in labels):
+        result['map50'], result['map50_95'] = evaluate(predictions, labels)
+    return result
+
+
+# --- CLI ---
+
+def _fmt(v, spec):
+    return "-" if v is None else format(v, spec)
+
+def print_table(results):
+    print(f"{'backend':<12} {'frames':>6} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} {'RSS MB':>8} {'mAP50':>6} {'mAP50-95':>9}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['backend']:<12} skipped: {r['error']}")
+            continue
+        print(f"{r['backend']:<12} {r['frames']:>6} {r['load_s']:>7.2f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['fps']:>7.1f} {r['peak_rss_mb']:>8.0f} {_fmt(r['map50'], '>6.3f')} {_fmt(r['map50_95'], '>9.3f')}")
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Benchmark YOLO detector backends")
+    ap.add_argument("source", help="image folder (optionally with YOLO labels) or video file")
+    ap.add_argument("--backends", default=",".join(detectors.BACKENDS))
+    ap.add_argument("--imgsz", type=int, default=None, help="network input size (backend default if unset)")
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--conf", type=float, default=EVAL_CONF)
+    ap.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    ap.add_argument("--json", action="store_true", help="print one JSON line per backend")
+    ap.add_argument("--inline", action="store_true", help="run in this process (no subprocess isolation)")
+    args = ap.parse_args(argv)
+
+    results = []
+    for backend in args.backends.split(","):
+        if args.inline:
+            try:
+                r = run_backend(backend, args.source, args.imgsz, args.threads, args.conf, args.max_frames)
+            except (ImportError, FileNotFoundError, ValueError) as e:
+                r = {'backend': backend, 'error': str(e)}
+        else:
+            # Fresh interpreter per backend: clean peak RSS and no cross-runtime thread pools
+            cmd = [sys.executable, os.path.abspath(__file__), args.source, "--inline", "--json",
+                   "--backends", backend, "--conf", str(args.conf), "--max-frames", str(args.max_frames)]
+            if args.imgsz: cmd += ["--imgsz", str(args.imgsz)]
+            if args.threads: cmd += ["--threads", str(args.threads)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            r = json.loads(lines[-1]) if lines else {'backend': backend, 'error': (proc.stderr.strip().splitlines() or ["crashed"])[-1]}
+        results.append(r)
+        if args.json:
+            print(json.dumps(r))
+    if not args.json:
+        print_table(results)
+    return 0 if any('error' not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
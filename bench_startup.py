@@ -0,0 +1,103 @@
+"""
+GCS startup cost: import time per module, what `import gui` drags in, and time to first window.
+
+    python bench_startup.py             # import table + heavy-module check
+    python bench_startup.py --profile   # top imports of `import gui` (python -X importtime)
+    python bench_startup.py --window    # also build DroneApp and time the first drawn frame (needs a display)
+
+Each measurement runs in a fresh interpreter, so nothing is already cached in sys.modules.
+Run it on the laptop GCS and on the RPi 5 and compare.
+"""
+import os
+import platform
+import subprocess
+import sys
+
+# --- CONFIGURATION ---
+RUNS = 3                   # fresh interpreters per measurement, best time is reported
+TOP_IMPORTS = 15
+MODULES = ["tkinter", "tkintermapview", "pymavlink.mavutil", "numpy", "mission",
+           "cv2", "detectors", "ai_pilot", "gui"]
+HEAVY = ["cv2", "torch", "ultralytics", "ncnn", "onnxruntime"] # must not load with the GUI
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=HERE, capture_output=True, text=True)
+
+def import_time(module, runs=RUNS):
+    """Best-of-N wall time (s) to import a module in a fresh interpreter, or None if it fails"""
+    code = (f"import time; t0 = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - t0)")
+    best = None
+    for _ in range(runs):
+        p = _python(code)
+        if p.returncode != 0:
+            return None, (p.stderr.strip().splitlines() or ["failed"])[-1]
+        t = float(p.stdout.strip().splitlines()[-1])
+        best = t if best is None else min(best, t)
+    return best, ""
+
+def loaded_heavy(module="gui"):
+    """Heavy modules present in sys.modules right after importing `module`"""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    p = _python(code)
+    if p.returncode != 0:
+        return None
+    return [m for m in p.stdout.strip().split(",") if m]
+
+def import_profile(module="gui", top=TOP_IMPORTS):
+    """(cumulative us, module) of the slowest top-level imports, from -X importtime"""
+    p = _python(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, raw = line.split("|")
+        level = (len(raw) - len(raw.lstrip()) - 1) // 2 # two spaces per nesting level
+        if level <= 1: # the module itself and what it imports directly
+            rows.append((int(cum_us), raw.strip()))
+    return sorted(rows, reverse=True)[:top], p.returncode == 0
+
+def window_time():
+    """s from process start to the first drawn DroneApp frame"""
+    code = ("import time; t0 = time.perf_counter(); from gui import DroneApp; t1 = time.perf_counter(); "
+            "app = DroneApp(); app.update(); t2 = time.perf_counter(); "
+            "print(t1 - t0, t2 - t0); app.shutdown() if hasattr(app, 'shutdown') else None; app.destroy()")
+    p = _python(code)
+    if p.returncode != 0:
+        return None, (p.stderr.strip().splitlines() or ["failed"])[-1]
+    t_import, t_window = map(float, p.stdout.strip().splitlines()[-1].split())
+    return (t_import, t_window), ""
+
+def main(argv):
+    print(f"{platform.node()} {platform.machine()} Python {platform.python_version()}")
+    print(f"{'module':<20} {'import ms':>10}")
+    for m in MODULES:
+        t, err = import_time(m)
+        print(f"{m:<20} {'-' if t is None else f'{t * 1000:10.0f}':>10}  {err[:60]}")
+
+    heavy = loaded_heavy("gui")
+    if heavy is None:
+        print("gui import failed, heavy-module check skipped")
+    else:
+        print(f"heavy modules loaded by `import gui`: {', '.join(heavy) or 'none'}")
+
+    if "--profile" in argv:
+        rows, ok = import_profile("gui")
+        print(f"\nslowest imports under `import gui`{'' if ok else ' (import failed part way)'}:")
+        for cum_us, name in rows:
+            print(f"  {cum_us / 1000:8.1f} ms  {name}")
+
+    if "--window" in argv:
+        t, err = window_time()
+        if t is None:
+            print(f"\nwindow: skipped ({err[:80]})")
+        else:
+            print(f"\nimport gui {t[0] * 1000:.0f} ms, first frame drawn {t[1] * 1000:.0f} ms after start")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
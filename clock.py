@@ -0,0 +1,52 @@
+import time
+import threading
+
+class WallClock:
+    """Real time. Default clock for flight code."""
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Simulated time that only moves when advanced.
+    sleep() returns instantly: it either advances the clock itself or, if a
+    simulator installed `on_sleep`, lets the simulator run forward for that long.
+    """
+    def __init__(self, start=0.0):
+        self.now = start
+        self.lock = threading.Lock()
+        self.on_sleep = None
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        with self.lock:
+            self.now += max(seconds, 0.0)
+            return self.now
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        if self.on_sleep:
+            self.on_sleep(seconds)
+        else:
+            self.advance(seconds)
+
+
+WALL_CLOCK = WallClock()
+_default_clock = WALL_CLOCK
+
+def get_clock():
+    """Clock used by components that were not given one explicitly"""
+    return _default_clock
+
+def set_clock(clock):
+    """Swap the process default (e.g. a VirtualClock for tests / simulations)"""
+    global _default_clock
+    _default_clock = clock or WALL_CLOCK
@@ -0,0 +1,320 @@
+import math
+from geo import to_local as _to_local, to_global as _to_global
+
+# --- CONFIGURATION ---
+DEFAULT_CRUISE_SPEED = 5.0   # m/s, used when a backend has no target_speed set
+WP_OVERHEAD_S = 2.0          # Approx. seconds lost per waypoint (brake / re-accelerate)
+SURVEY_SPACING_M = 10.0      # Lawnmower line spacing for survey polygons
+MAX_REBALANCE_ITERS = 500    # Hard cap on point moves between drones
+REBALANCE_CANDIDATES = 25    # Points of the slowest drone considered per move
+
+
+# --- LOCAL FRAME HELPERS ---
+# Everything is planned in a flat East/North frame (meters) around a reference point.
+
+def _dist(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+# --- ROUTING (per drone) ---
+
+def route_length(start, pts):
+    """Length of the open path start -> pts[0] -> ... -> pts[-1] (meters)"""
+    total = 0.0
+    prev = start
+    for p in pts:
+        total += _dist(prev, p)
+        prev = p
+    return total
+
+def _nearest_neighbour(start, pts):
+    remaining = list(pts)
+    route = []
+    curr = start
+    while remaining:
+        j = min(range(len(remaining)), key=lambda k: _dist(curr, remaining[k]))
+        curr = remaining.pop(j)
+        route.append(curr)
+    return route
+
+def _two_opt(start, route, max_passes=20):
+    """Classic 2-opt on an open path with a fixed start (no return leg)"""
+    n = len(route)
+    if n < 3:
+        return route
+    route = list(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            a = start if i == 0 else route[i - 1]
+            b = route[i]
+            for j in range(i + 1, n):
+                c = route[j]
+                d = route[j + 1] if j + 1 < n else None
+                # Reverse route[i..j]: edges (a,b),(c,d) become (a,c),(b,d)
+                old = _dist(a, b) + (_dist(c, d) if d else 0.0)
+                new = _dist(a, c) + (_dist(b, d) if d else 0.0)
+                if new < old - 1e-6:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    b = route[i]
+                    improved = True
+        if not improved:
+            break
+    return route
+
+def plan_route(start, pts):
+    """Nearest-neighbour seed + 2-opt. start/pts in local (x, y) meters."""
+    return _two_opt(start, _nearest_neighbour(start, pts))
+
+def _route_time(start, route, speed):
+    return route_length(start, route) / speed + len(route) * WP_OVERHEAD_S
+
+
+# --- CLUSTERING ---
+
+def _kmeans(pts, k, iters=25):
+    """Plain k-means with deterministic farthest-point seeding"""
+    centers = [pts[0]]
+    while len(centers) < k:
+        centers.append(max(pts, key=lambda p: min(_dist(p, c) for c in centers)))
+    labels = [0] * len(pts)
+    for _ in range(iters):
+        changed = False
+        for i, p in enumerate(pts):
+            best = min(range(k), key=lambda c: _dist(p, centers[c]))
+            if best != labels[i]:
+                labels[i] = best
+                changed = True
+        for c in range(k):
+            members = [p for p, l in zip(pts, labels) if l == c]
+            if members:
+                centers[c] = (sum(p[0] for p in members) / len(members),
+                              sum(p[1] for p in members) / len(members))
+        if not changed:
+            break
+    return labels, centers
+
+def _match_clusters(centers, starts, speeds):
+    """Assign cluster -> drone minimizing the worst approach time.
+    Exhaustive for small fleets, greedy otherwise."""
+    k = len(starts)
+    cost = [[_dist(starts[d], centers[c]) / speeds[d] for c in range(k)] for d in range(k)]
+    if k <= 7:
+        import itertools
+        best, best_perm = None, None
+        for perm in itertools.permutations(range(k)):
+            worst = max(cost[d][perm[d]] for d in range(k))
+            if best is None or worst < best:
+                best, best_perm = worst, perm
+        return list(best_perm)
+    # Greedy: fastest drones pick the cluster nearest to them first
+    free = set(range(k))
+    perm = [0] * k
+    for d in sorted(range(k), key=lambda d: -speeds[d]):
+        c = min(free, key=lambda c: cost[d][c])
+        perm[d] = c
+        free.remove(c)
+    return perm
+
+
+# --- PARTITIONING ---
+
+def _insertion_cost(start, route, p):
+    """Cheapest extra distance to insert p anywhere in an open route"""
+    if not route:
+        return _dist(start, p), 0
+    best, best_i = _dist(route[-1], p), len(route) # append at end
+    prev = start
+    for i, q in enumerate(route):
+        delta = _dist(prev, p) + _dist(p, q) - _dist(prev, q)
+        if delta < best:
+            best, best_i = delta, i
+        prev = q
+    return best, best_i
+
+def _removal_saving(start, route, i):
+    prev = start if i == 0 else route[i - 1]
+    nxt = route[i + 1] if i + 1 < len(route) else None
+    saving = _dist(prev, route[i])
+    if nxt is not None:
+        saving += _dist(route[i], nxt) - _dist(prev, nxt)
+    return saving
+
+def partition_local(pts, starts, speeds):
+    """
+    Splits local (x, y) points between drones.
+    Returns one ordered route (list of points) per drone.
+    """
+    k = len(starts)
+    if k == 0:
+        return []
+    if k == 1 or len(pts) <= 1:
+        routes = [[] for _ in range(k)]
+        if pts:
+            # Single point or single drone: give everything to the fastest arrival
+            d = min(range(k), key=lambda d: _dist(starts[d], pts[0]) / speeds[d])
+            routes[d] = plan_route(starts[d], pts)
+        return routes
+
+    # 1. Spatial clusters (one per drone), matched to drones by approach time
+    n_clusters = min(k, len(pts))
+    labels, centers = _kmeans(pts, n_clusters)
+    while len(centers) < k:
+        centers.append(centers[-1]) # More drones than points: empty clusters
+    perm = _match_clusters(centers, starts, speeds)
+    cluster_to_drone = {c: d for d, c in enumerate(perm)}
+    members = [[] for _ in range(k)]
+    for p, l in zip(pts, labels):
+        members[cluster_to_drone[l]].append(p)
+    routes = [plan_route(starts[d], members[d]) for d in range(k)]
+    times = [_route_time(starts[d], routes[d], speeds[d]) for d in range(k)]
+
+    # 2. Rebalance: move single points off the bottleneck drone while makespan drops
+    for _ in range(MAX_REBALANCE_ITERS):
+        b = max(range(k), key=lambda d: times[d])
+        if not routes[b]:
+            break
+        makespan = times[b]
+
+        # Candidates: points whose removal saves the most distance on the bottleneck
+        order = sorted(range(len(routes[b])),
+                       key=lambda i: -_removal_saving(starts[b], routes[b], i))
+        best = None # (new_makespan, i, d, insert_at, t_b, t_d)
+        for i in order[:REBALANCE_CANDIDATES]:
+            p = routes[b][i]
+            t_b = times[b] - _removal_saving(starts[b], routes[b], i) / speeds[b] - WP_OVERHEAD_S
+            for d in range(k):
+                if d == b:
+                    continue
+                extra, at = _insertion_cost(starts[d], routes[d], p)
+                t_d = times[d] + extra / speeds[d] + WP_OVERHEAD_S
+                new_pair = max(t_b, t_d)
+                if new_pair < makespan - 1e-6 and (best is None or new_pair < best[0]):
+                    best = (new_pair, i, d, at, t_b, t_d)
+        if best is None:
+            break
+
+        _, i, d, at, t_b, t_d = best
+        p = routes[b].pop(i)
+        routes[d].insert(at, p)
+        times[b], times[d] = t_b, t_d
+
+    # 3. Final polish of every route
+    for d in range(k):
+        routes[d] = _two_opt(starts[d], routes[d])
+    return routes
+
+def partition_waypoints(waypoints, starts, speeds=None):
+    """
+    waypoints: list of (lat, lon) shared pool
+    starts:    list of (lat, lon), one per drone
+    speeds:    list of cruise speeds (m/s), one per drone
+    Returns:   (routes, times) -> list of ordered (lat, lon) lists and estimated
+               completion time (s) per drone, in the same order as starts.
+    """
+    if not starts:
+        return [], []
+    if speeds is None:
+        speeds = [DEFAULT_CRUISE_SPEED] * len(starts)
+    speeds = [s if s and s > 0 else DEFAULT_CRUISE_SPEED for s in speeds]
+
+    ref = waypoints[0] if waypoints else starts[0]
+    lat0, lon0 = ref
+    pts = [_to_local(lat, lon, lat0, lon0) for lat, lon in waypoints]
+    loc_starts = [_to_local(lat, lon, lat0, lon0) for lat, lon in starts]
+
+    local_routes = partition_local(pts, loc_starts, speeds)
+    times = [_route_time(loc_starts[d], r, speeds[d]) for d, r in enumerate(local_routes)]
+    routes = [[_to_global(x, y, lat0, lon0) for x, y in r] for r in local_routes]
+    return routes, times
+
+
+# --- SURVEY POLYGON ---
+
+def _point_in_polygon(x, y, poly):
+    inside = False
+    n = len(poly)
+    for i in range(n):
+        x1, y1 = poly[i]
+        x2, y2 = poly[(i + 1) % n]
+        if (y1 > y) != (y2 > y):
+            xi = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            if x < xi:
+                inside = not inside
+    return inside
+
+def generate_survey_grid(polygon, spacing=SURVEY_SPACING_M):
+    """
+    Lawnmower sample points inside a (lat, lon) polygon.
+    Points lie on East-West lines `spacing` meters apart, `spacing` meters along-track.
+    """
+    if len(polygon) < 3:
+        return list(polygon)
+    lat0, lon0 = polygon[0]
+    poly = [_to_local(lat, lon, lat0, lon0) for lat, lon in polygon]
+    min_x = min(p[0] for p in poly); max_x = max(p[0] for p in poly)
+    min_y = min(p[1] for p in poly); max_y = max(p[1] for p in poly)
+
+    out = []
+    row = 0
+    y = min_y + spacing / 2
+    while y < max_y:
+        line = []
+        x = min_x + spacing / 2
+        while x < max_x:
+            if _point_in_polygon(x, y, poly):
+                line.append((x, y))
+            x += spacing
+        if row % 2: line.reverse() # Boustrophedon order
+        out.extend(_to_global(px, py, lat0, lon0) for px, py in line)
+        y += spacing
+        row += 1
+    return out
+
+
+# --- FLEET ASSIGNMENT ---
+
+def assign_to_fleet(mission_mgrs, waypoints=None, polygon=None, spacing=SURVEY_SPACING_M, drone_ids=None):
+    """
+    Splits a shared pool of waypoints (or a survey polygon) between drones and
+    loads each partition into the matching mission_mgrs[idx].
+
+    mission_mgrs: dict {idx: MissionManager} (as held by DroneApp)
+    drone_ids:    subset of idx to use (default: connected drones with a position)
+    Returns:      dict {idx: estimated completion time (s)}
+    """
+    if polygon is not None:
+        waypoints = generate_survey_grid(polygon, spacing)
+    waypoints = list(waypoints or [])
+
+    if drone_ids is None:
+        drone_ids = [idx for idx, mgr in mission_mgrs.items()
+                     if mgr.backend.connected and mgr.backend.state['lat'] != 0]
+    drone_ids = sorted(drone_ids)
+    if not drone_ids:
+        print("[Fleet] ❌ No connected drones with a position fix.")
+        return {}
+    if not waypoints:
+        print("[Fleet] ❌ No waypoints to split.")
+        return {}
+
+    starts, speeds = [], []
+    for idx in drone_ids:
+        s = mission_mgrs[idx].backend.state
+        lat, lon = s['lat'], s['lon']
+        if lat == 0 and lon == 0 and s.get('home_lat'):
+            lat, lon = s['home_lat'], s['home_lon']
+        starts.append((lat, lon))
+        speeds.append(getattr(mission_mgrs[idx].backend, 'target_speed', None) or DEFAULT_CRUISE_SPEED)
+
+    routes, times = partition_waypoints(waypoints, starts, speeds)
+
+    result = {}
+    for idx, route, t in zip(drone_ids, routes, times):
+        mgr = mission_mgrs[idx]
+        mgr.set_waypoints(route) # one change event + one undo step per drone
+        result[idx] = t
+        print(f"{mgr.backend.log_prefix} [Fleet] Assigned {len(route)} WPs (ETA {t:.0f}s)")
+
+    print(f"[Fleet] ✅ Split {len(waypoints)} WPs over {len(drone_ids)} drones. Makespan ~{max(times):.0f}s")
+    return result
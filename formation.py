@@ -0,0 +1,205 @@
+import math
+import threading
+import numpy as np
+from geo import EARTH_R
+from clock import get_clock
+
+# --- CONFIGURATION ---
+CONTROL_RATE = 10.0        # Hz, setpoint stream rate to every follower
+DEFAULT_SHAPE = "v"        # "line" | "column" | "v" | "grid"
+DEFAULT_SPACING = 6.0      # m between neighbouring slots
+LATENCY_S = 0.25           # s, link + autopilot reaction time compensated with leader velocity
+HEADING_SLEW = 30.0        # deg/s, formation rotates smoothly around corners instead of snapping
+HEADING_MIN_SPEED = 1.0    # m/s, below this the formation keeps its last heading (no spinning in a hover)
+MIN_FOLLOWER_ALT = 1.5     # m, followers still on the ground are not driven
+FOLLOWER_SPEED = 8.0       # m/s, follower speed limit; must exceed the leader's cruise to close gaps
+STALE_FIX_S = 2.0          # s, leader position older than this -> followers hold
+
+SHAPES = ("line", "column", "v", "grid")
+
+
+def formation_offsets(shape, n, spacing=DEFAULT_SPACING):
+    """
+    Slot offsets for n followers in the leader's body frame.
+    Returns an (n, 2) array of (forward, right) meters. Followers alternate right/left.
+    """
+    k = np.arange(1, n + 1)
+    rank = (k + 1) // 2               # 1, 1, 2, 2, 3, ...
+    side = np.where(k % 2 == 1, 1.0, -1.0)
+    if shape == "line":               # abreast
+        fwd = np.zeros(n)
+        right = side * rank * spacing
+    elif shape == "column":           # in trail
+        fwd = -k * spacing
+        right = np.zeros(n)
+    elif shape == "v":                # 45 deg echelons behind the leader
+        d = rank * spacing / math.sqrt(2)
+        fwd = -d
+        right = side * d
+    elif shape == "grid":             # rows behind the leader, leader in the middle of row 0
+        cols = int(math.ceil(math.sqrt(n + 1)))
+        c0 = (cols - 1) // 2
+        slots = [(r, c) for r in range(n // cols + 2) for c in range(cols) if (r, c) != (0, c0)][:n]
+        fwd = np.array([-r * spacing for r, _ in slots], dtype=np.float64)
+        right = np.array([(c - c0) * spacing for _, c in slots], dtype=np.float64)
+    else:
+        raise ValueError(f"Unknown formation shape: {shape} (use one of {SHAPES})")
+    return np.column_stack([fwd, right]).astype(np.float64)
+
+
+class FormationController:
+    """
+    Leader-follower formation.
+    One thread, fixed rate: read the leader's state, predict where it will be when the
+    setpoints land (fix age + LATENCY_S, along its velocity), rotate every slot offset
+    into the leader heading frame at once and stream position + velocity feed-forward
+    targets to each follower.
+    """
+    def __init__(self, leader, followers, shape=DEFAULT_SHAPE, spacing=DEFAULT_SPACING,
+                 alt_offset=0.0, rate=CONTROL_RATE, latency=LATENCY_S, clock=None):
+        self.leader = leader          # DroneBackend
+        self.followers = list(followers)
+        self.clock = clock or get_clock()
+        self.rate = rate
+        self.latency = latency
+        self.alt_offset = alt_offset  # m added to the leader altitude for every follower
+        self.compensate = True        # predict the leader ahead by fix age + latency
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.heading = None           # rad, formation heading (from North, clockwise)
+        self.last_tick = None
+        self.leader_fix_time = None   # clock time of the last leader position
+        self.targets = []             # [(lat, lon, alt)] last sent, one per follower
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = set()          # followers not driven (grounded), logged once
+        self.set_shape(shape, spacing)
+
+    def set_shape(self, shape, spacing=None):
+        with self.lock:
+            self.shape = shape
+            if spacing is not None:
+                self.spacing = spacing
+            self.offsets = formation_offsets(shape, len(self.followers), self.spacing)
+        print(f"{self.leader.log_prefix} [Formation] Shape {shape.upper()} @ {self.spacing:.1f}m, {len(self.followers)} followers")
+
+    def _on_leader(self, backend, event):
+        if event == 'position':
+            self.leader_fix_time = self.clock.time()
+
+    # --- LIFECYCLE ---
+
+    def start(self):
+        if self.running:
+            return
+        self.leader.add_listener(self._on_leader)
+        for b in self.followers:
+            if b.state['mode'] != 'GUIDED':
+                b.set_mode("GUIDED")
+            b.set_speed(FOLLOWER_SPEED) # headroom over the leader, or slot errors never close
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        print(f"{self.leader.log_prefix} [Formation] ▶️ Started ({self.rate:.0f} Hz)")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.leader.remove_listener(self._on_leader)
+        # Followers hold where they are
+        for b in self.followers:
+            b.send_velocity(0, 0, 0)
+        print(f"{self.leader.log_prefix} [Formation] ⏹️ Stopped after {self.ticks} ticks ({self.overruns} overruns)")
+
+    def _loop(self):
+        period = 1.0 / self.rate
+        next_t = self.clock.time()
+        while self.running:
+            try:
+                self.step()
+            except Exception as e:
+                print(f"{self.leader.log_prefix} [Formation] 💥 Step error: {e}")
+            # Fixed rate without drift; if a tick overran, skip ahead instead of bursting
+            next_t += period
+            now = self.clock.time()
+            if next_t < now:
+                self.overruns += 1
+                next_t = now + period
+            self.clock.sleep(next_t - now)
+
+    # --- CONTROL ---
+
+    def _leader_prediction(self, now):
+        s = self.leader.state
+        vn, ve = s.get('vn', 0.0), s.get('ve', 0.0)
+        speed = math.hypot(vn, ve)
+        if self.heading is None:
+            self.heading = math.atan2(ve, vn) if speed >= HEADING_MIN_SPEED else math.radians(s.get('heading', 0.0))
+        elif speed >= HEADING_MIN_SPEED:
+            # Slew-limited turn towards the leader's course
+            err = (math.atan2(ve, vn) - self.heading + math.pi) % (2 * math.pi) - math.pi
+            dt = 0.0 if self.last_tick is None else now - self.last_tick
+            max_turn = math.radians(HEADING_SLEW) * dt
+            self.heading += max(-max_turn, min(max_turn, err))
+        self.last_tick = now
+        fix_age = 0.0 if self.leader_fix_time is None else max(now - self.leader_fix_time, 0.0)
+        lead = (fix_age + self.latency) if self.compensate else 0.0
+        return s['lat'], s['lon'], s['alt_rel'], vn * lead, ve * lead, vn, ve, fix_age
+
+    def step(self, now=None):
+        """One control tick. Returns the (lat, lon, alt) targets sent, one per follower."""
+        if now is None: now = self.clock.time()
+        self.ticks += 1
+        lat0, lon0, alt, dn, de, vn, ve, fix_age = self._leader_prediction(now)
+        if lat0 == 0 and lon0 == 0:
+            return []
+        if fix_age > STALE_FIX_S:
+            # Leader telemetry lost: do not chase a stale point
+            for b in self.followers:
+                b.send_velocity(0, 0, 0)
+            return []
+
+        with self.lock:
+            offsets = self.offsets
+        # Body (forward, right) -> East/North for all slots at once, around the predicted leader
+        h = self.heading
+        sin_h, cos_h = math.sin(h), math.cos(h)
+        east = offsets[:, 0] * sin_h + offsets[:, 1] * cos_h + de
+        north = offsets[:, 0] * cos_h - offsets[:, 1] * sin_h + dn
+        lats = lat0 + np.degrees(north / EARTH_R)
+        lons = lon0 + np.degrees(east / (EARTH_R * math.cos(math.radians(lat0))))
+        target_alt = alt + self.alt_offset
+
+        targets = []
+        for b, lat, lon in zip(self.followers, lats.tolist(), lons.tolist()):
+            targets.append((lat, lon, target_alt))
+            if b.state['alt_rel'] < MIN_FOLLOWER_ALT or not b.state['armed']:
+                if b not in self.skipped:
+                    self.skipped.add(b)
+                    print(f"{b.log_prefix} [Formation] ⚠️ Not airborne, waiting (take off to join)")
+                continue
+            if b in self.skipped:
+                self.skipped.discard(b)
+                print(f"{b.log_prefix} [Formation] ✅ Joined formation")
+            b.send_position_target(lat, lon, target_alt, vn, ve, 0)
+        self.targets = targets
+        return targets
+
+    def slot_errors(self):
+        """Horizontal distance (m) of every follower from its current slot (no prediction)"""
+        s = self.leader.state
+        if self.heading is None or s['lat'] == 0:
+            return []
+        lat0, lon0 = s['lat'], s['lon']
+        sin_h, cos_h = math.sin(self.heading), math.cos(self.heading)
+        k = math.cos(math.radians(lat0))
+        out = []
+        for (fwd, right), b in zip(self.offsets.tolist(), self.followers):
+            want_e = fwd * sin_h + right * cos_h
+            want_n = fwd * cos_h - right * sin_h
+            e = math.radians(b.state['lon'] - lon0) * EARTH_R * k
+            n = math.radians(b.state['lat'] - lat0) * EARTH_R
+            out.append(math.hypot(e - want_e, n - want_n))
+        return out
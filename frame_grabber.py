@@ -0,0 +1,197 @@
+import threading
+import cv2
+from clock import get_clock
+
+# --- CONFIGURATION ---
+READ_RETRY_S = 0.1         # s between attempts while the source returns nothing
+RECONNECT_AFTER = 20       # consecutive failed reads before the source is reopened
+CAPTURE_BUFFER = 1         # frames OpenCV may queue (not every backend honours it)
+
+
+class FrameGrabber:
+    """
+    Reads a capture source on its own thread and keeps only the newest frame.
+    Consumers never see a backlog: read() hands out the latest decoded frame with
+    its capture timestamp, frames that nobody picked up in time are dropped.
+    """
+    def __init__(self, source, width=None, height=None, clock=None, opener=None):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.clock = clock or get_clock()
+        self.opener = opener or cv2.VideoCapture
+        self.cap = None
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        # Latest frame
+        self.frame = None
+        self.timestamp = None     # clock time the frame was decoded
+        self.seq = 0              # increments on every new frame
+
+        # Stats
+        self.grabbed = 0
+        self.dropped = 0          # overwritten before any consumer read them
+        self.reconnects = 0
+        self._consumed = 0        # seq of the last frame handed out
+
+    # --- LIFECYCLE ---
+
+    def open(self):
+        self.cap = self.opener(self.source)
+        if not self.cap.isOpened():
+            print(f"[Grabber] ❌ Failed to open camera source: {self.source}")
+            return False
+        # Some remote streams don't support setting props, but we try
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, CAPTURE_BUFFER)
+        if self.width: self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height: self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return True
+
+    def start(self):
+        if self.running:
+            return self.is_opened()
+        ok = self.open()
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        print(f"[Grabber] 📷 Capturing from {self.source}")
+        return ok
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        if self.cap:
+            self.cap.release()
+        print(f"[Grabber] ⏹️ Stopped: {self.grabbed} frames, {self.dropped} dropped, {self.reconnects} reconnects")
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def _reconnect(self):
+        print(f"[Grabber] 🔄 No frames from {self.source}, reopening...")
+        if self.cap:
+            self.cap.release()
+        self.reconnects += 1
+        self.open()
+
+    def _loop(self):
+        failures = 0
+        while self.running:
+            ok, frame = self.cap.read() if self.cap is not None else (False, None)
+            if not ok or frame is None:
+                failures += 1
+                if failures >= RECONNECT_AFTER:
+                    failures = 0
+                    self._reconnect()
+                self.clock.sleep(READ_RETRY_S)
+                continue
+            failures = 0
+            now = self.clock.time()
+            with self.cond:
+                if self.seq > self._consumed:
+                    self.dropped += 1 # previous frame was never read
+                self.frame = frame
+                self.timestamp = now
+                self.seq += 1
+                self.grabbed += 1
+                self.cond.notify_all()
+
+    # --- CONSUMER ---
+
+    def read(self, newer_than=None, timeout=1.0):
+        """
+        Newest frame as (frame, timestamp, seq).
+        newer_than: seq already processed; waits (up to timeout) for a newer one.
+        Returns (None, None, seq) on timeout.
+        """
+        if newer_than is None:
+            newer_than = self._consumed
+        with self.cond:
+            if self.seq <= newer_than:
+                self.cond.wait_for(lambda: self.seq > newer_than or not self.running, timeout)
+            if self.seq <= newer_than or self.frame is None:
+                return None, None, self.seq
+            self._consumed = self.seq
+            return self.frame, self.timestamp, self.seq
+
+    def age(self, timestamp):
+        """Seconds since a frame timestamp returned by read()"""
+        return max(self.clock.time() - timestamp, 0.0)
+
+
+# --- BENCHMARK ---
+
+class _BufferedStream:
+    """Stand-in for an MJPEG capture: frames arrive at `fps` and queue up until read."""
+    def __init__(self, fps, shape=(240, 320, 3)):
+        import time
+        import numpy as np
+        self._time = time
+        self.period = 1.0 / fps
+        self.t0 = time.time()
+        self.next = 0
+        self.frame = np.zeros(shape, dtype=np.uint8)
+        self.open = True
+
+    def isOpened(self):
+        return self.open
+
+    def set(self, prop, value):
+        return False
+
+    def read(self):
+        # Next queued frame, or block until it is produced
+        due = self.t0 + self.next * self.period
+        wait = due - self._time.time()
+        if wait > 0:
+            self._time.sleep(wait)
+        self.next += 1
+        return True, (self.frame, due)
+
+    def release(self):
+        self.open = False
+
+
+def benchmark(fps=30.0, infer_s=0.08, duration=3.0):
+    """Frame age at inference time: serial read-then-infer vs the grabber thread"""
+    import time
+    print(f"stream {fps:.0f} fps, inference {infer_s * 1000:.0f} ms, {duration:.0f} s")
+
+    def report(label, ages):
+        ages = sorted(ages)
+        p50 = ages[len(ages) // 2]
+        print(f"  {label:<10} frames {len(ages):>4}  age p50 {p50 * 1000:7.1f} ms  max {ages[-1] * 1000:7.1f} ms")
+
+    # 1. Serial: the stream buffer grows while we infer
+    cap = _BufferedStream(fps)
+    ages = []
+    end = time.time() + duration
+    while time.time() < end:
+        ok, (frame, captured) = cap.read()
+        ages.append(time.time() - captured)
+        time.sleep(infer_s)
+    report("serial", ages)
+
+    # 2. Grabber: always the newest frame
+    grabber = FrameGrabber("synthetic", opener=lambda src: _BufferedStream(fps))
+    grabber.start()
+    ages = []
+    seq = 0
+    end = time.time() + duration
+    while time.time() < end:
+        item, ts, seq = grabber.read(seq)
+        if item is None:
+            continue
+        ages.append(time.time() - item[1])
+        time.sleep(infer_s)
+    grabber.stop()
+    report("grabber", ages)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,208 @@
+import math
+import time
+from collections import Counter, deque
+from clock import get_clock
+
+# --- CONFIGURATION ---
+CONTROL_DEADLINE_S = 0.100 # capture -> control decision budget
+LATENCY_WINDOW = 30        # recent latencies per path used for the estimates
+SIZE_STEPS = (1.0, 0.8, 0.6, 0.5) # input side per degrade level, fraction of the detector size
+SIZE_STRIDE = 32
+DEGRADE_AT = 0.9           # p90 detect latency above this fraction of the deadline -> degrade
+RECOVER_AT = 0.6           # predicted p90 one level up below this fraction -> recover
+LEVEL_HOLD_S = 2.0         # s between level changes (let the window refill)
+MIN_SAMPLES = 10           # detect latencies needed at a level before changing it
+MAX_DETECT_EVERY = 8       # tracking: most frames per detector run once resolution is exhausted
+
+DETECT = "DETECT"          # full inference
+TRACK = "TRACK"            # tracker-only propagation, detector skipped
+SKIP = "SKIP"              # frame dropped: already late, or would overtake a detection
+
+
+class FrameScheduler:
+    """
+    Per-frame decision for the vision pipeline: DETECT, TRACK or SKIP.
+
+    Keeps rolling capture -> decision latencies for each path and holds the control
+    deadline by, in order: running tracker-only frames between detections (when the
+    caller is tracking, detect_every > 1), dropping frames that are already late, and
+    degrading the detector input size under CPU pressure. Recovers when there is room.
+    adaptive=False: plain detect_every behaviour; deadline misses are still counted.
+    """
+    def __init__(self, deadline=CONTROL_DEADLINE_S, base_size=None, detect_every=1, adaptive=True, clock=None):
+        self.deadline = deadline
+        self.adaptive = adaptive
+        self.base_size = base_size
+        self.detect_every = detect_every  # frames per detector run while tracking (1 = not tracking)
+        self.clock = clock or get_clock()
+        self.level = 0                    # index into SIZE_STEPS
+        self.extra_every = 0              # added to detect_every past the last size step
+        self.last_change = -math.inf
+        self.since_detect = 0
+        self.latency = {DETECT: deque(maxlen=LATENCY_WINDOW), TRACK: deque(maxlen=LATENCY_WINDOW)}
+
+        # Metrics
+        self.decisions = Counter()
+        self.completed = 0
+        self.misses = 0                   # decisions later than the deadline
+        self.level_changes = 0
+
+    # --- ESTIMATES ---
+
+    @staticmethod
+    def _quantile(samples, q):
+        if not samples:
+            return 0.0
+        s = sorted(samples)
+        return s[min(int(len(s) * q), len(s) - 1)]
+
+    def expected(self, action):
+        """Typical capture -> decision latency of a path (median of the window)"""
+        return self._quantile(self.latency[action], 0.5)
+
+    @property
+    def size(self):
+        """Detector input side for the current level (None: detector default)"""
+        if not self.base_size or self.level == 0:
+            return None
+        return max(int(round(self.base_size * SIZE_STEPS[self.level] / SIZE_STRIDE)) * SIZE_STRIDE, SIZE_STRIDE)
+
+    # --- PER FRAME ---
+
+    def decide(self, captured, busy=False):
+        """
+        Action for a frame captured at `captured`. busy: a detection is still in flight
+        (a tracker-only frame would overtake it). Returns (action, input size or None).
+        """
+        action = DETECT
+        every = self.detect_every + self.extra_every if self.detect_every > 1 else 1
+        if every > 1 and self.since_detect + 1 < every:
+            action = TRACK
+        if self.adaptive:
+            age = self.clock.time() - captured
+            if age > self.deadline:
+                action = SKIP # late already, a newer frame can still make it
+            elif action == DETECT and every > 1 and age + self.expected(DETECT) > self.deadline \
+                    and age + self.expected(TRACK) <= self.deadline:
+                action = TRACK # tracking: the cheap path still makes it
+        if action == TRACK and busy:
+            action = SKIP
+        if action == DETECT:
+            self.since_detect = 0
+        elif action == TRACK:
+            self.since_detect += 1
+        self.decisions[action] += 1
+        return action, (self.size if action == DETECT else None)
+
+    def record(self, action, captured, decided):
+        """Completed DETECT / TRACK frame: capture time and time of the control decision"""
+        latency = decided - captured
+        self.latency[action].append(latency)
+        self.completed += 1
+        if latency > self.deadline:
+            self.misses += 1
+        if action == DETECT and self.adaptive:
+            self._adapt(decided)
+
+    def _adapt(self, now):
+        window = self.latency[DETECT]
+        if len(window) < MIN_SAMPLES or now - self.last_change < LEVEL_HOLD_S:
+            return
+        p90 = self._quantile(window, 0.9)
+        if p90 > DEGRADE_AT * self.deadline:
+            if self.base_size and self.level < len(SIZE_STEPS) - 1:
+                self._change(now, level=self.level + 1)
+            elif self.detect_every > 1 and self.detect_every + self.extra_every < MAX_DETECT_EVERY:
+                self._change(now, extra=self.extra_every + 1)
+        elif self.extra_every:
+            if p90 < RECOVER_AT * self.deadline:
+                self._change(now, extra=self.extra_every - 1)
+        elif self.level > 0:
+            # Inference cost ~ input area: predict the latency one level up
+            grow = (SIZE_STEPS[self.level - 1] / SIZE_STEPS[self.level]) ** 2
+            if p90 * grow < RECOVER_AT * self.deadline:
+                self._change(now, level=self.level - 1)
+
+    def _change(self, now, level=None, extra=None):
+        old = (self.size, self.extra_every)
+        if level is not None:
+            self.level = level
+        if extra is not None:
+            self.extra_every = extra
+        self.last_change = now
+        self.level_changes += 1
+        self.latency[DETECT].clear() # old samples describe the old setting
+        if level is not None:
+            print(f"[Scheduler] ⚖️ Detector input {old[0] or self.base_size} -> {self.size or self.base_size} px")
+        else:
+            print(f"[Scheduler] ⚖️ Tracker frames per detection {self.detect_every + old[1]} -> {self.detect_every + self.extra_every}")
+
+    # --- STATS ---
+
+    def get_stats(self):
+        total = sum(self.decisions.values())
+        return {'decisions': dict(self.decisions),
+                'misses': self.misses,
+                'miss_rate': self.misses / self.completed if self.completed else 0.0,
+                'skip_rate': self.decisions[SKIP] / total if total else 0.0,
+                'size': self.size or self.base_size,
+                'detect_every': self.detect_every + self.extra_every if self.detect_every > 1 else 1,
+                'level_changes': self.level_changes,
+                'detect_p50_ms': self.expected(DETECT) * 1000,
+                'track_p50_ms': self.expected(TRACK) * 1000}
+
+    def format_stats(self):
+        s = self.get_stats()
+        d = s['decisions']
+        return (f"deadline misses {s['misses']} ({s['miss_rate'] * 100:.1f}%) | detect {d.get(DETECT, 0)} "
+                f"track {d.get(TRACK, 0)} skip {d.get(SKIP, 0)} | input {s['size'] or '-'} px")
+
+
+# --- BENCHMARK ---
+
+class _LoadDetector:
+    """Stand-in network: infer time ~ input area, times a CPU-pressure factor that can change mid-run"""
+    imgsz = 320
+
+    def __init__(self, ms_at_320=60.0):
+        self.ms = ms_at_320
+        self.pressure = 1.0
+
+    def preprocess(self, frame, size=None, slot=0):
+        return (size or self.imgsz), None
+
+    def infer(self, size):
+        time.sleep(self.ms / 1000 * (size / self.imgsz) ** 2 * self.pressure)
+        return size
+
+    def postprocess(self, out, meta):
+        return []
+
+
+def benchmark(duration=8.0, fps=30.0, pressure=2.0):
+    """Capture -> decision misses against a 100 ms deadline, CPU pressure x2 halfway through"""
+    from frame_grabber import FrameGrabber, _BufferedStream
+    from vision_pipeline import VisionPipeline
+    print(f"stream {fps:.0f} fps, detector 60 ms at 320 px, x{pressure:.0f} after {duration / 2:.0f} s, "
+          f"deadline {CONTROL_DEADLINE_S * 1000:.0f} ms")
+    print(f"{'scheduler':<10} {'decisions/s':>11} {'misses':>7} {'p95 ms':>7} {'final input':>11}  decisions")
+    for adaptive in (False, True):
+        det = _LoadDetector()
+        grabber = FrameGrabber("synthetic", opener=lambda src: _BufferedStream(fps))
+        grabber.start()
+        sched = FrameScheduler(base_size=det.imgsz, adaptive=adaptive)
+        pipe = VisionPipeline(grabber, det, lambda f, d, c: None, scheduler=sched)
+        pipe.start()
+        time.sleep(duration / 2)
+        det.pressure = pressure
+        time.sleep(duration / 2)
+        pipe.stop()
+        grabber.stop()
+        lat = sorted(pipe.latency.samples) # last STATS_WINDOW decisions: the pressured half
+        s = sched.get_stats()
+        print(f"{'adaptive' if adaptive else 'fixed':<10} {pipe.latency.count / duration:>11.1f} "
+              f"{s['miss_rate'] * 100:>6.0f}% {lat[int(len(lat) * 0.95)] * 1000:>7.0f} {s['size']:>11}  {s['decisions']}")
+
+
+if __name__ == "__main__":
+    benchmark()
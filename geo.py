@@ -0,0 +1,28 @@
+import math
+
+# Flat-earth helpers shared by the planners / monitors.
+# Local frame = East/North meters around a reference point (equirectangular).
+# Over a few km the error is far below GPS noise.
+
+EARTH_R = 6371000.0  # meters
+
+def haversine(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2) * math.sin(dlambda/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_R * c
+
+def to_local(lat, lon, lat0, lon0):
+    """(lat, lon) -> (east, north) meters from (lat0, lon0)"""
+    x = math.radians(lon - lon0) * EARTH_R * math.cos(math.radians(lat0))
+    y = math.radians(lat - lat0) * EARTH_R
+    return (x, y)
+
+def to_global(x, y, lat0, lon0):
+    """(east, north) meters from (lat0, lon0) -> (lat, lon)"""
+    lat = lat0 + math.degrees(y / EARTH_R)
+    lon = lon0 + math.degrees(x / (EARTH_R * math.cos(math.radians(lat0))))
+    return (lat, lon)
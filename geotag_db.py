@@ -0,0 +1,315 @@
+"""
+Geotag database: SQLite (WAL) records plus JPEG evidence, written off the vision thread.
+
+    python geotag_db.py                           # benchmark: vision-thread cost per geotag
+    python geotag_db.py export out.geojson|.kml|.csv [--db geotags.db]
+
+record() / update() only queue work. One writer thread owns the database connection
+and applies rows in order; a small pool JPEG-encodes and writes evidence frames.
+Exports stream rows in batches from a separate read connection (WAL: no blocking).
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from xml.sax.saxutils import escape
+import cv2
+
+# --- CONFIGURATION ---
+DB_PATH = "geotags.db"
+EVIDENCE_DIR = "evidence"
+ENCODER_THREADS = 2        # JPEG encode + write workers (cv2 releases the GIL)
+MAX_PENDING_IMAGES = 16    # frames waiting for the encoders; beyond this the image is dropped, the row kept
+JPEG_QUALITY = 90
+EXPORT_BATCH = 500         # rows fetched per step while exporting
+FORMATS = ('geojson', 'kml', 'csv')
+EXTENSIONS = {'.geojson': 'geojson', '.json': 'geojson', '.kml': 'kml', '.csv': 'csv'}
+
+COLUMNS = ('uid', 'lat', 'lon', 'alt', 'time', 'drone_id', 'track_id', 'image_path', 'confidence', 'sightings')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geotags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT UNIQUE NOT NULL,
+    lat REAL NOT NULL, lon REAL NOT NULL, alt REAL,
+    time REAL NOT NULL,          -- unix time of the tag
+    drone_id INTEGER, track_id INTEGER,
+    image_path TEXT,             -- NULL: no evidence frame (dropped or write failed)
+    confidence REAL,
+    sightings INTEGER DEFAULT 1
+)"""
+
+_STOP = object()
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")   # readers (exports, GUI) never wait for the writer
+    conn.execute("PRAGMA synchronous=NORMAL") # durable at checkpoints, no fsync per row
+    conn.execute(SCHEMA)
+    conn.commit()
+    return conn
+
+
+class GeotagDB:
+    """Asynchronous geotag store; every public method returns without touching the disk"""
+    def __init__(self, path=DB_PATH, evidence_dir=EVIDENCE_DIR, encoders=ENCODER_THREADS):
+        self.path = path
+        self.evidence_dir = evidence_dir
+        self._rows = queue.Queue()    # SQL jobs, applied in order by one thread
+        self._images = queue.Queue()  # (path, frame, uid)
+        self._saved = {}              # uid -> (confidence, sightings) last queued
+        self._lock = threading.Lock()
+        self.pending_images = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        os.makedirs(evidence_dir, exist_ok=True)
+        self._conn = connect(path)    # created here so a bad path fails at startup, used by the writer only
+        self._threads = [threading.Thread(target=self._row_worker, daemon=True, name="GeotagDB")]
+        self._threads += [threading.Thread(target=self._image_worker, daemon=True, name=f"Evidence{i}")
+                          for i in range(encoders)]
+        for t in self._threads:
+            t.start()
+
+    # --- VISION THREAD SIDE ---
+
+    def record(self, tag, frame=None):
+        """New geotag (geotag_index.Geotag) with its evidence frame (BGR, copied)"""
+        image_path = None
+        if frame is not None:
+            with self._lock:
+                if self.pending_images < MAX_PENDING_IMAGES:
+                    self.pending_images += 1
+                    image_path = os.path.join(self.evidence_dir, f"geotag_d{tag.drone or 0}_{tag.uid[:8]}.jpg")
+                else:
+                    self.dropped += 1
+        row = (tag.uid, tag.lat, tag.lon, tag.alt, time.time(), tag.drone, tag.track, image_path,
+               tag.confidence, tag.sightings)
+        with self._lock:
+            self._saved[tag.uid] = (tag.confidence, tag.sightings)
+        self._rows.put((f"INSERT OR IGNORE INTO geotags ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", row))
+        if image_path:
+            # Queued after its row: a failed write's "image_path = NULL" lands after the insert
+            self._images.put((image_path, frame.copy(), tag.uid)) # the pipeline reuses frame buffers
+        return image_path
+
+    def update(self, tag):
+        """Confidence / sightings of a known tag changed (no-op when they did not)"""
+        state = (tag.confidence, tag.sightings)
+        with self._lock:
+            if self._saved.get(tag.uid) == state:
+                return
+            self._saved[tag.uid] = state
+        self._rows.put(("UPDATE geotags SET confidence = ?, sightings = ? WHERE uid = ?", (*state, tag.uid)))
+
+    # --- WORKERS ---
+
+    def _row_worker(self):
+        while True:
+            job = self._rows.get()
+            batch = [job]
+            while not self._rows.empty(): # one transaction for whatever piled up
+                batch.append(self._rows.get())
+            try:
+                for item in batch:
+                    if item is not _STOP:
+                        self._conn.execute(*item)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[GeotagDB] ❌ {e}")
+            for _ in batch:
+                self._rows.task_done()
+            if _STOP in batch:
+                return
+
+    def _image_worker(self):
+        while True:
+            job = self._images.get()
+            if job is _STOP:
+                self._images.task_done()
+                return
+            path, frame, uid = job
+            try:
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                if not ok:
+                    raise ValueError("JPEG encode failed")
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as fp:
+                    fp.write(buf.tobytes())
+                os.replace(tmp, path) # readers never see half a file
+                with self._lock: # ENCODER_THREADS workers count here
+                    self.written += 1
+                print(f"[GeotagDB] 💾 Saved evidence: {path}")
+            except (OSError, ValueError) as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[GeotagDB] ⚠️ Evidence {path} not written: {e}")
+                self._rows.put(("UPDATE geotags SET image_path = NULL WHERE uid = ?", (uid,)))
+            finally:
+                with self._lock:
+                    self.pending_images -= 1
+                self._images.task_done()
+
+    def flush(self):
+        """Blocks until everything queued so far is on disk (shutdown / exports / tests)"""
+        self._images.join()
+        self._rows.join()
+
+    def close(self):
+        self.flush()
+        for _ in self._threads[1:]:
+            self._images.put(_STOP)
+        self._rows.put(_STOP)
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._conn.close()
+
+    def count(self):
+        conn = connect(self.path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM geotags").fetchone()[0]
+        finally:
+            conn.close()
+
+
+# --- EXPORT (streaming) ---
+
+def iter_rows(path=DB_PATH, batch=EXPORT_BATCH):
+    """Geotag rows as dicts, oldest first, fetched batch by batch"""
+    conn = connect(path)
+    try:
+        cur = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM geotags ORDER BY time, id")
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                return
+            for r in rows:
+                yield dict(zip(COLUMNS, r))
+    finally:
+        conn.close()
+
+def _when(t):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+
+def write_geojson(rows, fp):
+    fp.write('{"type": "FeatureCollection", "features": [\n')
+    for i, r in enumerate(rows):
+        props = {k: r[k] for k in COLUMNS if k not in ('lat', 'lon', 'alt')}
+        props['time'] = _when(r['time'])
+        feature = {'type': 'Feature', 'properties': props,
+                   'geometry': {'type': 'Point', 'coordinates': [r['lon'], r['lat'], r['alt']]}}
+        fp.write((",\n" if i else "") + json.dumps(feature))
+    fp.write('\n]}\n')
+
+def write_kml(rows, fp):
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n'
+             '<name>Geotags</name>\n')
+    for r in rows:
+        desc = f"drone {r['drone_id']} track {r['track_id']} conf {r['confidence']:.2f} x{r['sightings']}"
+        if r['image_path']:
+            desc += f" {r['image_path']}"
+        fp.write(f"<Placemark><name>{escape(r['uid'][:8])}</name><description>{escape(desc)}</description>"
+                 f"<TimeStamp><when>{_when(r['time'])}</when></TimeStamp>"
+                 f"<Point><coordinates>{r['lon']},{r['lat']},{r['alt'] or 0}</coordinates></Point></Placemark>\n")
+    fp.write('</Document></kml>\n')
+
+def write_csv(rows, fp):
+    w = csv.writer(fp)
+    w.writerow(COLUMNS)
+    for r in rows:
+        w.writerow([_when(r['time']) if k == 'time' else r[k] for k in COLUMNS])
+
+WRITERS = {'geojson': write_geojson, 'kml': write_kml, 'csv': write_csv}
+
+def export(out_path, db_path=DB_PATH, fmt=None):
+    """Writes every geotag to out_path (format from the extension unless given); returns the row count"""
+    fmt = fmt or EXTENSIONS.get(os.path.splitext(out_path)[1].lower())
+    if fmt not in WRITERS:
+        raise ValueError(f"No export format for {out_path} (use .geojson / .kml / .csv or one of {', '.join(FORMATS)})")
+    n = 0
+    def counted():
+        nonlocal n
+        for r in iter_rows(db_path):
+            n += 1
+            yield r
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", newline="" if fmt == 'csv' else None) as fp:
+        WRITERS[fmt](counted(), fp)
+    os.replace(tmp, out_path)
+    return n
+
+
+# --- BENCHMARK ---
+
+def benchmark(tags=50):
+    """Vision-thread time per geotag: cv2.imwrite + sqlite insert inline vs GeotagDB.record()"""
+    import tempfile
+    import numpy as np
+    from geotag_index import GeotagIndex
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as d:
+        index = GeotagIndex()
+        new_tags = [index.add(12.97 + i * 1e-3, 77.59, 10.0, 0.8, 0.0, drone=1)[0] for i in range(tags)]
+
+        conn = connect(os.path.join(d, "sync.db"))
+        conn.execute("PRAGMA synchronous=FULL") # what an inline, per-row durable write costs
+        inline = []
+        for tag in new_tags:
+            t0 = time.perf_counter()
+            path = os.path.join(d, f"sync_{tag.uid}.jpg")
+            cv2.imwrite(path, frame)
+            conn.execute(f"INSERT INTO geotags ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                         (tag.uid, tag.lat, tag.lon, tag.alt, time.time(), 1, None, path, tag.confidence, 1))
+            conn.commit()
+            inline.append(time.perf_counter() - t0)
+        conn.close()
+
+        db = GeotagDB(os.path.join(d, "async.db"), os.path.join(d, "evidence"))
+        queued = []
+        for tag in new_tags:
+            t0 = time.perf_counter()
+            db.record(tag, frame)
+            queued.append(time.perf_counter() - t0)
+            time.sleep(0.005) # tags arrive over time, not in one burst
+        db.flush()
+        n = db.count()
+        out = os.path.join(d, "tags.geojson")
+        exported = export(out, db.path)
+        db.close()
+
+        ms = lambda v: f"p50 {np.percentile(v, 50) * 1000:6.2f} ms  max {max(v) * 1000:6.2f} ms"
+        print(f"inline imwrite + insert : {ms(inline)}")
+        print(f"GeotagDB.record (queued): {ms(queued)}")
+        print(f"rows {n}/{tags}, images written {db.written} dropped {db.dropped}, exported {exported} to GeoJSON "
+              f"({len(json.load(open(out))['features'])} features)")
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Geotag database export")
+    ap.add_argument("command", choices=["export"])
+    ap.add_argument("out", help="output file: .geojson / .kml / .csv")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--format", choices=FORMATS, default=None)
+    args = ap.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"[GeotagDB] ❌ No database at {args.db}")
+        return 1
+    try:
+        n = export(args.out, args.db, args.format)
+    except ValueError as e:
+        print(f"[GeotagDB] ❌ {e}")
+        return 2
+    print(f"[GeotagDB] ✅ {n} geotags -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+    benchmark()
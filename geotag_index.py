@@ -0,0 +1,129 @@
+import math
+import threading
+import time
+import uuid
+from geo import to_local, to_global
+
+# --- CONFIGURATION ---
+MERGE_RADIUS_M = 15.0      # a sighting this close to a tag is the same target (drone position, not target: camera looks ahead)
+SIGHTING_GAP_S = 5.0       # s without seeing a tag before the next sighting counts as new evidence
+
+
+class Geotag:
+    """One tagged target: position, fused confidence and how often it was seen"""
+    def __init__(self, tag_id, lat, lon, alt, east, north, confidence, timestamp, drone=None, track=None):
+        self.id = tag_id
+        self.uid = uuid.uuid4().hex # stable across sessions (database key)
+        self.lat, self.lon, self.alt = lat, lon, alt
+        self.east, self.north = east, north
+        self.confidence = confidence
+        self.sightings = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.drone = drone          # who tagged it
+        self.track = track          # tracker ID at tagging time
+
+    def observe(self, confidence, timestamp):
+        """Another look at the target. Separate sightings combine as independent evidence"""
+        if timestamp - self.last_seen > SIGHTING_GAP_S:
+            self.confidence = 1 - (1 - self.confidence) * (1 - confidence)
+            self.sightings += 1
+        else: # same pass over the target: keep the best view
+            self.confidence = max(self.confidence, confidence)
+        self.last_seen = timestamp
+
+
+class GeotagIndex:
+    """
+    Geotags hashed on a grid of MERGE_RADIUS_M cells in local metres (around the first tag),
+    so "is there a tag within the radius" only looks at the 3x3 neighbouring cells.
+    Thread-safe: one index can be shared by every pilot of the fleet.
+    """
+    def __init__(self, merge_radius=MERGE_RADIUS_M):
+        self.radius = merge_radius
+        self.origin = None       # (lat, lon) of the local frame
+        self.cells = {}          # (i, j) -> [Geotag]
+        self.tags = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tags)
+
+    def _local(self, lat, lon):
+        if self.origin is None:
+            self.origin = (lat, lon)
+        return to_local(lat, lon, *self.origin)
+
+    def _cell(self, east, north):
+        return (math.floor(east / self.radius), math.floor(north / self.radius))
+
+    def _nearest(self, east, north):
+        i, j = self._cell(east, north)
+        best, best_d = None, self.radius
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for tag in self.cells.get((i + di, j + dj), ()):
+                    d = math.hypot(tag.east - east, tag.north - north)
+                    if d <= best_d:
+                        best, best_d = tag, d
+        return best
+
+    def nearest(self, lat, lon):
+        """Tag within the merge radius of (lat, lon), or None"""
+        with self._lock:
+            if self.origin is None:
+                return None
+            return self._nearest(*self._local(lat, lon))
+
+    def observe(self, lat, lon, confidence, timestamp=None):
+        """Sighting at (lat, lon): updates and returns the tag there, None if the spot is new"""
+        with self._lock:
+            if self.origin is None:
+                return None
+            tag = self._nearest(*self._local(lat, lon))
+            if tag is not None:
+                tag.observe(confidence, time.time() if timestamp is None else timestamp)
+            return tag
+
+    def add(self, lat, lon, alt, confidence, timestamp=None, drone=None, track=None):
+        """Tags (lat, lon). Returns (tag, new): an existing tag within the radius absorbs the sighting"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            east, north = self._local(lat, lon)
+            tag = self._nearest(east, north)
+            if tag is not None:
+                tag.observe(confidence, timestamp)
+                return tag, False
+            tag = Geotag(len(self.tags) + 1, lat, lon, alt, east, north, confidence, timestamp, drone, track)
+            self.cells.setdefault(self._cell(east, north), []).append(tag)
+            self.tags.append(tag)
+            return tag, True
+
+
+# --- BENCHMARK ---
+
+def benchmark(n_tags=2000, queries=20000):
+    """Radius query: grid index vs scanning every tag with haversine"""
+    import random
+    from geo import haversine
+    rng = random.Random(0)
+    lat0, lon0 = 12.97, 77.59
+    index = GeotagIndex()
+    for _ in range(n_tags): # 2 km x 2 km search area
+        lat, lon = to_global(rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), lat0, lon0)
+        index.add(lat, lon, 10.0, 0.8, 0.0)
+    points = [to_global(rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), lat0, lon0) for _ in range(queries)]
+
+    t0 = time.perf_counter()
+    grid = [index.nearest(lat, lon) is not None for lat, lon in points]
+    grid_us = (time.perf_counter() - t0) / queries * 1e6
+    t0 = time.perf_counter()
+    scan = [any(haversine(lat, lon, t.lat, t.lon) <= index.radius for t in index.tags) for lat, lon in points[:queries // 20]]
+    scan_us = (time.perf_counter() - t0) / (queries // 20) * 1e6
+    agree = sum(a == b for a, b in zip(grid, scan)) / len(scan)
+    print(f"{len(index)} tags ({n_tags} added, merged within {index.radius:.0f} m)")
+    print(f"grid index {grid_us:7.1f} us/query | linear scan {scan_us:7.1f} us/query | agreement {agree * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, Listbox, Scrollbar
+from tkinter import ttk, messagebox, filedialog, Listbox, Scrollbar
 import tkintermapview
 from PIL import Image, ImageTk
 import time
@@ -34,6 +34,12 @@ BTN_DANGER = "#FF0000"     # Pure Red
 BTN_ACTION = "#00AAFF"     # Electric Blue
 BTN_WARN = "#FF6600"       # Safety Orange
 NUM_DRONES = 4             # Configurable Swarm Size
+MAX_WP_MARKERS = 150       # Above this, a mission is drawn as a path only (big surveys)
+MAX_PATH_POINTS = 2000     # Path polyline is decimated to this many points
+MAX_WP_LIST = 1000         # Listbox rows for the active drone
+MAX_INCREMENTAL_EDIT = 20  # Bigger inserts/removes redraw that drone's mission in one go
+PREWARM_VISION = True      # Import the vision stack (cv2, detectors) in the background once the UI is up
+PREWARM_DELAY_MS = 3000
 
 import math
 
@@ -243,9 +249,12 @@ class EKFBarWidget(tk.Canvas):
         self.create_text(self.width/2, self.height - 5, text=status_text, anchor="s",
                         font=("Arial", 10, "bold"), fill=status_color)
 
-from ai_pilot import AIPilot
 from backend import DroneBackend
 from mission import MissionManager
+import fleet_planner
+from separation import SeparationMonitor
+import formation
+from geotag_index import GeotagIndex
 
 class DroneApp(tk.Tk):
     def __init__(self):
@@ -255,12 +264,18 @@ class DroneApp(tk.Tk):
         self.startup_complete = False # Flag to prevent auto-events
         self.backends = {}
         self.mission_mgrs = {}
-        self.ai_pilots = {}
+        self.ai_pilots = {} # idx -> AIPilot, created on first use (vision imports are heavy)
+        self.geotag_index = GeotagIndex() # one set of tagged targets for the fleet: no drone re-tags a known one
         self.markers_drone = {} 
         self.wp_markers = {}
+        self.wp_paths = {} # idx -> map path object of that drone's mission
+        self.wp_listeners = {} # idx -> waypoint store listener (removed on delete)
         self.mission_tab_btns = {} # Store Overlay Tabs
         
         self.active_drone_idx = 1 # Will be set by add_new_drone
+        self.terrain = None # terrain.TerrainModel, loaded on first use
+        self.separation = SeparationMonitor(self.mission_mgrs) # Inter-drone spacing (all drones)
+        self.formation = None # formation.FormationController while flying in formation
         self.edit_mode_index = None 
         
         # Styles
@@ -285,6 +300,8 @@ class DroneApp(tk.Tk):
             try: self.state('zoomed')
             except: pass
         self.bind("<F11>", self.toggle_fullscreen)
+        self.bind("<Control-z>", self.undo_waypoints)
+        self.bind("<Control-y>", self.redo_waypoints)
         self.fullscreen_state = False
 
         # Load Icon reuse logic
@@ -317,6 +334,8 @@ class DroneApp(tk.Tk):
         
         self.startup_complete = True # Enable events
         self.update_loop()
+        if PREWARM_VISION:
+            self.after(PREWARM_DELAY_MS, lambda: threading.Thread(target=self.prewarm_vision, daemon=True).start())
 
     def add_new_drone(self):
         idx = len(self.backends) + 1
@@ -325,10 +344,15 @@ class DroneApp(tk.Tk):
         # Backend & Logic
         self.backends[idx] = DroneBackend(drone_id=idx)
         self.mission_mgrs[idx] = MissionManager(self.backends[idx])
-        self.ai_pilots[idx] = AIPilot(self.backends[idx], self.mission_mgrs[idx], self.update_video_feed, self.add_geotag_marker)
+        if hasattr(self, 'var_terrain') and self.var_terrain.get():
+            self.mission_mgrs[idx].terrain = self.terrain
+        self.separation.attach(idx, self.backends[idx])
         
         self.markers_drone[idx] = None
         self.wp_markers[idx] = []
+        self.wp_paths[idx] = None
+        self.wp_listeners[idx] = lambda store, event, i, count, idx=idx: self.on_waypoints_changed(idx, event, i, count)
+        self.mission_mgrs[idx].waypoints.add_listener(self.wp_listeners[idx])
         
         # UI: Add to Fleet List
         self.add_fleet_list_item(idx)
@@ -397,7 +421,24 @@ class DroneApp(tk.Tk):
         
     @property
     def ai_pilot(self):
-        return self.ai_pilots[self.active_drone_idx]
+        return self.get_ai_pilot(self.active_drone_idx)
+
+    def get_ai_pilot(self, idx):
+        """AIPilot of a drone, created (and the vision stack imported) on first use"""
+        if idx not in self.ai_pilots:
+            from ai_pilot import AIPilot # cv2 + detector runtime: only when AI is actually used
+            self.ai_pilots[idx] = AIPilot(self.backends[idx], self.mission_mgrs[idx], self.update_video_feed, self.add_geotag_marker,
+                                          geotags=self.geotag_index)
+        return self.ai_pilots[idx]
+
+    def prewarm_vision(self):
+        """Background import so the first AI toggle does not pay for it (runs after the UI is up)"""
+        t0 = time.time()
+        try:
+            import ai_pilot
+            print(f"[GUI] Vision stack pre-loaded in {time.time() - t0:.1f}s")
+        except ImportError as e:
+            print(f"[GUI] AI tracking unavailable: {e}")
 
     def shutdown(self):
         for b in self.backends.values():
@@ -566,11 +607,16 @@ class DroneApp(tk.Tk):
             except: pass
             del self.ai_pilots[idx]
         
-        # 2. Remove mission manager
+        # 2. Stop and remove mission manager (the mission scheduler still steps it otherwise)
         if idx in self.mission_mgrs:
+            mgr = self.mission_mgrs[idx]
+            mgr.stop_mission()
+            if idx in self.wp_listeners:
+                mgr.waypoints.remove_listener(self.wp_listeners.pop(idx))
             del self.mission_mgrs[idx]
         
-        # 3. Remove backend
+        # 3. Remove backend (and its separation monitoring)
+        self.separation.detach(idx, backend)
         del self.backends[idx]
         
         # 4. Remove map marker
@@ -580,12 +626,16 @@ class DroneApp(tk.Tk):
             except: pass
             del self.markers_drone[idx]
         
-        # 5. Remove waypoint markers
+        # 5. Remove waypoint markers and mission path
         if idx in self.wp_markers:
             for m in self.wp_markers[idx]:
                 try: m.delete()
                 except: pass
             del self.wp_markers[idx]
+        if self.wp_paths.get(idx) is not None:
+            try: self.wp_paths[idx].delete()
+            except: pass
+        self.wp_paths.pop(idx, None)
         
         # 6. Remove fleet widget (UI)
         if idx in self.fleet_widgets:
@@ -815,7 +865,7 @@ class DroneApp(tk.Tk):
         # Truncate loops to refresh Detail Panel immediately
         self.update_ui_stats()
         self.update_mission_header()
-        self.update_map_path()
+        self.refresh_wp_list() # markers of every drone are already on the map
         
         # Switch Log Tab
         if idx in self.log_widgets:
@@ -1036,7 +1086,7 @@ class DroneApp(tk.Tk):
         # Refresh Mission Header
 
         self.update_mission_header()
-        self.update_map_path()
+        self.refresh_wp_list()
         
 
 
@@ -1125,6 +1175,8 @@ class DroneApp(tk.Tk):
                              bg="#222f3e", fg="white", selectcolor="#222f3e", activebackground="#222f3e", activeforeground="white",
                              command=self.toggle_ai, font=("Arial", 9, "bold"))
         chk.pack(side="bottom", fill="x")
+        self.lbl_ai_status = tk.Label(video_outer, text="AI: OFF", bg="#222f3e", fg="gray", font=("Consolas", 8))
+        self.lbl_ai_status.pack(side="bottom", fill="x")
 
         # Redirect Prints... (Rest of function)
         import sys
@@ -1345,6 +1397,28 @@ class DroneApp(tk.Tk):
         ttk.Button(btn_frame, text="Edit ✎", width=8, command=self.start_edit_wp, style="HUD.TButton").pack(side="left", padx=2)
         ttk.Button(btn_frame, text="Clear 🗑", width=8, command=self.clear_mission_verify, style="HUDWarn.TButton").pack(side="right", padx=2)
         
+        # Fleet Split (Shared pool / survey polygon -> all connected drones)
+        self.btn_split = ttk.Button(self.overlay_frame, text="Split Fleet ⇶", command=self.split_mission_fleet, style="HUD.TButton")
+        self.btn_split.pack(pady=2, padx=5, fill="x")
+
+        # FORMATION: active drone leads, every other connected drone follows
+        form_frame = tk.Frame(self.overlay_frame, bg=SIDEBAR_COLOR)
+        form_frame.pack(pady=2, padx=5, fill="x")
+        self.var_formation_shape = tk.StringVar(value=formation.DEFAULT_SHAPE)
+        ttk.Combobox(form_frame, textvariable=self.var_formation_shape, values=formation.SHAPES, width=7, state="readonly").pack(side="left")
+        self.btn_formation = ttk.Button(form_frame, text="Formation ▶", command=self.toggle_formation, style="HUD.TButton")
+        self.btn_formation.pack(side="left", expand=True, fill="x")
+
+        undo_frame = tk.Frame(self.overlay_frame, bg=SIDEBAR_COLOR)
+        undo_frame.pack(pady=2, padx=5, fill="x")
+        ttk.Button(undo_frame, text="↶ Undo", command=self.undo_waypoints, style="HUD.TButton").pack(side="left", expand=True, fill="x")
+        ttk.Button(undo_frame, text="Redo ↷", command=self.redo_waypoints, style="HUD.TButton").pack(side="left", expand=True, fill="x")
+
+        io_frame = tk.Frame(self.overlay_frame, bg=SIDEBAR_COLOR)
+        io_frame.pack(pady=2, padx=5, fill="x")
+        ttk.Button(io_frame, text="Import Plan", command=self.import_mission_file, style="HUD.TButton").pack(side="left", expand=True, fill="x")
+        ttk.Button(io_frame, text="Export Plan", command=self.export_mission_file, style="HUD.TButton").pack(side="left", expand=True, fill="x")
+
         # Initial Mission Upload Button
         self.btn_upload = ttk.Button(self.overlay_frame, text="Upload Mission 📤", command=self.upload_mission, style="HUD.TButton")
         self.btn_upload.pack(pady=5, padx=5, fill="x")
@@ -1372,6 +1446,19 @@ class DroneApp(tk.Tk):
                                       bg=SIDEBAR_COLOR, fg=TEXT_COLOR, selectcolor=SIDEBAR_COLOR, activebackground=SIDEBAR_COLOR, activeforeground=TEXT_COLOR)
         self.chk_map.pack(pady=2, padx=5, fill="x")
 
+        # TERRAIN FOLLOW (ALT = height above ground, needs DEM tiles in terrain.DEM_DIR)
+        self.var_terrain = tk.BooleanVar(value=False)
+        self.chk_terrain = tk.Checkbutton(self.overlay_frame, text="Terrain Follow (DEM)", variable=self.var_terrain, command=self.toggle_terrain,
+                                          bg=SIDEBAR_COLOR, fg=TEXT_COLOR, selectcolor=SIDEBAR_COLOR, activebackground=SIDEBAR_COLOR, activeforeground=TEXT_COLOR)
+        self.chk_terrain.pack(pady=2, padx=5, fill="x")
+
+        # SEPARATION GUARD (auto-pause the give-way drone on a spacing breach; alerts always on)
+        self.var_sep_guard = tk.BooleanVar(value=self.separation.auto_pause)
+        self.chk_sep = tk.Checkbutton(self.overlay_frame, text="Separation Guard", variable=self.var_sep_guard,
+                                      command=lambda: setattr(self.separation, 'auto_pause', self.var_sep_guard.get()),
+                                      bg=SIDEBAR_COLOR, fg=TEXT_COLOR, selectcolor=SIDEBAR_COLOR, activebackground=SIDEBAR_COLOR, activeforeground=TEXT_COLOR)
+        self.chk_sep.pack(pady=2, padx=5, fill="x")
+
 
     def on_root_map(self, event):
         pass
@@ -1459,7 +1546,7 @@ class DroneApp(tk.Tk):
         
         # Refresh Mission View
         self.update_mission_header()
-        self.update_map_path()
+        self.refresh_wp_list()
         # Refresh Console
         self.refresh_console()
 
@@ -1523,8 +1610,7 @@ class DroneApp(tk.Tk):
              # ADD NEW
              self.mission_mgr.add_waypoint(lat, lon)
              print(f"[{self.backends[self.active_drone_idx].log_prefix}] Added WP: {lat:.5f}, {lon:.5f}")
-             
-        self.update_map_path()
+        # Map + list follow through the WaypointStore change event (on_waypoints_changed)
 
     def start_edit_wp(self):
         sel = self.wp_list.curselection()
@@ -1555,7 +1641,6 @@ class DroneApp(tk.Tk):
         if sel:
             idx = sel[0]
             self.mission_mgr.remove_waypoint(idx)
-            self.update_map_path()
             print(f"[{self.backends[self.active_drone_idx].log_prefix}] Deleted WP {idx}")
 
         else:
@@ -1567,55 +1652,214 @@ class DroneApp(tk.Tk):
 
     def clear_wps(self):
         self.mission_mgr.clear_waypoints()
-        self.update_map_path()
         print(f"[{self.backends[self.active_drone_idx].log_prefix}] Waypoints cleared.")
 
         
+    def import_mission_file(self):
+        path = filedialog.askopenfilename(title="Import Mission",
+                                          filetypes=[("Mission files", "*.plan *.waypoints *.txt"), ("All files", "*.*")])
+        if not path: return
+        try:
+            self.mission_mgr.load_mission_file(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import Mission", f"Could not read {path}:\n{e}")
+
+    def export_mission_file(self):
+        if not self.mission_mgr.waypoints:
+            messagebox.showinfo("Export Mission", "No waypoints to export.")
+            return
+        path = filedialog.asksaveasfilename(title="Export Mission", defaultextension=".plan",
+                                            filetypes=[("QGroundControl Plan", "*.plan"), ("Mission Planner WPL", "*.waypoints")])
+        if not path: return
+        try:
+            alt = float(self.entry_alt.get())
+        except (AttributeError, ValueError):
+            alt = 5.0
+        try:
+            self.mission_mgr.save_mission_file(path, altitude=alt)
+        except OSError as e:
+            messagebox.showerror("Export Mission", f"Could not write {path}:\n{e}")
+
+    def toggle_terrain(self):
+        if self.var_terrain.get():
+            if self.terrain is None:
+                from terrain import TerrainModel # numpy + DEM index only when needed
+                self.terrain = TerrainModel()
+            print("[GUI] Terrain following ENABLED")
+        else:
+            print("[GUI] Terrain following DISABLED")
+        for mgr in self.mission_mgrs.values():
+            mgr.terrain = self.terrain if self.var_terrain.get() else None
+
+    def toggle_formation(self):
+        if self.formation is not None:
+            self.formation.stop()
+            self.formation = None
+            self.btn_formation.config(text="Formation ▶")
+            return
+        leader = self.backends[self.active_drone_idx]
+        followers = [b for idx, b in sorted(self.backends.items()) if idx != self.active_drone_idx and b.connected]
+        if not leader.connected or not followers:
+            messagebox.showinfo("Formation", "Needs the active drone (leader) and at least one more connected drone.")
+            return
+        self.formation = formation.FormationController(leader, followers, shape=self.var_formation_shape.get())
+        self.formation.start()
+        self.btn_formation.config(text="Formation ■")
+
+    def split_mission_fleet(self):
+        # Shared pool = waypoints of ALL drones. A polygon (>=3 points on the active drone) can be surveyed instead.
+        pool = []
+        for idx in sorted(self.mission_mgrs):
+            pool.extend(self.mission_mgrs[idx].waypoints)
+        if not pool:
+            messagebox.showinfo("Split Fleet", "Add waypoints first.")
+            return
+
+        polygon = None
+        active_wps = list(self.mission_mgr.waypoints)
+        if len(active_wps) >= 3:
+            ans = messagebox.askyesnocancel("Split Fleet", "Treat the active drone's waypoints as a SURVEY POLYGON?\n\n"
+                                                           "Yes = survey area, No = split waypoints as-is")
+            if ans is None: return
+            if ans: polygon = active_wps
+
+        if polygon:
+            result = fleet_planner.assign_to_fleet(self.mission_mgrs, polygon=polygon)
+        else:
+            result = fleet_planner.assign_to_fleet(self.mission_mgrs, waypoints=pool)
+
+        if not result:
+            messagebox.showerror("Split Fleet", "No connected drones with a GPS position.")
+            return
+        # Drones left out of the split (offline) gave their points to the pool
+        for idx, mgr in self.mission_mgrs.items():
+            if idx not in result:
+                mgr.clear_waypoints()
+
     def update_map_path(self):
-        # Clear paths BUT we want to redraw them
+        # Full redraw (all drones). Single edits go through on_waypoints_changed instead.
         self.map_view.delete_all_path()
+        self.wp_paths.clear()
         
-        # Clear Markers for ALL drones
-        for idx, markers in self.wp_markers.items():
-            for m in markers:
-                m.delete()
-            markers.clear()
-            
         # Draw Missions for ALL Drones
-        for idx, mgr in self.mission_mgrs.items():
-             waypoints = mgr.waypoints
-             coords = []
-             # Drone 0 (ID 1) = Cyan, Drone 1 (ID 2) = Magenta
-             color_path = "cyan" if idx == 1 else "magenta"
-             color_marker = "green" if idx == 1 else "orange"
-             
-             prefix = f"D{idx-1}"
-             
-             for i, (lat, lon) in enumerate(waypoints):
-                 # Add Marker
-                 label = f"{prefix}:{i}" 
-                 m = self.map_view.set_marker(lat, lon, text=label, marker_color_circle=color_marker)
-                 self.wp_markers[idx].append(m)
-                 coords.append((lat, lon))
-                 
-             # Draw Path Line
-             if len(coords) > 1:
-                 self.map_view.set_path(coords, color=color_path)
+        for idx in self.mission_mgrs:
+             self.redraw_drone_mission(idx, paths_cleared=True)
 
-        # Update Listbox ONLY for ACTIVE drone
-        self.wp_list.delete(0, 'end')
-        try:
-            active_waypoints = self.mission_mgrs[self.active_drone_idx].waypoints
-            for i, (lat, lon) in enumerate(active_waypoints):
-                 self.wp_list.insert('end', f"{i}: {lat:.5f}, {lon:.5f}")
-        except KeyError:
-            # Active drone might be deleted, just skip listing waypoints
-            pass
+        self.refresh_wp_list()
 
         # Re-draw Trace Path (Red Line)
         if self.trace_path:
              self.map_view.set_path(self.trace_path, color="red")
-        
+
+    def _wp_style(self, idx):
+        # Drone 0 (ID 1) = Cyan path / green markers, others = Magenta / orange
+        return ("cyan", "green") if idx == 1 else ("magenta", "orange")
+
+    def redraw_drone_mission(self, idx, paths_cleared=False):
+        for m in self.wp_markers[idx]:
+            m.delete()
+        self.wp_markers[idx].clear()
+        if not paths_cleared and self.wp_paths.get(idx) is not None:
+            self.wp_paths[idx].delete()
+        self.wp_paths[idx] = None
+
+        waypoints = self.mission_mgrs[idx].waypoints
+        _, color_marker = self._wp_style(idx)
+        prefix = f"D{idx-1}"
+        n = len(waypoints)
+        # Big (imported / survey) missions: one marker per WP would stall Tk, start/end only
+        shown = range(n) if n <= MAX_WP_MARKERS else ((0, n - 1) if n else ())
+        for i in shown:
+            lat, lon = waypoints[i]
+            m = self.map_view.set_marker(lat, lon, text=f"{prefix}:{i}", marker_color_circle=color_marker)
+            self.wp_markers[idx].append(m)
+        self._update_drone_path(idx)
+
+    def _update_drone_path(self, idx):
+        waypoints = self.mission_mgrs[idx].waypoints
+        n = len(waypoints)
+        if n > MAX_PATH_POINTS:
+            step = -(-n // MAX_PATH_POINTS) # ceil
+            coords = waypoints[::step]
+            if (n - 1) % step: coords.append(waypoints[n - 1])
+        else:
+            coords = list(waypoints)
+
+        path = self.wp_paths.get(idx)
+        if len(coords) < 2:
+            if path is not None:
+                path.delete()
+                self.wp_paths[idx] = None
+        elif path is None:
+            self.wp_paths[idx] = self.map_view.set_path(coords, color=self._wp_style(idx)[0])
+        else:
+            path.set_position_list(coords)
+
+    def on_waypoints_changed(self, idx, event, i, count):
+        """WaypointStore listener: patch only the affected markers / rows"""
+        if threading.current_thread() is not threading.main_thread():
+            self.after(0, lambda: self.on_waypoints_changed(idx, event, i, count))
+            return
+        if idx not in self.mission_mgrs:
+            return
+        waypoints = self.mission_mgrs[idx].waypoints
+        markers = self.wp_markers[idx]
+        n = len(waypoints)
+        # Per-WP markers only while the mission is small, and only for small edits
+        before = n - count if event == 'inserted' else n + count if event == 'removed' else n
+        per_wp = n <= MAX_WP_MARKERS and before <= MAX_WP_MARKERS and len(markers) == before
+
+        if event in ('inserted', 'removed') and (not per_wp or count > MAX_INCREMENTAL_EDIT):
+            self.redraw_drone_mission(idx)
+        elif event == 'inserted':
+            _, color_marker = self._wp_style(idx)
+            for k in range(i, i + count):
+                lat, lon = waypoints[k]
+                markers.insert(k, self.map_view.set_marker(lat, lon, text=f"D{idx-1}:{k}", marker_color_circle=color_marker))
+            self._relabel_markers(idx, i + count)
+            self._update_drone_path(idx)
+        elif event == 'removed':
+            for m in markers[i:i + count]:
+                m.delete()
+            del markers[i:i + count]
+            self._relabel_markers(idx, i)
+            self._update_drone_path(idx)
+        elif event == 'moved':
+            if per_wp:
+                markers[i].set_position(*waypoints[i])
+            elif i in (0, n - 1):
+                self.redraw_drone_mission(idx)
+            self._update_drone_path(idx)
+
+        if idx == self.active_drone_idx:
+            self.refresh_wp_list(i)
+
+    def _relabel_markers(self, idx, start):
+        for k in range(start, len(self.wp_markers[idx])):
+            self.wp_markers[idx][k].set_text(f"D{idx-1}:{k}")
+
+    def refresh_wp_list(self, start=0):
+        # Listbox shows the ACTIVE drone only. Rows before `start` are unchanged.
+        mgr = self.mission_mgrs.get(self.active_drone_idx)
+        start = min(start, MAX_WP_LIST) # rows past the cap are the "... N more" line
+        self.wp_list.delete(start, 'end')
+        if mgr is None:
+            return # Active drone might be deleted
+        waypoints = mgr.waypoints
+        rows = [f"{i}: {lat:.5f}, {lon:.5f}" for i, (lat, lon) in enumerate(waypoints[start:MAX_WP_LIST], start)]
+        if len(waypoints) > MAX_WP_LIST:
+            rows.append(f"... {len(waypoints) - MAX_WP_LIST} more")
+        if rows:
+            self.wp_list.insert('end', *rows)
+
+    def undo_waypoints(self, event=None):
+        if not self.mission_mgr.undo():
+            print(f"{self.backends[self.active_drone_idx].log_prefix} Nothing to undo.")
+
+    def redo_waypoints(self, event=None):
+        if not self.mission_mgr.redo():
+            print(f"{self.backends[self.active_drone_idx].log_prefix} Nothing to redo.")
+
     def do_takeoff(self):
         try:
             alt = float(self.entry_alt.get())
@@ -1673,14 +1917,39 @@ class DroneApp(tk.Tk):
     # --- AI PILOT INTEGRATION ---
     def toggle_ai(self):
         enabled = self.var_ai_enable.get()
-        self.ai_pilot.enabled = enabled
+        if not enabled and self.active_drone_idx not in self.ai_pilots:
+            print("[GUI] Swarm AI DISABLED")
+            return
+        try:
+            self.ai_pilot.enabled = enabled
+        except ImportError as e:
+            print(f"[GUI] ❌ AI tracking unavailable: {e}")
+            self.var_ai_enable.set(False)
+            return
         if enabled:
             if not self.ai_pilot.running:
-                self.ai_pilot.start()
+                self.ai_pilot.start() # returns at once, see update_ai_status for readiness
             print("[GUI] Swarm AI ENABLED")
         else:
             print("[GUI] Swarm AI DISABLED")
 
+    AI_STATUS_COLORS = {"IDLE": "gray", "LOADING": "#f39c12", "WARMING": "#f39c12",
+                        "CONNECTING": "#f39c12", "READY": "#2ecc71", "ERROR": "#e74c3c"}
+
+    def update_ai_status(self):
+        if not hasattr(self, 'lbl_ai_status'):
+            return
+        pilot = self.ai_pilots.get(self.active_drone_idx)
+        status = pilot.status if pilot else "IDLE"
+        text = f"AI: {status}" if status != "IDLE" else "AI: OFF"
+        if pilot and pilot.status_detail:
+            text += f" ({pilot.status_detail})"
+        if status == "READY" and pilot.first_result_s is not None:
+            text += f" | first detection {pilot.first_result_s:.1f}s"
+        text = text[:60]
+        if self.lbl_ai_status.cget("text") != text:
+            self.lbl_ai_status.config(text=text, fg=self.AI_STATUS_COLORS.get(status, "gray"))
+
     def update_video_feed(self, frame_rgb):
         try:
             img = Image.fromarray(frame_rgb)
@@ -1801,6 +2070,9 @@ class DroneApp(tk.Tk):
         except Exception as e:
              pass
 
+        # AI readiness (AIPilot.start() loads in the background)
+        self.update_ai_status()
+
         # Flash Emergency if ANY drone has critical error
         if has_critical_error:
              self.flash_emergency(True, msg=critical_msg)
@@ -0,0 +1,234 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+# --- CONFIGURATION ---
+BATCH_WINDOW_S = 0.008     # s, how long the first request waits for others to join its batch
+MAX_BATCH = 8              # requests per forward pass
+
+
+class InferenceServer:
+    """
+    One model for the whole GCS process, shared by every drone's AIPilot.
+    Requests arriving within BATCH_WINDOW_S of each other go through a single
+    infer_batch() call (one forward pass where the backend has a batch axis, and
+    never several models fighting over the same cores where it does not).
+    Each pilot keeps its own pre/post processing; only infer() is shared.
+    Requests already queued always join the batch; otherwise a batch closes early once
+    every registered client is in it (a lone drone never waits out the window).
+    """
+    def __init__(self, detector, window=BATCH_WINDOW_S, max_batch=MAX_BATCH):
+        self.detector = detector
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Counter()
+        self.busy_s = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True, name="inference-server")
+        self.thread.start()
+        print(f"[Inference] 🧠 Shared {getattr(self.detector, 'name', 'detector')} server "
+              f"(window {self.window * 1000:.0f} ms, batch <= {self.max_batch})")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        # Fail whatever is still waiting
+        while True:
+            try:
+                _, _, fut = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            fut.set_exception(RuntimeError("inference server stopped"))
+
+    def submit(self, blob, client=None):
+        """Queues one preprocessed input. Returns a Future with the raw head output."""
+        fut = Future()
+        self.requests.put((client, blob, fut))
+        return fut
+
+    def client(self, name=None):
+        with self.lock:
+            name = name or f"client-{len(self.clients) + 1}"
+            while name in self.clients:
+                name += "'"
+            self.clients.add(name)
+        return SharedDetector(self, name)
+
+    def release(self, name):
+        with self.lock:
+            self.clients.discard(name)
+
+    # --- BATCHING ---
+
+    def _collect(self):
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.requests.get_nowait()) # e.g. the other tiles of a frame
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or len(batch) >= max(len(self.clients), 1):
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            # Inputs can only be stacked when they share a shape
+            groups = {}
+            for req in batch:
+                groups.setdefault(getattr(req[1], 'shape', None), []).append(req)
+            for reqs in groups.values():
+                t0 = time.perf_counter()
+                try:
+                    outs = self.detector.infer_batch([blob for _, blob, _ in reqs])
+                    for (_, _, fut), out in zip(reqs, outs):
+                        fut.set_result(out)
+                except Exception as e:
+                    print(f"[Inference] 💥 Batch of {len(reqs)} failed: {e}")
+                    for _, _, fut in reqs:
+                        fut.set_exception(e)
+                self.busy_s += time.perf_counter() - t0
+                self.batches += 1
+                self.items += len(reqs)
+                self.batch_sizes[len(reqs)] += 1
+
+    def get_stats(self):
+        return {'batches': self.batches, 'items': self.items,
+                'mean_batch': self.items / self.batches if self.batches else 0.0,
+                'batch_sizes': dict(self.batch_sizes), 'busy_s': self.busy_s}
+
+
+class SharedDetector:
+    """
+    Detector-shaped client of an InferenceServer: drop-in for VisionPipeline.
+    preprocess / postprocess run on the caller's threads, infer() goes to the server.
+    """
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+
+    @property
+    def imgsz(self):
+        return self.server.detector.imgsz
+
+    @property
+    def iou(self):
+        return self.server.detector.iou
+
+    @property
+    def resizable(self):
+        return self.server.detector.resizable
+
+    def preprocess(self, frame, size=None, slot=0):
+        return self.server.detector.preprocess(frame, size, slot)
+
+    def infer(self, blob):
+        return self.server.submit(blob, self.name).result()
+
+    def infer_batch(self, blobs):
+        futures = [self.server.submit(b, self.name) for b in blobs] # all queued before waiting: one batch
+        return [f.result() for f in futures]
+
+    def postprocess(self, out, meta):
+        return self.server.detector.postprocess(out, meta)
+
+    def detect(self, frame):
+        blob, meta = self.preprocess(frame)
+        return self.postprocess(self.infer(blob), meta)
+
+    def close(self):
+        self.server.release(self.name)
+
+
+# --- BENCHMARK ---
+
+class _MatmulDetector:
+    """
+    CPU-bound stand-in for a network: one dense layer over the input. Like a real
+    model, a batched call reads the weights once for every input in the batch.
+    """
+    name = "matmul"
+
+    def __init__(self, n_in=4096, n_out=4096, seed=0):
+        import numpy as np
+        self.np = np
+        self.w = np.random.default_rng(seed).standard_normal((n_in, n_out), dtype=np.float32)
+
+    def preprocess(self, frame, size=None, slot=0):
+        return frame, None
+
+    def infer(self, blob):
+        return blob @ self.w
+
+    def infer_batch(self, blobs):
+        return list(self.np.stack(blobs) @ self.w)
+
+    def postprocess(self, out, meta):
+        return out
+
+    def detect(self, frame):
+        return self.infer(frame)
+
+
+def benchmark(drones=(1, 2, 4, 8), duration=2.0):
+    """Total frames/s with N drones: one model per pilot vs the shared batched server"""
+    import numpy as np
+    frame = np.ones(4096, dtype=np.float32)
+
+    def drive(detectors_):
+        count = [0] * len(detectors_)
+        stop = time.perf_counter() + duration
+
+        def worker(i, det):
+            while time.perf_counter() < stop:
+                det.detect(frame)
+                count[i] += 1
+        threads = [threading.Thread(target=worker, args=(i, d)) for i, d in enumerate(detectors_)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        return sum(count) / duration
+
+    model_mb = _MatmulDetector().w.nbytes / 1e6
+    print(f"stand-in model {model_mb:.0f} MB, {duration:.0f} s per run; fps = drones x per-drone fps")
+    print(f"{'drones':>6} {'own fps':>9} {'own MB':>7} {'shared fps':>11} {'shared MB':>10} {'mean batch':>11}")
+    for n in drones:
+        own_fps = drive([_MatmulDetector() for _ in range(n)])
+        server = InferenceServer(_MatmulDetector())
+        server.start()
+        shared_fps = drive([server.client() for _ in range(n)])
+        server.stop()
+        stats = server.get_stats()
+        print(f"{n:>6} {own_fps:>9.1f} {n * model_mb:>7.0f} {shared_fps:>11.1f} {model_mb:>10.0f} {stats['mean_batch']:>11.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,13 +1,69 @@
-import time
+import math
+import threading
 from pymavlink import mavutil
+from geo import haversine, to_local, to_global
+from clock import get_clock
+from waypoint_store import WaypointStore, ACTION_NONE, ACTION_DROP, ACTION_HOVER
+
+# --- GUIDED MISSION PHASES ---
+PHASE_IDLE = "IDLE"
+PHASE_SET_GUIDED = "SET_GUIDED"
+PHASE_ARMING = "ARMING"
+PHASE_TAKEOFF = "TAKEOFF"
+PHASE_WAYPOINT = "WAYPOINT"
+PHASE_PAUSED = "PAUSED"
+PHASE_RESUMING = "RESUMING"
+PHASE_COMPLETE = "COMPLETE"
+PHASE_ABORTED = "ABORTED"
+
+# --- GUIDED MISSION TIMING ---
+GUIDED_TIMEOUT = 5.0    # s, mode change confirmation
+ARM_TIMEOUT = 10.0      # s, arming confirmation
+CLIMB_TIMEOUT = 25.0    # s, takeoff climb
+TAKEOFF_RESEND = 3.0    # s, resend TAKEOFF while still on the ground
+GOTO_RESEND = 2.0       # s, resend current target (packet loss / mode enforcement)
+STOP_RESEND = 1.0       # s, resend zero velocity while paused
+RESUME_BURST = 3        # target resends after CONTINUE
+WP_RADIUS = 2.0         # m, waypoint acceptance radius
+SCHEDULER_MAX_WAIT = 0.5 # s, upper bound on scheduler sleep (safety net if events stop)
+
+# --- WAYPOINT BLENDING ---
+# "off"       : fly to within WP_RADIUS of every waypoint (vehicle stops at each one)
+# "lookahead" : switch to the next waypoint early, radius grows with ground speed
+# "carrot"    : stream a position setpoint that runs ahead of the vehicle along the path
+BLEND_MODE = "carrot"
+LOOKAHEAD_TIME = 1.5    # s of travel used to size the switch radius / carrot distance
+BLEND_MIN_DIST = 3.0    # m
+BLEND_MAX_DIST = 15.0   # m
+CARROT_RATE = 5.0       # Hz, setpoint stream rate in carrot mode
 
 class MissionManager:
     """
     Handles Mission creation and upload.
     """
-    def __init__(self, backend):
+    def __init__(self, backend, clock=None, scheduler=None):
         self.backend = backend
-        self.waypoints = [] # List of (lat, lon)
+        self.clock = clock or get_clock()
+        self.scheduler = scheduler # None = process-wide get_scheduler()
+        self.waypoints = WaypointStore() # (lat, lon) sequence, columnar (+ per-WP alt/speed/action, undo)
+
+        # Guided Mission State (see PHASE_*)
+        self.phase = PHASE_IDLE
+        self.phase_label = PHASE_IDLE
+        self.phase_started = 0
+        self.phase_durations = [] # [(phase, seconds)] for the current/last mission
+        self.altitude = 5.0
+        self.wp_alts = [] # Per-waypoint relative altitude for the running mission
+        self.terrain = None # terrain.TerrainModel -> hold constant height above ground
+        self.wp_index = 0
+        self.leg_start = None # (lat, lon) where the current leg began
+        self.blend_mode = BLEND_MODE
+        self.paused = False
+        self.resumed_flag = False
+        self.last_sent = 0
+        self.last_log = 0
+        self.sent_count = 0
+        self.mission_start_time = 0
 
     def add_waypoint(self, lat, lon):
         self.waypoints.append((lat, lon))
@@ -17,12 +73,58 @@ class MissionManager:
             self.waypoints.pop(index)
         
     def clear_waypoints(self):
-        self.waypoints = []
+        self.waypoints.clear()
 
     def edit_waypoint(self, index, lat, lon):
         if 0 <= index < len(self.waypoints):
             self.waypoints[index] = (lat, lon)
+
+    def set_waypoints(self, points):
+        """Replaces the whole list of (lat, lon) as one undo step"""
+        self.waypoints.replace(points)
+
+    def undo(self):
+        return self.waypoints.undo()
+
+    def redo(self):
+        return self.waypoints.redo()
         
+    def load_mission_file(self, path):
+        """Replaces the waypoints with a QGC .plan / WPL 110 file. Returns the count."""
+        import mission_io
+        loaded = mission_io.load_mission(path) # parse fully before touching the current mission
+        with self.waypoints.transaction():
+            self.waypoints.clear()
+            self.waypoints.extend_columns(loaded.lat, loaded.lon, loaded.alt, loaded.speed, loaded.action)
+        print(f"{self.backend.log_prefix} [Mission] 📂 Loaded {len(self.waypoints)} waypoints from {path}")
+        return len(self.waypoints)
+
+    def save_mission_file(self, path, altitude=5.0):
+        import mission_io
+        s = self.backend.state
+        home = (s['home_lat'], s['home_lon']) if s.get('home_lat') is not None else None
+        mission_io.save_mission(path, self.waypoints, self.waypoint_altitudes(altitude), home)
+        print(f"{self.backend.log_prefix} [Mission] 💾 Saved {len(self.waypoints)} waypoints to {path}")
+
+    def waypoint_altitudes(self, altitude):
+        """
+        Relative (to home) altitude for every waypoint.
+        Flat `altitude` unless a TerrainModel is set, then `altitude` is height above ground.
+        Altitudes stored on the waypoints themselves (imported plans) always win.
+        """
+        s = self.backend.state
+        alts = None
+        if self.terrain is not None and s.get('home_lat') is not None:
+            try:
+                alts = self.terrain.relative_altitudes(self.waypoints, altitude, (s['home_lat'], s['home_lon']))
+            except Exception as e: # unreadable DEM tile: fly flat rather than fail the upload
+                print(f"{self.backend.log_prefix} [Terrain] ⚠️ Elevation lookup failed ({e}). Using flat altitude.")
+        if alts is None:
+            alts = [altitude] * len(self.waypoints)
+        if self.waypoints.has_altitudes():
+            alts = [a if math.isnan(w) else w for a, w in zip(alts, self.waypoints.alt)]
+        return alts
+
     def upload_mission(self, altitude=5.0):
         if not self.backend.master:
             print(f"{self.backend.log_prefix} [Mission] Backend not connected.")
@@ -71,12 +173,13 @@ class MissionManager:
             int(altitude),
             mavutil.mavlink.MAV_MISSION_TYPE_MISSION
         )
-        time.sleep(0.05)
+        self.clock.sleep(0.05)
 
         # 4. Send Waypoints (Seq 1..N)
+        wp_alts = self.waypoint_altitudes(altitude)
         for i, (lat, lon) in enumerate(self.waypoints):
             seq = i + 1
-            print(f"{self.backend.log_prefix} [Mission] Sending WP {seq}: {lat}, {lon}")
+            print(f"{self.backend.log_prefix} [Mission] Sending WP {seq}: {lat}, {lon} @ {wp_alts[i]:.1f}m")
             self.backend.master.mav.mission_item_int_send(
 
                 self.backend.master.target_system, 
@@ -88,10 +191,10 @@ class MissionManager:
                 0, 0, 0, 0,
                 int(lat * 1e7),
                 int(lon * 1e7),
-                int(altitude), # Maintain mission altitude
+                wp_alts[i], # Mission altitude (terrain-adjusted if enabled)
                 mavutil.mavlink.MAV_MISSION_TYPE_MISSION
             )
-            time.sleep(0.05)
+            self.clock.sleep(0.05)
             
         # 5. Send Land (Seq N+1)
         seq_land = len(self.waypoints) + 1
@@ -113,11 +216,14 @@ class MissionManager:
         )
         
     # --- GUIDED MODE EXECUTION ---
-    
-    def execute_guided_mission(self, altitude=5.0):
+    # The guided mission is an explicit state machine (see PHASE_*). It does not own a thread:
+    # the shared MissionScheduler calls step() whenever this drone's telemetry changes
+    # (mode / armed / position events) or a resend/timeout deadline is due.
+
+    def execute_guided_mission(self, altitude=5.0, blend_mode=None):
         """
-        Executes the mission using GUIDED mode commands in a separate thread.
-        Moves to each waypoint sequentially.
+        Executes the mission using GUIDED mode commands.
+        Moves to each waypoint sequentially (driven by the fleet MissionScheduler).
         """
         # --- PRE-FLIGHT CHECKS ---
         if not self.backend.master:
@@ -138,145 +244,294 @@ class MissionManager:
              print("[Mission] ❌ Home position not set. Aborting.")
              return
 
-        import threading
-        t = threading.Thread(target=self._run_guided_mission, args=(altitude,), daemon=True)
-        t.start()
-        
-    def _run_guided_mission(self, altitude):
-        try:
-            print(f"{self.backend.log_prefix} [Mission] ▶️ STARTING MISSION with {len(self.waypoints)} Waypoints")
+        print(f"{self.backend.log_prefix} [Mission] ▶️ STARTING MISSION with {len(self.waypoints)} Waypoints")
+        self.altitude = altitude
+        self.wp_alts = self.waypoint_altitudes(altitude)
+        self.blend_mode = blend_mode or BLEND_MODE
+        self.wp_index = 0
+        self.paused = False
+        self.resumed_flag = False
+        self.phase_durations = []
+        self.mission_start_time = self.clock.time()
+        self.phase = PHASE_IDLE
+        self._enter(PHASE_SET_GUIDED)
 
-            
-            # 1. Set Mode GUIDED
+        self.backend.add_listener(self._on_telemetry)
+        self._scheduler().add(self)
+
+    def _scheduler(self):
+        return self.scheduler or get_scheduler()
+
+    @property
+    def active(self):
+        return self.phase not in (PHASE_IDLE, PHASE_COMPLETE, PHASE_ABORTED)
+
+    def _on_telemetry(self, backend, event):
+        if event in ('mode', 'armed', 'position'):
+            self._scheduler().notify()
+
+    def _enter(self, phase):
+        """Phase transition + duration log"""
+        now = self.clock.time()
+        if self.phase != PHASE_IDLE:
+            dt = now - self.phase_started
+            self.phase_durations.append((self.phase_label, dt))
+            print(f"{self.backend.log_prefix} [Mission] ⏱️ {self.phase_label} took {dt:.1f}s -> {phase}")
+        prev_phase = self.phase
+        self.phase = phase
+        self.phase_label = f"WP{self.wp_index+1}" if phase == PHASE_WAYPOINT else phase
+        self.phase_started = now
+        self.last_sent = 0
+        self.last_log = 0
+        self.sent_count = 0
+
+        if phase == PHASE_SET_GUIDED:
             print(f"{self.backend.log_prefix} [Mission] Switching to GUIDED...")
             self.backend.set_mode("GUIDED")
+        elif phase == PHASE_ARMING:
+            print("[Mission] 🛡️ Arming...")
+            self.backend.arm_disarm(True)
+        elif phase == PHASE_TAKEOFF:
+            print(f"[Mission] 🛫 Taking off to {self.altitude}m...")
+            self.backend.takeoff(self.altitude)
+            self.last_sent = now
+        elif phase == PHASE_WAYPOINT:
+            # Leg starts at the previous WP when chaining, else wherever the vehicle is now
+            if prev_phase == PHASE_WAYPOINT and self.wp_index > 0:
+                self.leg_start = self.waypoints[self.wp_index - 1]
+            else:
+                self.leg_start = (self.backend.state['lat'], self.backend.state['lon'])
+            lat, lon = self.waypoints[self.wp_index]
+            print(f"[Mission] 📍 Heading to WP {self.wp_index+1}/{len(self.waypoints)}...")
+            speed = self.waypoints.speed[self.wp_index]
+            if not math.isnan(speed):
+                self.backend.set_speed(float(speed))
+            self._send_goto(lat, lon, self.wp_alts[self.wp_index])
+            self.last_sent = now
+        elif phase in (PHASE_COMPLETE, PHASE_ABORTED):
+            self.backend.remove_listener(self._on_telemetry)
+            total = now - self.mission_start_time
+            summary = ", ".join(f"{p}={d:.1f}s" for p, d in self.phase_durations)
+            print(f"{self.backend.log_prefix} [Mission] {phase} after {total:.1f}s ({summary})")
+            if phase == PHASE_COMPLETE:
+                self._on_mission_complete()
 
-            
-            # Verify Mode Change
-            timeout = time.time() + 5
-            while time.time() < timeout:
-                 if self.backend.state['mode'] == 'GUIDED':
-                     break
-                 time.sleep(0.2)
-                 
-            if self.backend.state['mode'] != 'GUIDED':
-                 print("[Mission] ❌ Failed to enter GUIDED mode. Aborting.")
-                 return
+    def step(self, now=None):
+        """
+        Advance the state machine once. Returns seconds until the next deadline
+        (the scheduler also wakes early on telemetry events).
+        """
+        if now is None: now = self.clock.time()
+        try:
+            handler = getattr(self, f"_step_{self.phase.lower()}", None)
+            if handler is None:
+                return None
+            return handler(now)
+        except Exception as e:
+            import traceback
+            print(f"[Mission] 💥 STEP CRASH ({self.phase}): {e}")
+            traceback.print_exc()
+            self._enter(PHASE_ABORTED)
+            return None
 
-            # 2. Arm & Takeoff Logic
-            # (Removed dangerous set_home call)
-            
-            current_alt = self.backend.state['alt_rel']
-            is_flying = current_alt > 2.0 and self.backend.state['armed']
-            
-            if is_flying:
+    def _step_set_guided(self, now):
+        s = self.backend.state
+        if s['mode'] == 'GUIDED':
+            current_alt = s['alt_rel']
+            if current_alt > 2.0 and s['armed']:
                 print(f"[Mission] ✈️ Already flying at {current_alt:.1f}m. Skipping Takeoff.")
+                self._enter(PHASE_WAYPOINT)
+            elif s['armed']:
+                self._enter(PHASE_TAKEOFF)
             else:
-                # Need to ARM and TAKEOFF
-                if not self.backend.state['armed']:
-                    print("[Mission] 🛡️ Arming...")
-                    self.backend.arm_disarm(True)
-                    
-                    # Wait for Arming confirmation
-                    t_arm = time.time() + 10
-                    while not self.backend.state['armed'] and time.time() < t_arm:
-                        time.sleep(0.5)
-                        
-                    if not self.backend.state['armed']:
-                         print("[Mission] ❌ Arming failed. Aborting.")
-                         return
-                    
-                    time.sleep(2) # Spool up time
-                    
-                print(f"[Mission] 🛫 Taking off to {altitude}m...")
-                self.backend.takeoff(altitude)
-                
-                # Wait for Takeoff Climb
-                time.sleep(5)
-                # Timeout for climb to prevent infinite loop
-                t_climb = time.time() + 20
-                while self.backend.state['alt_rel'] < altitude * 0.90:
-                     if time.time() > t_climb:
-                          print("[Mission] ⚠️ Takeoff timeout (altitude not reached).")
-                          break
-                     print(f"[Mission] Climbing... {self.backend.state['alt_rel']:.1f}m")
-                     time.sleep(1)
-                print("[Mission] Takeoff Complete.")
-            
-            # 3. Iterate Waypoints
-            self.paused = False
+                self._enter(PHASE_ARMING)
+            return 0
+        if now - self.phase_started > GUIDED_TIMEOUT:
+            print("[Mission] ❌ Failed to enter GUIDED mode. Aborting.")
+            self._enter(PHASE_ABORTED)
+            return None
+        return self.phase_started + GUIDED_TIMEOUT - now
+
+    def _step_arming(self, now):
+        if self.backend.state['armed']:
+            # Takeoff goes out as soon as ARMED is confirmed (no fixed spool-up wait)
+            self._enter(PHASE_TAKEOFF)
+            return 0
+        if now - self.phase_started > ARM_TIMEOUT:
+            print("[Mission] ❌ Arming failed. Aborting.")
+            self._enter(PHASE_ABORTED)
+            return None
+        return self.phase_started + ARM_TIMEOUT - now
+
+    def _step_takeoff(self, now):
+        s = self.backend.state
+        if not s['armed']:
+            print("[Mission] ❌ Disarmed during takeoff. Aborting.")
+            self._enter(PHASE_ABORTED)
+            return None
+        if s['alt_rel'] >= self.altitude * 0.90:
+            print("[Mission] Takeoff Complete.")
+            self._enter(PHASE_WAYPOINT)
+            return 0
+        if now - self.phase_started > CLIMB_TIMEOUT:
+            print("[Mission] ⚠️ Takeoff timeout (altitude not reached).")
+            self._enter(PHASE_WAYPOINT)
+            return 0
+
+        # Still on the ground? The FC may have rejected TAKEOFF while spooling up -> resend
+        if s['alt_rel'] < 0.5 and now - self.last_sent > TAKEOFF_RESEND:
+            self.backend.takeoff(self.altitude)
+            self.last_sent = now
+        if now - self.last_log > 1.0:
+            print(f"[Mission] Climbing... {s['alt_rel']:.1f}m")
+            self.last_log = now
+        return 1.0
+
+    def _step_waypoint(self, now):
+        if self.paused:
+            self._enter(PHASE_PAUSED)
+            return 0
+
+        lat, lon = self.waypoints[self.wp_index]
+        is_last = self.wp_index + 1 >= len(self.waypoints)
+        # Drop / hover points are flown to and accepted at WP_RADIUS: blending would fire them meters short
+        blending = self.blend_mode != "off" and not is_last and self.waypoints.action[self.wp_index] == ACTION_NONE
+
+        if blending and self.blend_mode == "carrot":
+            return self._step_carrot(now)
+
+        # MAINTAIN TARGET LOGIC
+        # Resend the target periodically so packet loss doesn't stop the mission
+        if now - self.last_sent > GOTO_RESEND:
+            self._send_goto(lat, lon, self.wp_alts[self.wp_index])
+            self.last_sent = now
+
+        radius = self._blend_distance() if blending else WP_RADIUS
+        dist = haversine(self.backend.state['lat'], self.backend.state['lon'], lat, lon)
+        if dist < radius:
+            return self._advance_waypoint()
+        return self.last_sent + GOTO_RESEND - now
+
+    def _advance_waypoint(self):
+        print(f"[Mission] ✅ Arrived at WP {self.wp_index+1}")
+        action = self.waypoints.action[self.wp_index]
+        if action == ACTION_DROP:
+            self.drop_payload()
+        if self.wp_index + 1 >= len(self.waypoints):
+            self._enter(PHASE_COMPLETE)
+            return None
+        self.wp_index += 1
+        if action == ACTION_HOVER:
+            # Hold here; resume_mission() continues to the next WP
+            print(f"{self.backend.log_prefix} [Mission] ⏸️ Hover point. Resume to continue.")
+            self.paused = True
             self.resumed_flag = False
-            
-            last_stop_sent = 0
-            last_goto_sent = 0
-            
-            for i, (lat, lon) in enumerate(self.waypoints):
-                print(f"[Mission] 📍 Heading to WP {i+1}/{len(self.waypoints)}...")
-                
-                # Send Go To Command
-                self._send_goto(lat, lon, altitude)
-                
-                # Wait for Arrival
-                while True:
-                    # PAUSE LOGIC
-                    if self.paused:
-                        # Keep sending 0 velocity to hold position in GUIDED
-                        if time.time() - last_stop_sent > 1.0: # Send every 1s to keep link active
-                             self.backend.send_velocity(0, 0, 0)
-                             last_stop_sent = time.time()
-                             # Debug log occasionally
-                             # print(f"[Mission] DEBUG: Paused... Mode={self.backend.state['mode']}")
-                        time.sleep(0.1)
-                        continue
-                    
-                    # RESUME LOGIC (Explicit check)
-                    if self.resumed_flag:
-                        print(f"[Mission] ⚠️ DEBUG: Detected RESUME flag. Mode={self.backend.state['mode']}")
-                        
-                        # 1. Force GUIDED mode again to be safe
-                        if self.backend.state['mode'] != 'GUIDED':
-                             print("[Mission] Restoring GUIDED mode for resume...")
-                             self.backend.set_mode("GUIDED")
-                             time.sleep(0.2)
-                        
-                        # 2. Resend Target (Multiple times to ensure receipt)
-                        print(f"[Mission] ▶️ Resuming to WP {i+1} : {lat}, {lon}")
-                        for _ in range(3):
-                            self._send_goto(lat, lon, altitude)
-                            time.sleep(0.1)
-                            
-                        self.resumed_flag = False # Clear flag
-                        last_goto_sent = time.time() # Reset timer
-                        # Continue explicitly to skip the maintain logic this cycle
-                        continue
-
-                    # MAINTAIN TARGET LOGIC
-                    # We resend the target every 2 seconds to ensure:
-                    # 1. Packet loss doesn't stop the mission
-                    # 2. Mode switches are enforced
-                    
-                    if time.time() - last_goto_sent > 2.0:
-                        # print(f"[Mission] DEBUG: Maintaining WP {i+1}...")
-                        self._send_goto(lat, lon, altitude)
-                        last_goto_sent = time.time()
-                    
-                    curr_lat = self.backend.state['lat']
-                    curr_lon = self.backend.state['lon']
-                    dist = self._haversine(curr_lat, curr_lon, lat, lon)
-                    
-                    if dist < 2.0: # Reached within 2 meters
-                        print(f"[Mission] ✅ Arrived at WP {i+1}")
-                        break
-                        
-                    # Faster Loop for Instant Response
-                    # Instead of huge 1s sleep, we sleep 0.1s x 5 times and check pause
-                    for _ in range(5):
-                        if self.paused or self.resumed_flag: break
-                        time.sleep(0.1)
-        except Exception as e:
-            import traceback
-            print(f"[Mission] 💥 THREAD CRASH: {e}")
-            traceback.print_exc()
+            self._enter(PHASE_PAUSED)
+        else:
+            self._enter(PHASE_WAYPOINT)
+        return 0
+
+    def _blend_distance(self):
+        """Switch radius / carrot distance: ~LOOKAHEAD_TIME of travel at current ground speed"""
+        d = self.backend.state.get('speed', 0) * LOOKAHEAD_TIME
+        return min(max(d, BLEND_MIN_DIST), BLEND_MAX_DIST)
+
+    def _step_carrot(self, now):
+        """
+        Pure-pursuit style: the setpoint sits L meters ahead of the vehicle's projection
+        on the path and slides around corners, so the copter never brakes for a waypoint.
+        """
+        s = self.backend.state
+        lat0, lon0 = s['lat'], s['lon'] # local frame centred on the vehicle
+        L = self._blend_distance()
+
+        ax, ay = to_local(self.leg_start[0], self.leg_start[1], lat0, lon0)
+        bx, by = to_local(self.waypoints[self.wp_index][0], self.waypoints[self.wp_index][1], lat0, lon0)
+        abx, aby = bx - ax, by - ay
+        seg_len2 = abx * abx + aby * aby
+        t = 0.0 if seg_len2 < 1e-6 else min(max(-(ax * abx + ay * aby) / seg_len2, 0.0), 1.0)
+        px, py = ax + t * abx, ay + t * aby
+
+        # Close enough to the corner: this leg is done, continue on the next one
+        if math.hypot(bx - px, by - py) < L:
+            return self._advance_waypoint()
+
+        # Walk L meters along the remaining path from the projection point
+        carrot, carrot_alt = None, self.wp_alts[-1]
+        remaining = L
+        cx, cy = px, py
+        for j in range(self.wp_index, len(self.waypoints)):
+            nx, ny = to_local(self.waypoints[j][0], self.waypoints[j][1], lat0, lon0)
+            seg = math.hypot(nx - cx, ny - cy)
+            if seg >= remaining:
+                f = remaining / seg
+                carrot = to_global(cx + f * (nx - cx), cy + f * (ny - cy), lat0, lon0)
+                carrot_alt = self.wp_alts[j]
+                break
+            if self.waypoints.action[j] != ACTION_NONE: # never slide the setpoint past an action point
+                carrot, carrot_alt = self.waypoints[j], self.wp_alts[j]
+                break
+            remaining -= seg
+            cx, cy = nx, ny
+        if carrot is None:
+            carrot = self.waypoints[-1]
+
+        period = 1.0 / CARROT_RATE
+        if now - self.last_sent >= period:
+            self._send_goto(carrot[0], carrot[1], carrot_alt)
+            self.last_sent = now
+        return period
+
+    def _step_paused(self, now):
+        if self.resumed_flag:
+            self.resumed_flag = False
+            self.paused = False
+            print(f"[Mission] ⚠️ DEBUG: Detected RESUME flag. Mode={self.backend.state['mode']}")
+            if self.backend.state['mode'] != 'GUIDED':
+                print("[Mission] Restoring GUIDED mode for resume...")
+                self.backend.set_mode("GUIDED")
+            lat, lon = self.waypoints[self.wp_index]
+            print(f"[Mission] ▶️ Resuming to WP {self.wp_index+1} : {lat}, {lon}")
+            self._enter(PHASE_RESUMING)
+            return 0
+
+        # Keep sending 0 velocity to hold position in GUIDED (keeps link active)
+        if now - self.last_sent > STOP_RESEND:
+            self.backend.send_velocity(0, 0, 0)
+            self.last_sent = now
+        return self.last_sent + STOP_RESEND - now
+
+    def _step_resuming(self, now):
+        # Resend target a few times (spaced, non-blocking) to ensure receipt
+        if self.paused:
+            self._enter(PHASE_PAUSED)
+            return 0
+        if self.sent_count >= RESUME_BURST:
+            self._enter(PHASE_WAYPOINT)
+            return 0
+        if now - self.last_sent >= 0.1:
+            lat, lon = self.waypoints[self.wp_index]
+            self._send_goto(lat, lon, self.wp_alts[self.wp_index])
+            self.last_sent = now
+            self.sent_count += 1
+        return 0.1
+
+    def _on_mission_complete(self):
+        # Mission End Behavior
+        # Drone 1 (ID 2): Auto-RTL
+        # Drone 0 (ID 1): Hover (for Drop Workflow)
+        if self.backend.drone_id == 2:
+             print(f"{self.backend.log_prefix} [Mission] 🏁 Mission Complete. Auto-RTL (Drone 1).")
+             self.backend.set_mode("RTL")
+        else:
+             print(f"{self.backend.log_prefix} [Mission] 🏁 Mission Complete. Hovering at final waypoint.")
+
+    def stop_mission(self):
+        """Abort a running guided mission; the scheduler drops it on its next poll"""
+        if self.active:
+            print(f"{self.backend.log_prefix} [Mission] ⏹️ Mission stopped.")
+            self._enter(PHASE_ABORTED)
+            self._scheduler().notify()
 
     def pause_mission(self):
         print(f"{self.backend.log_prefix} [Mission] ⏸️ BREAKING (Holding in GUIDED)...")
@@ -284,63 +539,121 @@ class MissionManager:
         self.backend.set_mode("GUIDED") # Ensure Mode
         for _ in range(3): # Spam a few times to ensure receipt
              self.backend.send_velocity(0, 0, 0)
-             time.sleep(0.05)
+             self.clock.sleep(0.05)
         self.paused = True
+        self.resumed_flag = False
+        self._scheduler().notify()
+        
+    def request_pause(self):
+        """pause_mission() from the mission scheduler thread: for callers that must not block (telemetry)"""
+        def pause():
+            if self.active and not self.paused:
+                self.pause_mission()
+        self._scheduler().call_soon(pause)
 
+    def request_resume(self):
+        def resume():
+            if self.active and self.paused:
+                self.resume_mission()
+        self._scheduler().call_soon(resume)
 
-        
     def resume_mission(self):
         print(f"{self.backend.log_prefix} [Mission] ▶️ RESUMING Mission (Switching to GUIDED)")
         self.backend.set_mode("GUIDED")
         self.paused = False
         self.resumed_flag = True
+        self._scheduler().notify()
 
     def drop_payload(self):
         print(f"{self.backend.log_prefix} [Mission] 📦 Triggering Sequential Drop (Output 5-8)...")
         self.backend.drop_payload() 
 
+    def _send_goto(self, lat, lon, alt):
+        # SET_POSITION_TARGET_GLOBAL_INT for Guided (see DroneBackend.send_position_target)
+        self.backend.send_position_target(lat, lon, alt)
 
 
+class MissionScheduler:
+    """
+    Single thread that drives the guided missions of the whole fleet.
+    Wakes on telemetry events (notify) or on the earliest mission deadline.
+    With threaded=False no thread is started: the owner (e.g. the simulator) calls poll().
+    """
+    def __init__(self, clock=None, threaded=True):
+        self.clock = clock or get_clock()
+        self.threaded = threaded
+        self.missions = []
+        self.calls = []  # one-off actions for the next poll (call_soon)
+        self.cond = threading.Condition()
+        self.pending = False
+        self.thread = None
 
-                
-        # 4. Mission End Behavior
-        # Drone 1 (ID 2): Auto-RTL
-        # Drone 0 (ID 1): Hover (for Drop Workflow)
-        
-        if self.backend.drone_id == 2:
-             print(f"{self.backend.log_prefix} [Mission] 🏁 Mission Complete. Auto-RTL (Drone 1).")
-             self.backend.set_mode("RTL")
-        else:
-             print(f"{self.backend.log_prefix} [Mission] 🏁 Mission Complete. Hovering at final waypoint.")
+    def add(self, mgr):
+        with self.cond:
+            if mgr not in self.missions:
+                self.missions.append(mgr)
+            self._wake()
 
+    def call_soon(self, fn):
+        """Run fn() on the scheduler thread before the next round of mission steps"""
+        with self.cond:
+            self.calls.append(fn)
+            self._wake()
 
+    def _wake(self):
+        self.pending = True
+        if self.threaded and (self.thread is None or not self.thread.is_alive()):
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+        self.cond.notify()
 
-    def _send_goto(self, lat, lon, alt):
-        # MAV_CMD_DO_REPOSITION or SET_POSITION_TARGET_GLOBAL_INT
-        # We use SET_POSITION_TARGET_GLOBAL_INT for Guided
-        if not self.backend.master: return
-        
-        self.backend.master.mav.set_position_target_global_int_send(
-            0, # time_boot_ms
-            self.backend.master.target_system,
-            self.backend.master.target_component,
-            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
-            0b0000111111111000, # type_mask (only pos enabled)
-            int(lat * 1e7),
-            int(lon * 1e7),
-            alt,
-            0, 0, 0, # velocities
-            0, 0, 0, # accel
-            0, 0 # yaw
-        )
+    def notify(self):
+        with self.cond:
+            self.pending = True
+            self.cond.notify()
+
+    def poll(self, now=None):
+        """Step every active mission once. Returns seconds until the next deadline."""
+        if now is None: now = self.clock.time()
+        with self.cond:
+            calls, self.calls = self.calls, []
+            missions = list(self.missions)
+        for fn in calls:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Mission] 💥 Scheduled action failed: {e}")
+        wait = SCHEDULER_MAX_WAIT
+        for mgr in missions:
+            # Step until the mission settles (chained transitions return 0)
+            for _ in range(10):
+                delay = mgr.step(now)
+                if delay is None or delay > 0:
+                    break
+            if not mgr.active:
+                with self.cond:
+                    if mgr in self.missions:
+                        self.missions.remove(mgr)
+            elif delay is not None:
+                wait = min(wait, max(delay, 0.01))
+        return wait
+
+    def _loop(self):
+        while True:
+            wait = self.poll()
+            with self.cond:
+                if not self.pending:
+                    self.cond.wait(timeout=wait)
+                self.pending = False
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
 
-    def _haversine(self, lat1, lon1, lat2, lon2):
-        import math
-        R = 6371000 # meters
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        dphi = math.radians(lat2 - lat1)
-        dlambda = math.radians(lon2 - lon1)
-        a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2) * math.sin(dlambda/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        return R * c
+def get_scheduler():
+    """Process-wide mission scheduler (one thread for all drones)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MissionScheduler()
+        return _scheduler
@@ -0,0 +1,326 @@
+import json
+import math
+import os
+import re
+from array import array
+from pymavlink import mavutil
+from waypoint_store import WaypointStore, NO_ALT, NO_SPEED, ACTION_NONE, ACTION_DROP, ACTION_HOVER
+
+# --- CONFIGURATION ---
+CHUNK_SIZE = 64 * 1024   # bytes read per step while streaming a .plan
+DEFAULT_HOME_ALT = 0.0
+
+NAV_POSITION_CMDS = {
+    mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+    mavutil.mavlink.MAV_CMD_NAV_LOITER_UNLIM,
+    mavutil.mavlink.MAV_CMD_NAV_LOITER_TURNS,
+    mavutil.mavlink.MAV_CMD_NAV_LOITER_TIME,
+    mavutil.mavlink.MAV_CMD_NAV_SPLINE_WAYPOINT,
+}
+# TAKEOFF / LAND / RTL are skipped: MissionManager adds its own around the waypoints
+# Per-waypoint speed and actions, as standard mission items:
+#   speed -> DO_CHANGE_SPEED before the waypoint (applies from that waypoint on)
+#   HOVER -> the waypoint is a LOITER_UNLIM (hold until resumed)
+#   DROP  -> DO_GRIPPER release right after the waypoint
+CMD_SPEED = mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED
+CMD_DROP = mavutil.mavlink.MAV_CMD_DO_GRIPPER
+CMD_HOVER = mavutil.mavlink.MAV_CMD_NAV_LOITER_UNLIM
+SPEED_TYPE_GROUND = 1
+RELATIVE_FRAMES = {
+    mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
+}
+
+_ITEMS_KEY = re.compile(r'"items"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+
+class _Columns:
+    """Accumulates lat / lon / alt / speed / action straight into arrays"""
+    def __init__(self):
+        self.lat = array('d')
+        self.lon = array('d')
+        self.alt = array('d')
+        self.speed = array('d')
+        self.action = array('h')
+        self.pending_speed = NO_SPEED # DO_CHANGE_SPEED waiting for its waypoint
+        self.non_relative = 0 # AMSL / terrain frames: position kept, altitude dropped
+
+    def add(self, lat, lon, alt, relative=True, action=ACTION_NONE):
+        self.lat.append(lat)
+        self.lon.append(lon)
+        if relative and alt is not None:
+            self.alt.append(alt)
+        else:
+            self.alt.append(NO_ALT)
+            self.non_relative += 1
+        self.speed.append(self.pending_speed)
+        self.action.append(action)
+        self.pending_speed = NO_SPEED
+
+    def command(self, cmd, p1, p2):
+        """Non-position item: returns True if it was a speed change or a drop"""
+        if cmd == CMD_SPEED:
+            if p2 is not None and p2 > 0: # -1 = no change
+                self.pending_speed = float(p2)
+            return True
+        if cmd == CMD_DROP:
+            if p2 == mavutil.mavlink.GRIPPER_ACTION_RELEASE and self.action:
+                self.action[-1] = ACTION_DROP
+            return True
+        return False
+
+    def to_store(self, store=None):
+        store = store if store is not None else WaypointStore()
+        store.extend_columns(self.lat, self.lon, self.alt, self.speed, self.action)
+        return store
+
+
+def _mission_items(waypoints, altitudes):
+    """(command, p1, p2, lat, lon, alt) rows for the waypoints, speed and action items included"""
+    speeds = getattr(waypoints, 'speed', None)
+    actions = getattr(waypoints, 'action', None)
+    for i, ((lat, lon), alt) in enumerate(zip(waypoints, altitudes)):
+        if speeds is not None and not math.isnan(speeds[i]):
+            yield CMD_SPEED, SPEED_TYPE_GROUND, float(speeds[i]), 0.0, 0.0, 0.0
+        action = int(actions[i]) if actions is not None else ACTION_NONE
+        yield (CMD_HOVER if action == ACTION_HOVER else mavutil.mavlink.MAV_CMD_NAV_WAYPOINT), 0, 0, lat, lon, alt
+        if action == ACTION_DROP:
+            yield CMD_DROP, 1, mavutil.mavlink.GRIPPER_ACTION_RELEASE, 0.0, 0.0, 0.0
+
+
+# --- QGROUNDCONTROL .plan (JSON) ---
+
+def iter_plan_items(fp, chunk_size=CHUNK_SIZE):
+    """
+    Yields the entries of mission.items one at a time from an open .plan file.
+    Only the current item is ever decoded, so the memory cost is one item,
+    not the whole document tree.
+    """
+    buf = ""
+    eof = False
+
+    def more(size):
+        nonlocal buf, eof
+        data = fp.read(size)
+        if not data:
+            eof = True
+        buf += data
+
+    # 1. Seek to the start of the items array (keep a tail in case the key spans chunks)
+    while True:
+        m = _ITEMS_KEY.search(buf)
+        if m:
+            pos = m.end()
+            break
+        if eof:
+            return
+        buf = buf[-32:]
+        more(chunk_size)
+
+    # 2. Decode one item at a time
+    need = chunk_size
+    while True:
+        pos = _SEPARATORS.match(buf, pos).end()
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of .plan file inside mission items")
+            more(chunk_size)
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more(need) # item spans chunks: read more (growing, so huge items stay linear)
+            need *= 2
+            continue
+        need = chunk_size
+        yield item
+        pos = end
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+def _walk_plan_item(item, cols):
+    kind = item.get('type')
+    if kind == 'SimpleItem':
+        params = item.get('params') or []
+        if len(params) >= 2 and cols.command(item.get('command'), params[0], params[1]):
+            return
+        if item.get('command') not in NAV_POSITION_CMDS:
+            return
+        if len(params) < 7 or params[4] is None or params[5] is None:
+            return
+        if params[4] == 0 and params[5] == 0:
+            return
+        action = ACTION_HOVER if item.get('command') == CMD_HOVER else ACTION_NONE
+        cols.add(params[4], params[5], params[6], item.get('frame') in RELATIVE_FRAMES, action)
+    elif kind == 'ComplexItem':
+        # Survey / corridor / structure scans carry their generated waypoints as SimpleItems
+        inner = (item.get('TransectStyleComplexItem') or {}).get('Items') or item.get('Items') or []
+        for sub in inner:
+            _walk_plan_item(sub, cols)
+
+def load_plan(path, store=None):
+    cols = _Columns()
+    with open(path, 'r', encoding='utf-8') as fp:
+        for item in iter_plan_items(fp):
+            _walk_plan_item(item, cols)
+    if cols.non_relative:
+        print(f"[MissionIO] ⚠️ {cols.non_relative} waypoint(s) not relative-to-home. Using mission altitude there.")
+    return cols.to_store(store)
+
+def save_plan(path, waypoints, altitudes, home=None):
+    """Streams a QGC v1 .plan. altitudes: one relative altitude per waypoint. Speeds / actions of a WaypointStore are kept."""
+    if home is None:
+        home = (waypoints[0][0], waypoints[0][1]) if len(waypoints) else (0.0, 0.0)
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write('{\n    "fileType": "Plan",\n'
+                 '    "geoFence": {"circles": [], "polygons": [], "version": 2},\n'
+                 '    "groundStation": "QGroundControl",\n'
+                 '    "mission": {\n        "cruiseSpeed": 15,\n        "firmwareType": 3,\n'
+                 '        "hoverSpeed": 5,\n        "items": [')
+        for i, (cmd, p1, p2, lat, lon, alt) in enumerate(_mission_items(waypoints, altitudes)):
+            if cmd in NAV_POSITION_CMDS:
+                item = {
+                    "AMSLAltAboveTerrain": None, "Altitude": alt, "AltitudeMode": 1,
+                    "autoContinue": True, "command": cmd,
+                    "doJumpId": i + 1, "frame": mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+                    "params": [0, 0, 0, None, lat, lon, alt], "type": "SimpleItem",
+                }
+            else:
+                item = {
+                    "autoContinue": True, "command": cmd, "doJumpId": i + 1,
+                    "frame": mavutil.mavlink.MAV_FRAME_MISSION,
+                    "params": [p1, p2, -1 if cmd == CMD_SPEED else 0, 0, 0, 0, 0], "type": "SimpleItem",
+                }
+            fp.write((",\n            " if i else "\n            ") + json.dumps(item))
+        fp.write('\n        ],\n'
+                 f'        "plannedHomePosition": [{home[0]}, {home[1]}, {DEFAULT_HOME_ALT}],\n'
+                 '        "vehicleType": 2,\n        "version": 2\n    },\n'
+                 '    "rallyPoints": {"points": [], "version": 2},\n    "version": 1\n}\n')
+
+
+# --- MISSION PLANNER "QGC WPL 110" (tab separated) ---
+
+def load_wpl(path, store=None):
+    """seq current frame command p1 p2 p3 p4 lat lon alt autocontinue, row 0 = home"""
+    cols = _Columns()
+    with open(path, 'r', encoding='utf-8') as fp:
+        header = fp.readline().strip()
+        if not header.startswith("QGC WPL"):
+            raise ValueError(f"Not a QGC WPL file: {path}")
+        for n, line in enumerate(fp, start=2):
+            f = line.split()
+            if not f:
+                continue
+            if len(f) < 12:
+                raise ValueError(f"{path}:{n}: expected 12 columns, got {len(f)}")
+            if int(f[0]) == 0:
+                continue # home
+            cmd = int(f[3])
+            if cols.command(cmd, float(f[4]), float(f[5])) or cmd not in NAV_POSITION_CMDS:
+                continue
+            lat, lon = float(f[8]), float(f[9])
+            if lat == 0 and lon == 0:
+                continue
+            cols.add(lat, lon, float(f[10]), int(f[2]) in RELATIVE_FRAMES,
+                     ACTION_HOVER if cmd == CMD_HOVER else ACTION_NONE)
+    if cols.non_relative:
+        print(f"[MissionIO] ⚠️ {cols.non_relative} waypoint(s) not relative-to-home. Using mission altitude there.")
+    return cols.to_store(store)
+
+def save_wpl(path, waypoints, altitudes, home=None):
+    if home is None:
+        home = (waypoints[0][0], waypoints[0][1]) if len(waypoints) else (0.0, 0.0)
+    wp = mavutil.mavlink.MAV_CMD_NAV_WAYPOINT
+    rel = mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write("QGC WPL 110\n")
+        fp.write(f"0\t1\t0\t{wp}\t0\t0\t0\t0\t{home[0]:.8f}\t{home[1]:.8f}\t{DEFAULT_HOME_ALT:.6f}\t1\n")
+        for i, (cmd, p1, p2, lat, lon, alt) in enumerate(_mission_items(waypoints, altitudes), start=1):
+            if cmd in NAV_POSITION_CMDS:
+                fp.write(f"{i}\t0\t{rel}\t{cmd}\t0\t0\t0\t0\t{lat:.8f}\t{lon:.8f}\t{alt:.6f}\t1\n")
+            else:
+                p3 = -1 if cmd == CMD_SPEED else 0
+                fp.write(f"{i}\t0\t{mavutil.mavlink.MAV_FRAME_MISSION}\t{cmd}\t{p1}\t{p2:g}\t{p3}\t0\t0\t0\t0\t1\n")
+
+
+# --- DISPATCH ---
+
+def load_mission(path, store=None):
+    """Reads a .plan or QGC WPL file (format sniffed from content). Returns a WaypointStore."""
+    with open(path, 'r', encoding='utf-8') as fp:
+        head = fp.read(16).lstrip()
+    if head.startswith('{'):
+        return load_plan(path, store)
+    if head.startswith('QGC WPL'):
+        return load_wpl(path, store)
+    raise ValueError(f"Unknown mission file format: {path}")
+
+def save_mission(path, waypoints, altitudes, home=None):
+    """.plan -> QGroundControl JSON, anything else (.waypoints / .txt) -> QGC WPL 110"""
+    if os.path.splitext(path)[1].lower() == '.plan':
+        save_plan(path, waypoints, altitudes, home)
+    else:
+        save_wpl(path, waypoints, altitudes, home)
+
+
+# --- BENCHMARK ---
+
+def benchmark(n_points=50000):
+    """Large survey .plan: streaming parse vs json.load, time and peak memory"""
+    import tempfile
+    import time
+    import tracemalloc
+    import numpy as np
+    lat0, lon0 = 12.9716, 77.5946
+    pts = [(lat0 + (i // 200) * 1e-4, lon0 + (i % 200) * 1e-4) for i in range(n_points)]
+    with tempfile.TemporaryDirectory() as d:
+        plan = os.path.join(d, "big.plan")
+        wpl = os.path.join(d, "big.waypoints")
+        save_plan(plan, pts, [20.0] * n_points)
+        save_wpl(wpl, pts, [20.0] * n_points)
+        print(f"{n_points} waypoints, .plan = {os.path.getsize(plan) / 1e6:.1f} MB")
+
+        def measure(label, fn):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            result = fn()
+            dt = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<22} {dt * 1000:8.0f} ms  peak {peak / 1e6:7.1f} MB")
+            return result
+
+        def baseline():
+            with open(plan) as fp:
+                doc = json.load(fp)
+            return [(it['params'][4], it['params'][5]) for it in doc['mission']['items']]
+
+        ref = measure("json.load + tuples", baseline)
+        store = measure("streaming .plan", lambda: load_mission(plan))
+        store2 = measure("streaming WPL 110", lambda: load_mission(wpl))
+        assert list(store) == ref and len(store2) == n_points, "round trip mismatch"
+        print(f"  store columns: {3 * 8 * len(store) / 1e6:.1f} MB (list of tuples ~{len(ref) * 120 / 1e6:.1f} MB)")
+
+        # Speed and DROP / HOVER survive an export -> import round trip in both formats
+        src = WaypointStore(pts[:6])
+        src.set_attr(1, speed=3.5)
+        src.set_attr(2, action=ACTION_DROP)
+        src.set_attr(4, speed=8.0, action=ACTION_HOVER)
+        for path in (plan, wpl):
+            save_mission(path, src, [20.0] * len(src))
+            back = load_mission(path)
+            assert list(back) == list(src), "waypoints changed"
+            assert np.array_equal(back.speed, src.speed, equal_nan=True), "speeds lost"
+            assert np.array_equal(back.action, src.action), "actions lost"
+        print("  speed / action round trip: .plan ok, WPL 110 ok")
+
+
+if __name__ == "__main__":
+    benchmark()
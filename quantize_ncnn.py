@@ -0,0 +1,178 @@
+"""
+INT8 NCNN model from the FP32 export, behind a person-recall gate.
+
+    python quantize_ncnn.py <calibration image folder> <labelled validation folder>
+                            [--fp32 yolov8n_ncnn_model] [--out yolov8n_ncnn_int8_model]
+                            [--threads 4] [--max-drop 0.02]
+
+Uses ncnn's table-based post-training quantization. The tools come with an ncnn
+build (tools/quantize), not with the pip wheel: put them on PATH or set NCNN_TOOLS_DIR.
+  1. ncnnoptimize  fuse the FP32 graph
+  2. ncnn2table    per-layer INT8 scales from the calibration images (KL divergence)
+  3. ncnn2int8     INT8 param / bin
+  4. gate          latency and person recall of both models on the validation folder
+                   (YOLO labels, see bench_detectors.py)
+The INT8 model is only installed to --out when its recall is at most MAX_RECALL_DROP
+below the FP32 model; a rejected model stays in the work folder with its report.
+Set NCNN_INT8 = True in ai_pilot.py to fly it.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import detectors
+from bench_detectors import iter_frames, evaluate, recall, IMAGE_EXTS, EVAL_CONF, _fmt
+
+# --- CONFIGURATION ---
+NCNN_TOOLS_DIR = os.environ.get("NCNN_TOOLS_DIR", "")  # folder with ncnnoptimize / ncnn2table / ncnn2int8
+CALIB_MAX_IMAGES = 500     # more images = slower table, rarely better scales
+CALIB_METHOD = "kl"        # "kl" | "aciq" | "eq" (ncnn2table)
+MAX_RECALL_DROP = 0.02     # person recall points the INT8 model may lose against FP32
+GATE_CONF = detectors.CONFIDENCE_THRESHOLD # recall is measured at the pilot's operating point
+GATE_IOU = 0.5
+PERSON = 0
+WARMUP = 5
+
+
+# --- NCNN TOOLS ---
+
+def find_tool(name):
+    path = os.path.join(NCNN_TOOLS_DIR, name) if NCNN_TOOLS_DIR else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"{name} not found (build ncnn with NCNN_BUILD_TOOLS=ON, then set NCNN_TOOLS_DIR)")
+    return path
+
+def run_tool(name, *args):
+    cmd = [find_tool(name), *map(str, args)]
+    print(f"[Quantize] ▶️ {' '.join(os.path.basename(c) if i == 0 else c for i, c in enumerate(cmd))}")
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} failed: {(proc.stderr or proc.stdout).strip()[-500:]}")
+
+def write_image_list(folder, path, max_images=CALIB_MAX_IMAGES):
+    """Calibration image list for ncnn2table (evenly spread over the folder if it is larger)"""
+    images = sorted(os.path.join(root, f) for root, _, files in os.walk(folder)
+                    for f in files if f.lower().endswith(IMAGE_EXTS))
+    if not images:
+        raise ValueError(f"No calibration images in {folder}")
+    if len(images) > max_images:
+        images = [images[i] for i in np.linspace(0, len(images) - 1, max_images).astype(int)]
+    with open(path, "w") as fp:
+        fp.write("\n".join(os.path.abspath(p) for p in images) + "\n")
+    return len(images)
+
+def quantize(fp32_dir, calib_dir, work_dir, threads=detectors.NCNN_THREADS):
+    """FP32 export -> INT8 model files in work_dir (a folder NcnnDetector can load)"""
+    imgsz = detectors.load_export_shape(fp32_dir)[0] or detectors.EXPORT_IMGSZ # calibrate at the export size
+    param = os.path.join(fp32_dir, "model.ncnn.param")
+    weights = os.path.join(fp32_dir, "model.ncnn.bin")
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"FP32 weights not found: {weights}")
+    opt_param, opt_bin = os.path.join(work_dir, "opt.param"), os.path.join(work_dir, "opt.bin")
+    table = os.path.join(work_dir, "model.table")
+    images = os.path.join(work_dir, "calibration.txt")
+    n = write_image_list(calib_dir, images)
+    print(f"[Quantize] 📷 {n} calibration images")
+
+    run_tool("ncnnoptimize", param, weights, opt_param, opt_bin, 0) # 0 = keep fp32 storage
+    # Same input as the detector: RGB, 0..1, export size square (ncnn2table resizes, no letterbox)
+    run_tool("ncnn2table", opt_param, opt_bin, images, table,
+             "mean=[0,0,0]", "norm=[0.003922,0.003922,0.003922]",
+             f"shape=[{imgsz},{imgsz},3]", "pixel=RGB", f"thread={threads}", f"method={CALIB_METHOD}")
+    run_tool("ncnn2int8", opt_param, opt_bin,
+             os.path.join(work_dir, "model.ncnn.param"), os.path.join(work_dir, "model.ncnn.bin"), table)
+    shutil.copy(os.path.join(fp32_dir, "metadata.yaml"), work_dir) # class names
+    for f in (opt_param, opt_bin):
+        os.remove(f)
+    return work_dir
+
+
+# --- GATE ---
+
+def measure(model_dir, frames, threads=detectors.NCNN_THREADS):
+    """Latency and person accuracy of one NCNN model folder on (frame, labels) pairs"""
+    det = detectors.NcnnDetector(model_dir, threads=threads, conf=EVAL_CONF) # mAP needs the low tail
+    for frame, _ in frames[:WARMUP]:
+        det.detect(frame)
+    times, predictions = [], []
+    for frame, _ in frames:
+        t0 = time.perf_counter()
+        predictions.append(det.detect(frame))
+        times.append(time.perf_counter() - t0)
+    labels = [lab for _, lab in frames]
+    map50, _ = evaluate(predictions, labels)
+    return {'imgsz': det.imgsz, 'p50_ms': float(np.percentile(times, 50) * 1000), 'fps': len(frames) / sum(times),
+            'recall': recall(predictions, labels, PERSON, GATE_CONF, GATE_IOU), 'map50': map50}
+
+def gate(fp32, int8, max_drop=MAX_RECALL_DROP):
+    """(passed, reason) for an INT8 result against its FP32 baseline"""
+    if fp32['recall'] is None:
+        return False, "no person labels in the validation set"
+    drop = fp32['recall'] - int8['recall']
+    if drop > max_drop:
+        return False, f"person recall {int8['recall']:.3f} vs {fp32['recall']:.3f} (-{drop:.3f} > {max_drop:.3f})"
+    return True, f"person recall {int8['recall']:.3f} vs {fp32['recall']:.3f} (-{max(drop, 0):.3f} <= {max_drop:.3f})"
+
+def write_report(model_dir, report):
+    with open(os.path.join(model_dir, detectors.QUANT_REPORT), "w") as fp:
+        json.dump(report, fp, indent=2)
+
+
+# --- CLI ---
+
+def main(argv):
+    ap = argparse.ArgumentParser(description="Quantize the YOLOv8 NCNN model to INT8 with a recall gate")
+    ap.add_argument("calibration", help="folder of representative images (no labels needed)")
+    ap.add_argument("validation", help="image folder with YOLO labels for the recall gate")
+    ap.add_argument("--fp32", default=detectors.NCNN_MODEL_DIR)
+    ap.add_argument("--out", default=detectors.NCNN_INT8_MODEL_DIR)
+    ap.add_argument("--threads", type=int, default=detectors.NCNN_THREADS)
+    ap.add_argument("--max-drop", type=float, default=MAX_RECALL_DROP)
+    ap.add_argument("--max-frames", type=int, default=500)
+    args = ap.parse_args(argv)
+
+    frames = list(iter_frames(args.validation, args.max_frames))
+    if not frames or any(lab is None for _, lab in frames):
+        print(f"[Quantize] ❌ {args.validation}: every validation image needs a YOLO label file")
+        return 2
+    if not any((lab[:, 0] == PERSON).any() for _, lab in frames):
+        print(f"[Quantize] ❌ {args.validation}: no person labels, the recall gate has nothing to measure")
+        return 2
+
+    work = tempfile.mkdtemp(prefix="int8_", dir=os.path.dirname(os.path.abspath(args.out)))
+    try:
+        quantize(args.fp32, args.calibration, work, args.threads)
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
+        print(f"[Quantize] ❌ {e}")
+        shutil.rmtree(work, ignore_errors=True)
+        return 2
+
+    results = {'fp32': measure(args.fp32, frames, args.threads),
+               'int8': measure(work, frames, args.threads)}
+    print(f"{'model':<6} {'p50 ms':>7} {'fps':>6} {'recall':>7} {'mAP50':>6}")
+    for name, r in results.items():
+        print(f"{name:<6} {r['p50_ms']:>7.1f} {r['fps']:>6.1f} {_fmt(r['recall'], '.3f'):>7} {_fmt(r['map50'], '.3f'):>6}")
+    passed, reason = gate(results['fp32'], results['int8'], args.max_drop)
+    report = {'passed': passed, 'reason': reason, 'max_recall_drop': args.max_drop,
+              'gate_conf': GATE_CONF, 'validation': os.path.abspath(args.validation),
+              'frames': len(frames), 'date': time.strftime("%Y-%m-%d %H:%M:%S"), **results}
+    write_report(work, report)
+
+    if not passed:
+        print(f"[Quantize] ❌ Rejected: {reason}. Model and report left in {work}")
+        return 1
+    if os.path.exists(args.out):
+        shutil.rmtree(args.out)
+    os.replace(work, args.out)
+    print(f"[Quantize] ✅ Installed {args.out}: {reason}, "
+          f"{results['fp32']['p50_ms']:.1f} -> {results['int8']['p50_ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
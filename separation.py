@@ -0,0 +1,315 @@
+import math
+import threading
+from geo import to_local
+from clock import get_clock
+
+# --- CONFIGURATION ---
+MIN_SEPARATION_M = 5.0     # Horizontal breach distance (now or predicted)
+WARN_SEPARATION_M = 10.0   # Horizontal warning distance
+MIN_VERTICAL_M = 3.0       # Pairs further apart than this vertically never conflict
+LOOKAHEAD_S = 4.0          # Closest-approach horizon for velocity projection
+MAX_SPEED = 12.0           # m/s, bounds how far a pair can close within LOOKAHEAD_S
+GROUND_ALT_M = 1.0         # Drones below this (parked side by side) are not checked
+STALE_S = 3.0              # Ignore drones without a position update for this long
+CLEAR_HYSTERESIS = 1.2     # Conflict clears at WARN * this (no flapping at the edge)
+CLOSING_STEP_M = 0.5       # A standing breach that closes in this much more (distance or CPA) is acted on again
+AUTO_PAUSE = True          # Pause the give-way drone's mission on a breach
+
+# Grid cell size: any pair that can conflict within LOOKAHEAD_S sits in neighbouring cells
+CELL_SIZE_M = WARN_SEPARATION_M * CLEAR_HYSTERESIS + 2 * MAX_SPEED * LOOKAHEAD_S
+
+LEVEL_CLEAR = 0
+LEVEL_WARN = 1
+LEVEL_BREACH = 2
+
+
+def closest_approach(p1, v1, p2, v2, horizon=LOOKAHEAD_S):
+    """
+    Horizontal closest point of approach for two constant-velocity tracks.
+    p/v are (x, y) meters and m/s. Returns (t_cpa, d_cpa) with t clamped to [0, horizon].
+    """
+    dx, dy = p2[0] - p1[0], p2[1] - p1[1]
+    dvx, dvy = v2[0] - v1[0], v2[1] - v1[1]
+    dv2 = dvx * dvx + dvy * dvy
+    t = 0.0 if dv2 < 1e-9 else min(max(-(dx * dvx + dy * dvy) / dv2, 0.0), horizon)
+    return t, math.hypot(dx + dvx * t, dy + dvy * t)
+
+
+class SeparationMonitor:
+    """
+    Fleet-wide spacing monitor.
+    Every drone's position lives in a uniform grid (local East/North meters), so each
+    telemetry update only checks the drone against its 3x3 neighbourhood instead of
+    the whole fleet. Conflicts are graded on current distance and on projected
+    closest approach from the velocity vectors.
+    """
+    def __init__(self, mission_mgrs=None, clock=None, auto_pause=AUTO_PAUSE):
+        self.mission_mgrs = mission_mgrs if mission_mgrs is not None else {} # {idx: MissionManager}
+        self.clock = clock or get_clock()
+        self.auto_pause = auto_pause
+        self.lock = threading.Lock()
+        self.ref = None        # (lat0, lon0) of the local frame, set by the first fix
+        self.tracks = {}       # idx -> (x, y, z, vx, vy, t)
+        self.cell_of = {}      # idx -> (cx, cy)
+        self.grid = {}         # (cx, cy) -> set(idx)
+        self.conflicts = {}    # (i, j) i<j -> LEVEL_*
+        self.breach_at = {}    # (i, j) -> (dist, d_cpa) when the breach was last acted on
+        self.paused_by_us = set()
+        self.min_distance = None # closest pair distance seen (for reports)
+        self.alert_callbacks = []  # callback(i, j, level, dist, t_cpa, d_cpa)
+        self.backend_ids = {}  # id(backend) -> idx
+
+    # --- WIRING ---
+
+    def attach(self, idx, backend):
+        self.backend_ids[id(backend)] = idx
+        backend.add_listener(self._on_telemetry)
+
+    def detach(self, idx, backend):
+        backend.remove_listener(self._on_telemetry)
+        self.backend_ids.pop(id(backend), None)
+        with self.lock:
+            self._remove(idx)
+
+    def _on_telemetry(self, backend, event):
+        if event != 'position':
+            return
+        idx = self.backend_ids.get(id(backend))
+        if idx is None:
+            return
+        s = backend.state
+        if s['lat'] == 0 and s['lon'] == 0:
+            return
+        self.update(idx, s['lat'], s['lon'], s['alt_rel'], s.get('vn', 0.0), s.get('ve', 0.0))
+
+    # --- GRID ---
+
+    def _cell(self, x, y):
+        return (int(math.floor(x / CELL_SIZE_M)), int(math.floor(y / CELL_SIZE_M)))
+
+    def _remove(self, idx):
+        cell = self.cell_of.pop(idx, None)
+        if cell is not None:
+            members = self.grid.get(cell)
+            members.discard(idx)
+            if not members:
+                del self.grid[cell]
+        self.tracks.pop(idx, None)
+
+    def _neighbours(self, idx):
+        cx, cy = self.cell_of[idx]
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for j in self.grid.get((gx, gy), ()):
+                    if j != idx:
+                        yield j
+
+    # --- CHECKS ---
+
+    def update(self, idx, lat, lon, alt, vn=0.0, ve=0.0):
+        """New fix for drone idx. Checks it against nearby drones only."""
+        now = self.clock.time()
+        with self.lock:
+            if self.ref is None:
+                self.ref = (lat, lon)
+            x, y = to_local(lat, lon, self.ref[0], self.ref[1])
+            self.tracks[idx] = (x, y, alt, ve, vn, now)
+            cell = self._cell(x, y)
+            old = self.cell_of.get(idx)
+            if old != cell:
+                if old is not None:
+                    self.grid[old].discard(idx)
+                    if not self.grid[old]:
+                        del self.grid[old]
+                self.grid.setdefault(cell, set()).add(idx)
+                self.cell_of[idx] = cell
+
+            changes = []
+            near = set()
+            for j in self._neighbours(idx):
+                near.add(j)
+                res = self._assess(idx, j, now)
+                if res:
+                    changes.append(res)
+            # Pairs that drifted out of the neighbourhood are clear by construction
+            for pair in [p for p in self.conflicts if idx in p]:
+                other = pair[0] if pair[1] == idx else pair[1]
+                if other not in near:
+                    del self.conflicts[pair]
+                    self.breach_at.pop(pair, None)
+                    changes.append((pair, LEVEL_CLEAR, None, None, None))
+        self._handle(changes)
+
+    def _assess(self, i, j, now):
+        a, b = self.tracks[i], self.tracks[j]
+        pair = (i, j) if i < j else (j, i)
+        prev = self.conflicts.get(pair, LEVEL_CLEAR)
+        if now - b[5] > STALE_S or abs(a[2] - b[2]) > MIN_VERTICAL_M or min(a[2], b[2]) < GROUND_ALT_M:
+            level, dist, t_cpa, d_cpa = LEVEL_CLEAR, None, None, None
+        else:
+            dist = math.hypot(a[0] - b[0], a[1] - b[1])
+            t_cpa, d_cpa = closest_approach((a[0], a[1]), (a[3], a[4]), (b[0], b[1]), (b[3], b[4]))
+            if self.min_distance is None or dist < self.min_distance:
+                self.min_distance = dist
+            if dist < MIN_SEPARATION_M or d_cpa < MIN_SEPARATION_M:
+                level = LEVEL_BREACH
+            elif dist < WARN_SEPARATION_M or d_cpa < WARN_SEPARATION_M:
+                level = LEVEL_WARN
+            elif prev and min(dist, d_cpa) < WARN_SEPARATION_M * CLEAR_HYSTERESIS:
+                level = LEVEL_WARN # hysteresis
+            else:
+                level = LEVEL_CLEAR
+        if level == prev:
+            # Still a breach and still closing in (the other drone flies on): act again
+            last = self.breach_at.get(pair)
+            if level == LEVEL_BREACH and last and (dist < last[0] - CLOSING_STEP_M or d_cpa < last[1] - CLOSING_STEP_M):
+                self.breach_at[pair] = (dist, d_cpa)
+                return (pair, level, dist, t_cpa, d_cpa)
+            return None
+        if level == LEVEL_BREACH:
+            self.breach_at[pair] = (dist, d_cpa)
+        else:
+            self.breach_at.pop(pair, None)
+        if level:
+            self.conflicts[pair] = level
+        else:
+            self.conflicts.pop(pair, None)
+        return (pair, level, dist, t_cpa, d_cpa)
+
+    def check_all(self):
+        """Full sweep over the grid (every pair in neighbouring cells). Returns conflicting pairs."""
+        now = self.clock.time()
+        out = []
+        with self.lock:
+            for idx in self.tracks:
+                for j in self._neighbours(idx):
+                    if idx < j:
+                        a, b = self.tracks[idx], self.tracks[j]
+                        if now - a[5] > STALE_S or now - b[5] > STALE_S or abs(a[2] - b[2]) > MIN_VERTICAL_M:
+                            continue
+                        if min(a[2], b[2]) < GROUND_ALT_M:
+                            continue
+                        _, d_cpa = closest_approach((a[0], a[1]), (a[3], a[4]), (b[0], b[1]), (b[3], b[4]))
+                        dist = math.hypot(a[0] - b[0], a[1] - b[1])
+                        if min(dist, d_cpa) < WARN_SEPARATION_M:
+                            out.append((idx, j, dist, d_cpa))
+        return out
+
+    # --- ACTIONS ---
+    # Called from telemetry threads: holds and resumes are queued on the mission
+    # scheduler (pause_mission talks to the autopilot and sleeps), never run here.
+
+    def _label(self, idx):
+        mgr = self.mission_mgrs.get(idx)
+        return mgr.backend.log_prefix if mgr else f"[D{idx-1}]"
+
+    def _handle(self, changes):
+        for pair, level, dist, t_cpa, d_cpa in changes:
+            i, j = pair
+            if level == LEVEL_BREACH:
+                print(f"{self._label(i)} [Separation] 🚨 WARNING: BREACH with D{j-1}: "
+                      f"{dist:.1f}m now, {d_cpa:.1f}m in {t_cpa:.1f}s")
+                if self.auto_pause:
+                    self._give_way(i, j)
+            elif level == LEVEL_WARN:
+                print(f"{self._label(i)} [Separation] ⚠️ Close to D{j-1}: {dist:.1f}m now, "
+                      f"{d_cpa:.1f}m in {t_cpa:.1f}s")
+            else:
+                print(f"{self._label(i)} [Separation] ✅ Clear of D{j-1}")
+            for cb in list(self.alert_callbacks):
+                cb(i, j, level, dist, t_cpa, d_cpa)
+        if changes:
+            self._release()
+
+    def _give_way(self, i, j):
+        # Higher ID yields first. If it is already holding, the other one stops too.
+        for idx in (max(i, j), min(i, j)):
+            mgr = self.mission_mgrs.get(idx)
+            if mgr is None or not mgr.active:
+                continue
+            if mgr.paused or idx in self.paused_by_us:
+                continue
+            print(f"{mgr.backend.log_prefix} [Separation] ⏸️ Holding to give way to D{(i + j - idx) - 1}")
+            self.paused_by_us.add(idx)
+            mgr.request_pause()
+            return
+
+    def _release(self):
+        # Resume drones we paused only once fully clear (a warning would re-breach on restart).
+        # A pair that is holding on both sides cannot clear by itself: once it is no longer
+        # a breach the lower ID (right of way) goes on; it is held again if it closes in.
+        with self.lock:
+            involved = {d for p in self.conflicts for d in p}
+            ready = {idx for idx in self.paused_by_us if idx not in involved}
+            ready |= {i for (i, j), level in self.conflicts.items()
+                      if level != LEVEL_BREACH and i in self.paused_by_us and j in self.paused_by_us}
+        for idx in ready:
+            self.paused_by_us.discard(idx)
+            mgr = self.mission_mgrs.get(idx)
+            if mgr and mgr.active:
+                print(f"{mgr.backend.log_prefix} [Separation] ▶️ Separation restored, resuming")
+                mgr.request_resume()
+
+
+# --- BENCHMARK ---
+
+def _brute_force(tracks):
+    ids = list(tracks)
+    out = 0
+    for a in range(len(ids)):
+        p = tracks[ids[a]]
+        for b in range(a + 1, len(ids)):
+            q = tracks[ids[b]]
+            if abs(p[2] - q[2]) > MIN_VERTICAL_M or min(p[2], q[2]) < GROUND_ALT_M:
+                continue
+            _, d_cpa = closest_approach((p[0], p[1]), (p[3], p[4]), (q[0], q[1]), (q[3], q[4]))
+            if min(math.hypot(p[0] - q[0], p[1] - q[1]), d_cpa) < WARN_SEPARATION_M:
+                out += 1
+    return out
+
+def benchmark(sizes=(10, 50, 200, 1000), density=4.0, updates=2000):
+    """
+    Random fleets spread at `density` drones per km^2.
+    Per-update cost (grid) should stay flat while the O(n^2) sweep grows.
+    """
+    import random
+    import time
+    import io
+    import contextlib
+    from clock import VirtualClock
+    rng = random.Random(1)
+    lat0, lon0 = 12.9716, 77.5946
+    print(f"{'drones':>7} {'grid upd/s':>11} {'us/upd':>8} {'full grid ms':>13} {'brute ms':>9} {'conflicts':>10}")
+    for n in sizes:
+        side = math.sqrt(n / density) * 1000.0
+        clock = VirtualClock()
+        mon = SeparationMonitor(clock=clock, auto_pause=False)
+        with contextlib.redirect_stdout(io.StringIO()): # alerts are not the point here
+            fixes = []
+            for idx in range(1, n + 1):
+                x, y = rng.uniform(0, side), rng.uniform(0, side)
+                lat = lat0 + y / 111320.0
+                lon = lon0 + x / (111320.0 * math.cos(math.radians(lat0)))
+                vn, ve = rng.uniform(-8, 8), rng.uniform(-8, 8)
+                fixes.append((idx, lat, lon, 10.0 + rng.uniform(-1, 1), vn, ve))
+                mon.update(idx, lat, lon, fixes[-1][3], vn, ve)
+
+            t0 = time.perf_counter()
+            for k in range(updates):
+                idx, lat, lon, alt, vn, ve = fixes[k % n]
+                mon.update(idx, lat + rng.uniform(-2e-6, 2e-6), lon, alt, vn, ve)
+            t_upd = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            found = mon.check_all()
+            t_full = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            brute = _brute_force(mon.tracks)
+            t_brute = time.perf_counter() - t0
+        assert len(found) == brute, f"grid missed pairs: {len(found)} vs {brute}"
+        print(f"{n:>7} {updates / t_upd:>11.0f} {1e6 * t_upd / updates:>8.1f} "
+              f"{1000 * t_full:>13.2f} {1000 * t_brute:>9.2f} {brute:>10}")
+
+
+if __name__ == "__main__":
+    benchmark()
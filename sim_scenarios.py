@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Mission regression scenarios on the kinematic simulator.
+Usage: python3 sim_scenarios.py [-v] [scenario ...]
+Exit code is non-zero if any scenario fails.
+"""
+import sys
+import math
+import time
+import io
+import os
+import contextlib
+import tempfile
+from simulator import FleetSimulator
+from mission import PHASE_COMPLETE, PHASE_ABORTED
+import fleet_planner
+
+_scratch = None # temp folder for the AI scenarios' geotag databases, removed at exit
+_geotag_dbs = []  # closed (queued writes finished) before the folder goes
+
+SQUARE = [(60, 0), (60, 60), (0, 60), (0, 0)]
+ZIGZAG = [(40, 0), (40, 20), (0, 20), (0, 40), (40, 40), (40, 60), (0, 60), (0, 80), (40, 80)]
+
+
+def _load(sim, idx, pts):
+    mgr = sim.mission_mgrs[idx]
+    mgr.clear_waypoints()
+    for e, n in pts:
+        mgr.add_waypoint(*sim.local_to_global(e, n))
+    return mgr
+
+def _fly(mgr_pts, blend_mode=None, altitude=10.0, timeout=900.0):
+    sim = FleetSimulator(1)
+    sim.start()
+    mgr = _load(sim, 1, mgr_pts)
+    t0 = sim.clock.time()
+    mgr.execute_guided_mission(altitude=altitude, blend_mode=blend_mode)
+    done = sim.run_until(lambda: not mgr.active, timeout=timeout)
+    return sim, mgr, done, sim.clock.time() - t0
+
+
+# --- SCENARIOS ---
+# Each returns (ok, detail string)
+
+def scenario_square():
+    sim, mgr, done, t = _fly(SQUARE)
+    v = sim.backends[1].vehicle
+    ok = done and mgr.phase == PHASE_COMPLETE and abs(v.z - 10.0) < 1.0
+    return ok, f"phase={mgr.phase} time={t:.1f}s alt={v.z:.1f}m"
+
+def scenario_blend_modes():
+    # Waypoint blending (carrot / lookahead) must beat stop-and-go on a zigzag
+    times = {}
+    for mode in ("off", "lookahead", "carrot"):
+        sim, mgr, done, t = _fly(ZIGZAG, blend_mode=mode)
+        if not done or mgr.phase != PHASE_COMPLETE:
+            return False, f"{mode} did not complete ({mgr.phase})"
+        times[mode] = t
+    ok = times["carrot"] < times["off"] and times["lookahead"] < times["off"]
+    detail = " ".join(f"{m}={t:.1f}s" for m, t in times.items())
+    saved = 100.0 * (1 - times["carrot"] / times["off"])
+    return ok, f"{detail} (carrot saves {saved:.0f}%)"
+
+def scenario_blend_actions():
+    # Carrot blending cuts corners, but never a drop / hover point: those are flown to WP_RADIUS
+    from mission import WP_RADIUS
+    from waypoint_store import ACTION_DROP, ACTION_HOVER
+    from geo import haversine
+    sim = FleetSimulator(1)
+    sim.start()
+    mgr = _load(sim, 1, ZIGZAG)
+    mgr.waypoints.set_attr(2, action=ACTION_DROP)
+    mgr.waypoints.set_attr(5, action=ACTION_HOVER)
+    misses = []
+    def record(i):
+        s = mgr.backend.state
+        misses.append(haversine(s['lat'], s['lon'], *mgr.waypoints[i]))
+    drop = mgr.drop_payload
+    mgr.drop_payload = lambda: (record(2), drop())
+    mgr.execute_guided_mission(altitude=10.0, blend_mode="carrot")
+    sim.run_until(lambda: mgr.phase == "PAUSED", timeout=300)
+    record(5)
+    mgr.resume_mission()
+    done = sim.run_until(lambda: not mgr.active, timeout=300)
+    ok = done and mgr.phase == PHASE_COMPLETE and len(misses) == 2 and max(misses) <= WP_RADIUS
+    return ok, f"drop {misses[0]:.1f}m hover {misses[-1]:.1f}m from point (limit {WP_RADIUS:.0f}m) phase={mgr.phase}"
+
+def scenario_pause_resume():
+    sim = FleetSimulator(1)
+    sim.start()
+    mgr = _load(sim, 1, SQUARE)
+    mgr.execute_guided_mission(altitude=10.0)
+    sim.run_until(lambda: mgr.wp_index >= 1, timeout=120)
+    mgr.pause_mission()
+    sim.run_for(8.0)
+    v = sim.backends[1].vehicle
+    held = (v.vx**2 + v.vy**2) ** 0.5 < 0.3
+    mgr.resume_mission()
+    done = sim.run_until(lambda: not mgr.active, timeout=300)
+    ok = held and done and mgr.phase == PHASE_COMPLETE
+    return ok, f"held={held} phase={mgr.phase}"
+
+def scenario_guided_refused():
+    sim = FleetSimulator(1)
+    sim.backends[1].vehicle.reject_modes.add('GUIDED')
+    sim.start()
+    mgr = _load(sim, 1, SQUARE)
+    t0 = sim.clock.time()
+    mgr.execute_guided_mission(altitude=10.0)
+    sim.run_until(lambda: not mgr.active, timeout=60)
+    t = sim.clock.time() - t0
+    return mgr.phase == PHASE_ABORTED and t < 10, f"phase={mgr.phase} after {t:.1f}s"
+
+def scenario_arm_refused():
+    sim = FleetSimulator(1)
+    sim.backends[1].vehicle.refuse_arm = True
+    sim.start()
+    mgr = _load(sim, 1, SQUARE)
+    mgr.execute_guided_mission(altitude=10.0)
+    sim.run_until(lambda: not mgr.active, timeout=60)
+    return mgr.phase == PHASE_ABORTED, f"phase={mgr.phase}"
+
+def scenario_fleet_survey():
+    # ~20 min of flying per drone: 4 drones split an 800 x 500 m survey area
+    sim = FleetSimulator(4, spacing=5.0)
+    sim.start()
+    corners = [sim.local_to_global(e, n) for e, n in [(-100, 50), (700, 50), (700, 550), (-100, 550)]]
+    etas = fleet_planner.assign_to_fleet(sim.mission_mgrs, polygon=corners, spacing=20.0)
+    if len(etas) != 4:
+        return False, f"planner assigned {len(etas)} drones"
+    for mgr in sim.mission_mgrs.values():
+        mgr.execute_guided_mission(altitude=15.0)
+    done = sim.run_until(lambda: not any(m.active for m in sim.mission_mgrs.values()), timeout=3600)
+    phases = [m.phase for m in sim.mission_mgrs.values()]
+    makespan = max(m.clock.time() - m.mission_start_time for m in sim.mission_mgrs.values())
+    batt = min(b.state['battery_remaining'] for b in sim.backends.values())
+    ok = done and all(p == PHASE_COMPLETE for p in phases)
+    return ok, f"makespan={makespan:.0f}s (planned {max(etas.values()):.0f}s) min_batt={batt:.0f}%"
+
+def scenario_emergency_land():
+    # smart_emergency_land runs its own thread with clock.sleep() -> follows virtual time
+    sim, mgr, done, t = _fly(SQUARE[:1])
+    b = sim.backends[1]
+    b.smart_emergency_land()
+    landed = sim.run_until(lambda: not b.vehicle.armed, timeout=120)
+    return landed and b.vehicle.z < 0.1, f"landed={landed} mode={b.vehicle.mode}"
+
+def scenario_terrain_follow():
+    # Synthetic SRTM tile: ground rises 1 m per ~11 m going North. Final WP 90 m North.
+    import os, tempfile
+    import numpy as np
+    from terrain import TerrainModel
+    sim = FleetSimulator(1)
+    lat0, lon0 = sim.home
+    n = 1201
+    rows = np.arange(n)[::-1].astype(np.float64) # row 0 = north edge
+    dem = (100.0 + rows * 10.0).astype('>i2')    # +10 m per 3" row (~92 m)
+    grid = np.repeat(dem[:, None], n, axis=1)
+    with tempfile.TemporaryDirectory() as d:
+        name = f"N{int(lat0):02d}E{int(lon0):03d}.hgt"
+        grid.tofile(os.path.join(d, name))
+        terrain = TerrainModel(d)
+        sim.start()
+        mgr = _load(sim, 1, [(0, 45), (0, 90)])
+        mgr.terrain = terrain
+        ground = terrain.elevations([w[0] for w in mgr.waypoints], [w[1] for w in mgr.waypoints])
+        home_z = terrain.elevation(*sim.home)
+        mgr.execute_guided_mission(altitude=10.0)
+        done = sim.run_until(lambda: not mgr.active, timeout=300)
+        sim.run_for(5.0)
+    v = sim.backends[1].vehicle
+    expected = 10.0 + ground[-1] - home_z
+    ok = done and abs(v.z - expected) < 0.5
+    return ok, f"alt={v.z:.1f}m expected={expected:.1f}m (ground +{ground[-1] - home_z:.1f}m)"
+
+def _crossing(auto_pause):
+    # D1 flies North, D2 flies East; both reach (0, 50) at the same time
+    from separation import SeparationMonitor
+    sim = FleetSimulator(0)
+    sim.add_drone(home=sim.local_to_global(0, 0))
+    sim.add_drone(home=sim.local_to_global(-50, 50))
+    mon = SeparationMonitor(sim.mission_mgrs, clock=sim.clock, auto_pause=auto_pause)
+    for idx, b in sim.backends.items():
+        mon.attach(idx, b)
+    sim.start()
+    _load(sim, 1, [(0, 100)])
+    _load(sim, 2, [(50, 50)])
+    for mgr in sim.mission_mgrs.values():
+        mgr.execute_guided_mission(altitude=10.0)
+    done = sim.run_until(lambda: not any(m.active for m in sim.mission_mgrs.values()), timeout=300)
+    return done, mon, sim
+
+def scenario_separation():
+    done_off, mon_off, _ = _crossing(auto_pause=False)
+    done, mon, sim = _crossing(auto_pause=True)
+    phases = [m.phase for m in sim.mission_mgrs.values()]
+    from separation import MIN_SEPARATION_M
+    ok = (done and all(p == PHASE_COMPLETE for p in phases)
+          and mon_off.min_distance < MIN_SEPARATION_M <= mon.min_distance)
+    return ok, f"min_dist unguarded={mon_off.min_distance:.1f}m guarded={mon.min_distance:.1f}m phases={phases}"
+
+def scenario_separation_head_on():
+    # D0 and D1 swap places on the same line: giving way alone cannot resolve it,
+    # the monitor has to hold both short of each other (stop-and-go at the breach edge)
+    from separation import SeparationMonitor, MIN_SEPARATION_M
+    result = {}
+    for auto_pause in (False, True):
+        sim = FleetSimulator(0)
+        sim.add_drone(home=sim.local_to_global(0, 0))
+        sim.add_drone(home=sim.local_to_global(0, 100))
+        mon = SeparationMonitor(sim.mission_mgrs, clock=sim.clock, auto_pause=auto_pause)
+        for idx, b in sim.backends.items():
+            mon.attach(idx, b)
+        sim.start()
+        _load(sim, 1, [(0, 100)])
+        _load(sim, 2, [(0, 0)])
+        for mgr in sim.mission_mgrs.values():
+            mgr.execute_guided_mission(altitude=10.0)
+        sim.run_for(120.0)
+        result[auto_pause] = (mon.min_distance, [m.paused for m in sim.mission_mgrs.values()])
+    (d_off, _), (d_on, held) = result[False], result[True]
+    ok = d_off < 1.0 and d_on > MIN_SEPARATION_M - 0.5 and all(held) # stopping overshoot < 0.5 m
+    return ok, f"min_dist unguarded={d_off:.1f}m guarded={d_on:.1f}m both holding={all(held)}"
+
+def _formation_run(compensate):
+    from formation import FormationController
+    sim = FleetSimulator(4, spacing=5.0)
+    sim.start()
+    followers = [sim.backends[i] for i in (2, 3, 4)]
+    for b in followers:
+        b.set_mode("GUIDED")
+    sim.run_for(1.0)
+    for b in followers:
+        b.arm_disarm(True)
+    sim.run_for(1.0)
+    for b in followers:
+        b.takeoff(10.0)
+    sim.run_for(10.0)
+    leader = _load(sim, 1, [(0, 150), (150, 150)])
+    # The simulated link has no transport delay: only the telemetry age is compensated
+    ctl = FormationController(sim.backends[1], followers, shape="v", spacing=8.0, latency=0.0, clock=sim.clock)
+    ctl.compensate = compensate
+    leader.execute_guided_mission(altitude=10.0)
+    ctl.start()
+    sim.run_until(lambda: leader.wp_index >= 0 and leader.phase == "WAYPOINT", timeout=60)
+    sim.run_for(15.0) # join + settle
+    cruise, turns = [], [] # cruise = straight flight, 5 s after the last course change
+    lb = sim.backends[1]
+    last_turn = sim.clock.time()
+    while leader.active:
+        sim.run_for(1.0)
+        course = math.atan2(lb.state['ve'], lb.state['vn'])
+        if abs((course - ctl.heading + math.pi) % (2 * math.pi) - math.pi) > math.radians(5):
+            last_turn = sim.clock.time()
+        if lb.state['speed'] > 4.0:
+            (cruise if sim.clock.time() - last_turn > 5.0 else turns).extend(ctl.slot_errors())
+    ctl.stop()
+    sim.run_for(0.5)
+    rms = (sum(e * e for e in cruise) / max(len(cruise), 1)) ** 0.5
+    return rms, max(turns or [0]), ctl
+
+def scenario_formation():
+    # 3 followers in a V behind a leader flying an L-shaped route at 5 m/s
+    rms0, _, _ = _formation_run(compensate=False)
+    rms, worst, ctl = _formation_run(compensate=True)
+    ok = rms < 0.5 and rms < rms0 and ctl.overruns == 0
+    return ok, f"cruise slot rms={rms:.2f}m (uncompensated {rms0:.2f}m) turn max={worst:.1f}m ticks={ctl.ticks}"
+
+def _ai_setup():
+    import ai_pilot # needs the vision stack (cv2 / detector backend)
+    sim = FleetSimulator(1)
+    sim.start()
+    mgr = _load(sim, 1, SQUARE)
+    mgr.execute_guided_mission(altitude=10.0)
+    sim.run_until(lambda: mgr.wp_index >= 1, timeout=120)
+    from geotag_db import GeotagDB
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.TemporaryDirectory(prefix="sim_scenarios_")
+    run = tempfile.mkdtemp(dir=_scratch.name)
+    db = GeotagDB(os.path.join(run, "geotags.db"), os.path.join(run, "evidence"))
+    _geotag_dbs.append(db)
+    pilot = ai_pilot.AIPilot(sim.backends[1], mgr, clock=sim.clock, geotag_db=db)
+    pilot.enabled = True
+    return ai_pilot, sim, mgr, pilot
+
+def scenario_ai_lost_target():
+    # SEARCH -> TRACK (mission paused) -> target lost for 2 s -> SEARCH (mission resumed)
+    ai, sim, mgr, pilot = _ai_setup()
+    cx, cy = ai.CENTER_X, ai.CENTER_Y
+    pilot._update_state_machine((cx + 80, cy, 0, 0, 0, 0), cx, cy)
+    t0 = pilot.last_detection_time # engage time
+    sim.run_for(0.5)
+    paused = mgr.phase == "PAUSED"
+    while pilot.state == "TRACK" and sim.clock.time() - t0 < 10:
+        pilot._update_state_machine(None, cx, cy)
+        sim.run_for(0.1)
+    lost_after = sim.clock.time() - t0
+    done = sim.run_until(lambda: not mgr.active, timeout=300)
+    ok = paused and pilot.state == "SEARCH" and 1.9 < lost_after < 2.5 and mgr.phase == PHASE_COMPLETE
+    return ok, f"paused={paused} lost_after={lost_after:.1f}s phase={mgr.phase}"
+
+def scenario_ai_geotag():
+    # Centered target: TRACK -> LOCK -> GEOTAG after LOCK_DURATION, then mission resumes
+    ai, sim, mgr, pilot = _ai_setup()
+    from geotag_db import iter_rows
+    import numpy as np
+    cx, cy = ai.CENTER_X, ai.CENTER_Y
+    centered = (cx, cy, 0, 0, 0, 0)
+    pilot.latest_frame = np.zeros((ai.FRAME_HEIGHT, ai.FRAME_WIDTH, 3), dtype=np.uint8) # evidence frame
+    t0 = sim.clock.time()
+    while pilot.state != "GEOTAG" and sim.clock.time() - t0 < 10:
+        pilot._update_state_machine(centered, cx, cy)
+        sim.run_for(0.1)
+    lock_time = sim.clock.time() - t0
+    pilot._update_state_machine(centered, cx, cy) # performs the geotag
+    while pilot.state == "HOVER" and sim.clock.time() - t0 < 20: # hover runs on the incoming frames
+        pilot._update_state_machine(None, cx, cy)
+        sim.run_for(0.1)
+    done = sim.run_until(lambda: not mgr.active, timeout=300)
+    pilot.geotag_db.flush()
+    rows = list(iter_rows(pilot.geotag_db.path))
+    saved = len(rows) == 1 and rows[0]['image_path'] and os.path.exists(rows[0]['image_path'])
+    ok = len(pilot.geotagged_locations) == 1 and saved and pilot.state == "SEARCH" and mgr.phase == PHASE_COMPLETE
+    return ok, f"tags={len(pilot.geotagged_locations)} db rows={len(rows)} lock_time={lock_time:.1f}s phase={mgr.phase}"
+
+def scenario_ai_geotag_dedup():
+    # Tagged person seen again from the same spot -> tag confidence up, no second pause / tag;
+    # a person once the drone is past the merge radius -> engaged as a new target
+    from geo import to_local
+    ai, sim, mgr, pilot = _ai_setup()
+    from geotag_db import iter_rows
+    cx, cy = ai.CENTER_X, ai.CENTER_Y
+    centered = (cx, cy, 0, 0, 0, 0)
+    pilot.target_conf = 0.6
+    t0 = sim.clock.time()
+    while pilot.state != "GEOTAG" and sim.clock.time() - t0 < 10:
+        pilot._update_state_machine(centered, cx, cy)
+        sim.run_for(0.1)
+    pilot._update_state_machine(centered, cx, cy) # performs the geotag
+    tag = pilot.geotags.tags[0]
+    while pilot.state == "HOVER":
+        sim.run_for(0.1)
+        pilot._update_state_machine(None, cx, cy)
+    sim.run_for(0.5) # mission picks up again
+    pilot.target_conf = 0.8
+    pilot._update_state_machine(centered, cx, cy)
+    deduped = pilot.state == "SEARCH" and mgr.phase != "PAUSED" and len(pilot.geotagged_locations) == 1
+    state = pilot.backend.state
+    sim.run_until(lambda: math.hypot(*to_local(state['lat'], state['lon'], tag.lat, tag.lon)) > 2 * pilot.geotags.radius,
+                  timeout=120)
+    pilot._update_state_machine(centered, cx, cy)
+    engaged = pilot.state == "TRACK"
+    pilot.geotag_db.flush()
+    stored = [r['confidence'] for r in iter_rows(pilot.geotag_db.path)]
+    ok = deduped and engaged and abs(tag.confidence - 0.8) < 1e-6 and stored == [tag.confidence]
+    return ok, f"tags={len(pilot.geotagged_locations)} conf {tag.confidence:.2f} re-engaged past radius={engaged}"
+
+def scenario_ai_tracker():
+    # Lock onto one track ID through missed detections and a second person crossing the centre
+    import numpy as np
+    ai, sim, mgr, pilot = _ai_setup()
+    pilot.start_requested = time.perf_counter()
+    pilot.pipeline = type("Pipeline", (), {'detect_every': 1})()
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (ai.FRAME_HEIGHT, ai.FRAME_WIDTH, 3), dtype=np.uint8)
+    person = rng.integers(0, 255, (56, 24, 3), dtype=np.uint8)
+    cx, cy = ai.CENTER_X, ai.CENTER_Y
+    ids, detector_frames, frames = set(), 0, 0
+    t0 = sim.clock.time()
+    while not pilot.geotagged_locations and sim.clock.time() - t0 < 10:
+        t = sim.clock.time() - t0
+        frame = background.copy()
+        people = [(cx + max(60 - 25 * t, 0), cy, 0.9 if frames % 4 else 0.3)] # every 4th: blurred, low score
+        if 1.0 < t < 3.0:
+            people.append((cx - 80 + 50 * (t - 1.0), cy + 10, 0.9)) # walks through the middle
+        dets = []
+        for x, y, score in people:
+            x1, y1 = int(x) - 12, int(y) - 28
+            frame[y1:y1 + 56, x1:x1 + 24] = person
+            if frames % 7 != 6: # plus outright misses
+                dets.append((x1, y1, x1 + 24, y1 + 56, score, 0))
+        frames += 1
+        detect = frames % pilot.pipeline.detect_every == 0
+        detector_frames += detect
+        pilot._on_detections(frame, np.array(dets, dtype=np.float32).reshape(-1, 6) if detect else None, sim.clock.time())
+        if pilot.target_track_id is not None:
+            ids.add(pilot.target_track_id)
+        sim.run_for(1 / 15)
+    ok = len(pilot.geotagged_locations) == 1 and len(ids) == 1 and detector_frames < frames
+    return ok, f"tags={len(pilot.geotagged_locations)} locked_ids={sorted(ids)} detector {detector_frames}/{frames} frames"
+
+
+SCENARIOS = {
+    'square': scenario_square,
+    'blend_modes': scenario_blend_modes,
+    'blend_actions': scenario_blend_actions,
+    'pause_resume': scenario_pause_resume,
+    'guided_refused': scenario_guided_refused,
+    'arm_refused': scenario_arm_refused,
+    'fleet_survey': scenario_fleet_survey,
+    'emergency_land': scenario_emergency_land,
+    'terrain_follow': scenario_terrain_follow,
+    'separation': scenario_separation,
+    'head_on': scenario_separation_head_on,
+    'formation': scenario_formation,
+    'ai_lost_target': scenario_ai_lost_target,
+    'ai_geotag': scenario_ai_geotag,
+    'ai_geotag_dedup': scenario_ai_geotag_dedup,
+    'ai_tracker': scenario_ai_tracker,
+}
+
+def main(argv):
+    verbose = '-v' in argv
+    names = [a for a in argv if not a.startswith('-')] or list(SCENARIOS)
+    failed = 0
+    for name in names:
+        t0 = time.time()
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with sink:
+                ok, detail = SCENARIOS[name]()
+        except ImportError as e:
+            print(f"⏭️ SKIP  {name:<16} missing dependency: {e.name}")
+            continue
+        except Exception as e:
+            ok, detail = False, f"EXCEPTION {e!r}"
+        wall = time.time() - t0
+        failed += not ok
+        print(f"{'✅ PASS' if ok else '❌ FAIL'}  {name:<16} {wall:6.2f}s wall  {detail}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for db in _geotag_dbs:
+            db.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
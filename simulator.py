@@ -0,0 +1,452 @@
+import math
+import threading
+import time
+from pymavlink import mavutil
+from backend import DroneBackend
+from mission import MissionManager, MissionScheduler
+from clock import VirtualClock
+from geo import to_local, to_global
+
+# --- SIM CONFIGURATION ---
+SIM_DT = 0.05                 # s, integration step (virtual time)
+SYNC_TIMEOUT = 1.0            # s (wall), max wait for a background thread per step
+DEFAULT_HOME = (12.9716, 77.5946)
+WPNAV_SPEED = 5.0             # m/s, default horizontal guided speed
+ACCEL_MAX = 2.5               # m/s^2, horizontal + vertical accel limit
+CLIMB_RATE = 2.5              # m/s
+DESCENT_RATE = 1.5            # m/s
+LAND_SPEED = 0.7              # m/s, final descent in LAND / RTL
+RTL_ALT = 15.0                # m
+VEL_CMD_TIMEOUT = 3.0         # s, guided velocity commands expire (like ArduCopter)
+YAW_RATE_MAX = math.radians(90)
+GRAVITY = 9.81
+
+# Battery (4S 10Ah LiPo)
+BATTERY_MAH = 10000
+CELLS = 4
+HOVER_CURRENT = 18.0          # A
+CURRENT_PER_MS = 1.2          # A per m/s of ground speed
+
+# Telemetry rates (Hz) - roughly what DroneBackend requests from a real FC
+TELEMETRY_RATES = {
+    'HEARTBEAT': 1,
+    'GLOBAL_POSITION_INT': 4,
+    'ATTITUDE': 10,
+    'SYS_STATUS': 1,
+    'GPS_RAW_INT': 1,
+}
+
+MODE_IDS = {name: mode_id for mode_id, name in mavutil.mode_mapping_acm.items()}
+
+
+class SimVehicle:
+    """
+    Point-mass copter with an ArduCopter-like guided controller.
+    Local frame: x East, y North, z Up (meters from home).
+    """
+    def __init__(self, home=DEFAULT_HOME):
+        self.home = home
+        self.x = self.y = self.z = 0.0
+        self.vx = self.vy = self.vz = 0.0
+        self.yaw = 0.0
+        self.roll = self.pitch = 0.0
+        self.armed = False
+        self.mode = 'STABILIZE'
+        self.speed_limit = WPNAV_SPEED
+        self.t = 0.0
+
+        # Guided targets
+        self.pos_target = None   # (x, y, z)
+        self.vel_ff = (0.0, 0.0, 0.0)
+        self.vel_target = None   # (vx, vy, vz) ENU
+        self.vel_target_time = 0.0
+        self.rtl_stage = None
+
+        # Battery
+        self.used_mah = 0.0
+        self.current = 0.0
+
+        # Fault injection (regression scenarios)
+        self.reject_modes = set()
+        self.refuse_arm = False
+
+        self.servos = {}
+
+    # --- COMMAND HANDLERS (called by SimLink) ---
+
+    def set_mode(self, mode):
+        if mode in self.reject_modes:
+            return False
+        if mode != self.mode:
+            self.pos_target = None
+            self.vel_target = None
+            self.rtl_stage = 'CLIMB' if mode == 'RTL' else None
+        self.mode = mode
+        return True
+
+    def arm(self, arm, force=False):
+        if arm:
+            if self.refuse_arm and not force:
+                return False
+            self.armed = True
+        elif force or self.z < 0.2:
+            self.armed = False
+        return True
+
+    def takeoff(self, alt):
+        if self.mode != 'GUIDED' or not self.armed:
+            return False
+        self.pos_target = (self.x, self.y, alt)
+        self.vel_ff = (0.0, 0.0, 0.0)
+        return True
+
+    def set_position_target(self, lat, lon, alt, vel=None):
+        if self.mode != 'GUIDED' or not self.armed or self.z < 0.5 and self.pos_target is None:
+            return
+        x, y = to_local(lat, lon, self.home[0], self.home[1])
+        self.pos_target = (x, y, alt)
+        self.vel_ff = vel or (0.0, 0.0, 0.0)
+        self.vel_target = None
+
+    def set_velocity_target(self, vn, ve, vd):
+        if self.mode != 'GUIDED' or not self.armed:
+            return
+        self.vel_target = (ve, vn, -vd)
+        self.vel_target_time = self.t
+        self.pos_target = None
+
+    # --- DYNAMICS ---
+
+    def _desired_velocity(self):
+        if not self.armed:
+            return (0.0, 0.0, 0.0)
+
+        if self.mode == 'GUIDED':
+            if self.vel_target is not None and self.t - self.vel_target_time < VEL_CMD_TIMEOUT:
+                return self.vel_target
+            if self.pos_target is not None:
+                return self._goto_velocity(self.pos_target, self.vel_ff)
+            return (0.0, 0.0, 0.0)
+
+        if self.mode == 'LAND':
+            return (0.0, 0.0, -LAND_SPEED)
+
+        if self.mode == 'RTL':
+            if self.rtl_stage == 'CLIMB':
+                if self.z >= RTL_ALT - 0.5:
+                    self.rtl_stage = 'RETURN'
+                return (0.0, 0.0, CLIMB_RATE)
+            if self.rtl_stage == 'RETURN':
+                if math.hypot(self.x, self.y) < 1.0:
+                    self.rtl_stage = 'LAND'
+                return self._goto_velocity((0.0, 0.0, self.z), (0.0, 0.0, 0.0))
+            return (0.0, 0.0, -LAND_SPEED)
+
+        return (0.0, 0.0, 0.0) # LOITER / POSHOLD / BRAKE / ALT_HOLD ... hold position
+
+    def _goto_velocity(self, target, ff):
+        dx, dy = target[0] - self.x, target[1] - self.y
+        dist = math.hypot(dx, dy)
+        vx, vy = ff[0], ff[1]
+        if dist > 0.05:
+            # Square-root braking curve: arrive with zero speed unless fed forward
+            v = min(self.speed_limit, math.sqrt(2 * ACCEL_MAX * dist))
+            vx += dx / dist * v
+            vy += dy / dist * v
+        mag = math.hypot(vx, vy)
+        if mag > self.speed_limit:
+            vx, vy = vx / mag * self.speed_limit, vy / mag * self.speed_limit
+        vz = max(min((target[2] - self.z) * 1.0, CLIMB_RATE), -DESCENT_RATE)
+        return (vx, vy, vz)
+
+    def update(self, dt):
+        self.t += dt
+        dvx, dvy, dvz = self._desired_velocity()
+        ax, ay = (dvx - self.vx) / dt, (dvy - self.vy) / dt
+        a = math.hypot(ax, ay)
+        if a > ACCEL_MAX:
+            ax, ay = ax / a * ACCEL_MAX, ay / a * ACCEL_MAX
+        az = max(min((dvz - self.vz) / dt, ACCEL_MAX), -ACCEL_MAX)
+
+        self.vx += ax * dt
+        self.vy += ay * dt
+        self.vz += az * dt
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.z += self.vz * dt
+
+        if self.z <= 0.0:
+            self.z = 0.0
+            self.vz = max(self.vz, 0.0)
+            if self.mode == 'LAND' or (self.mode == 'RTL' and self.rtl_stage == 'LAND'):
+                self.armed = False # Auto-disarm on touchdown
+            if not self.armed:
+                self.vx = self.vy = self.vz = 0.0
+
+        # Yaw follows the direction of travel (ArduCopter default in guided/auto)
+        ground_speed = math.hypot(self.vx, self.vy)
+        if ground_speed > 1.0:
+            target_yaw = math.atan2(self.vx, self.vy) # heading from North
+            err = (target_yaw - self.yaw + math.pi) % (2 * math.pi) - math.pi
+            step = max(min(err, YAW_RATE_MAX * dt), -YAW_RATE_MAX * dt)
+            self.yaw = (self.yaw + step + math.pi) % (2 * math.pi) - math.pi
+
+        # Attitude from acceleration in body frame (fwd / right)
+        a_fwd = ax * math.sin(self.yaw) + ay * math.cos(self.yaw)
+        a_right = ax * math.cos(self.yaw) - ay * math.sin(self.yaw)
+        self.pitch = -math.atan2(a_fwd, GRAVITY)
+        self.roll = math.atan2(a_right, GRAVITY)
+
+        # Battery
+        if self.armed and self.z > 0.1:
+            self.current = HOVER_CURRENT + CURRENT_PER_MS * ground_speed
+        elif self.armed:
+            self.current = 2.0
+        else:
+            self.current = 0.5
+        self.used_mah += self.current * dt / 3.6
+
+    # --- OUTPUTS ---
+
+    @property
+    def battery_remaining(self):
+        return max(0.0, 100.0 * (1.0 - self.used_mah / BATTERY_MAH))
+
+    @property
+    def voltage(self):
+        # Linear 4.2 -> 3.5 V/cell with a little sag under load
+        cell = 3.5 + 0.7 * self.battery_remaining / 100.0 - 0.004 * self.current
+        return cell * CELLS
+
+    def global_position(self):
+        return to_global(self.x, self.y, self.home[0], self.home[1])
+
+
+class _SimMav:
+    """The subset of pymavlink's `master.mav` that DroneBackend / MissionManager use"""
+    def __init__(self, vehicle):
+        self.v = vehicle
+
+    def heartbeat_send(self, *args): pass
+    def request_data_stream_send(self, *args): pass
+    def mission_clear_all_send(self, *args): pass
+    def mission_count_send(self, *args): pass
+    def mission_item_int_send(self, *args): pass
+
+    def set_position_target_global_int_send(self, time_boot_ms, target_system, target_component,
+                                            frame, type_mask, lat_int, lon_int, alt,
+                                            vx, vy, vz, afx, afy, afz, yaw, yaw_rate):
+        vel = None
+        if not type_mask & 0b111000: # velocity bits enabled (NED -> ENU)
+            vel = (vy, vx, -vz)
+        if not type_mask & 0b111:
+            self.v.set_position_target(lat_int / 1e7, lon_int / 1e7, alt, vel)
+
+    def set_position_target_local_ned_send(self, time_boot_ms, target_system, target_component,
+                                           frame, type_mask, x, y, z, vx, vy, vz,
+                                           afx, afy, afz, yaw, yaw_rate):
+        if not type_mask & 0b111000:
+            self.v.set_velocity_target(vx, vy, vz)
+
+    def command_long_send(self, target_system, target_component, command, confirmation,
+                          p1, p2, p3, p4, p5, p6, p7):
+        self._command(command, p1, p2, p3, p4, p5, p6, p7)
+
+    def command_int_send(self, target_system, target_component, frame, command, current, autocontinue,
+                         p1, p2, p3, p4, x, y, z):
+        self._command(command, p1, p2, p3, p4, x, y, z)
+
+    def _command(self, command, p1, p2, p3, p4, p5, p6, p7):
+        mav = mavutil.mavlink
+        if command == mav.MAV_CMD_COMPONENT_ARM_DISARM:
+            self.v.arm(bool(p1), force=(p2 == 21196))
+        elif command == mav.MAV_CMD_NAV_TAKEOFF:
+            self.v.takeoff(p7)
+        elif command == mav.MAV_CMD_DO_CHANGE_SPEED:
+            if p2 > 0: self.v.speed_limit = p2
+        elif command == mav.MAV_CMD_DO_SET_SERVO:
+            self.v.servos[int(p1)] = int(p2)
+        # SET_MESSAGE_INTERVAL, RUN_PREARM_CHECKS, DO_SET_HOME: nothing to simulate
+
+
+class SimLink:
+    """Stands in for the pymavlink connection object (`DroneBackend.master`)"""
+    target_system = 1
+    target_component = 1
+
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.mav = _SimMav(vehicle)
+
+    def mode_mapping(self):
+        return dict(MODE_IDS)
+
+    def set_mode(self, mode_id):
+        self.vehicle.set_mode(mavutil.mode_mapping_acm.get(mode_id, 'UNKNOWN'))
+
+    def close(self):
+        pass
+
+
+class SimBackend(DroneBackend):
+    """
+    DroneBackend whose MAVLink link is an in-process SimVehicle.
+    All command methods of DroneBackend work unchanged; telemetry is generated
+    as real pymavlink messages and fed through _process_message().
+    """
+    def __init__(self, drone_id=1, clock=None, home=DEFAULT_HOME):
+        super().__init__(drone_id=drone_id, connect_str="sim", clock=clock or VirtualClock())
+        self.vehicle = SimVehicle(home)
+        self.next_due = {}
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.master = SimLink(self.vehicle)
+        self.connected = True
+        print(f"{self.log_prefix} Connected to simulator")
+        self._emit('connected')
+        self._send(mavutil.mavlink.MAVLink_statustext_message(6, b"Ready to fly"))
+
+    def stop(self):
+        self.running = False
+        self.connected = False
+
+    def tick(self, dt):
+        """Integrate the vehicle and emit whatever telemetry is due"""
+        if not self.running: return
+        self.vehicle.update(dt)
+        now = self.clock.time()
+        for name, rate in TELEMETRY_RATES.items():
+            if now + 1e-9 >= self.next_due.get(name, 0.0):
+                self.next_due[name] = now + 1.0 / rate
+                self._send(self._build(name, now))
+
+    def _send(self, msg):
+        self._process_message(msg)
+
+    def _build(self, name, now):
+        v = self.vehicle
+        mav = mavutil.mavlink
+        t_ms = int(now * 1000) & 0xFFFFFFFF
+        if name == 'HEARTBEAT':
+            base = mav.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+            if v.armed: base |= mav.MAV_MODE_FLAG_SAFETY_ARMED
+            status = mav.MAV_STATE_ACTIVE if v.armed else mav.MAV_STATE_STANDBY
+            return mav.MAVLink_heartbeat_message(mav.MAV_TYPE_QUADROTOR, mav.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                                                 base, MODE_IDS.get(v.mode, 0), status, 3)
+        if name == 'GLOBAL_POSITION_INT':
+            lat, lon = v.global_position()
+            hdg = int((math.degrees(v.yaw) % 360) * 100)
+            return mav.MAVLink_global_position_int_message(
+                t_ms, int(lat * 1e7), int(lon * 1e7), int(v.z * 1000), int(v.z * 1000),
+                int(v.vy * 100), int(v.vx * 100), int(-v.vz * 100), hdg)
+        if name == 'ATTITUDE':
+            return mav.MAVLink_attitude_message(t_ms, v.roll, v.pitch, v.yaw, 0, 0, 0)
+        if name == 'SYS_STATUS':
+            return mav.MAVLink_sys_status_message(0, 0, 0xFFFFFFFF, 0, int(v.voltage * 1000),
+                                                  int(v.current * 100), int(v.battery_remaining),
+                                                  0, 0, 0, 0, 0, 0)
+        if name == 'GPS_RAW_INT':
+            lat, lon = v.global_position()
+            return mav.MAVLink_gps_raw_int_message(int(now * 1e6), 3, int(lat * 1e7), int(lon * 1e7),
+                                                   int(v.z * 1000), 80, 120, 0, 0, 12)
+
+
+class FleetSimulator:
+    """
+    N simulated drones + MissionManagers on one virtual clock.
+    Missions are stepped by a non-threaded MissionScheduler, so everything runs
+    deterministically in the caller's thread as fast as the CPU allows.
+    """
+    def __init__(self, n_drones=1, home=DEFAULT_HOME, spacing=5.0, dt=SIM_DT):
+        self.clock = VirtualClock()
+        self.clock.on_sleep = self._on_sleep
+        self.dt = dt
+        self.home = home
+        self.spacing = spacing
+        self.scheduler = MissionScheduler(clock=self.clock, threaded=False)
+        self.backends = {}
+        self.mission_mgrs = {}
+        self._stepping = False
+        self.owner = threading.current_thread()
+        self._cond = threading.Condition()
+        self._sleepers = {} # background thread -> virtual wake time (None = running)
+        for _ in range(n_drones):
+            self.add_drone()
+
+    def add_drone(self, home=None):
+        idx = len(self.backends) + 1
+        if home is None:
+            # Line the drones up East of the reference home
+            home = to_global((idx - 1) * self.spacing, 0.0, self.home[0], self.home[1])
+        b = SimBackend(drone_id=idx, clock=self.clock, home=home)
+        self.backends[idx] = b
+        self.mission_mgrs[idx] = MissionManager(b, clock=self.clock, scheduler=self.scheduler)
+        return idx
+
+    def start(self, settle=2.0):
+        """Connect every drone and run until GPS/home are reported"""
+        for b in self.backends.values():
+            b.start()
+        self.run_for(settle)
+
+    def step(self):
+        self._stepping = True
+        try:
+            self.clock.advance(self.dt)
+            for b in self.backends.values():
+                b.tick(self.dt)
+            self.scheduler.poll(self.clock.time())
+        finally:
+            self._stepping = False
+        if self._sleepers:
+            self._sync_threads()
+
+    def run_for(self, seconds):
+        end = self.clock.time() + seconds
+        while self.clock.time() < end - 1e-9:
+            self.step()
+
+    def run_until(self, predicate, timeout=600.0):
+        """Steps until predicate() is true. Returns False on (virtual) timeout."""
+        end = self.clock.time() + timeout
+        while not predicate():
+            if self.clock.time() >= end:
+                return False
+            self.step()
+        return True
+
+    def _on_sleep(self, seconds):
+        # Code under test called clock.sleep(): let the world move on meanwhile
+        if threading.current_thread() is not self.owner:
+            # Background thread (e.g. smart_emergency_land): wait for the sim to get there
+            me = threading.current_thread()
+            with self._cond:
+                wake = self.clock.time() + seconds
+                self._sleepers[me] = wake
+                self._cond.notify_all()
+                while self.clock.time() < wake:
+                    self._cond.wait(0.05)
+                self._sleepers[me] = None
+        elif self._stepping:
+            self.clock.advance(seconds)
+        else:
+            self.run_for(seconds)
+
+    def _sync_threads(self):
+        # Lockstep with background threads: don't move on while one is due or still
+        # running its next chunk, otherwise virtual time races ahead of it.
+        deadline = time.time() + SYNC_TIMEOUT
+        with self._cond:
+            self._cond.notify_all()
+            while time.time() < deadline:
+                now = self.clock.time()
+                for t in [t for t in self._sleepers if not t.is_alive()]:
+                    del self._sleepers[t]
+                if all(w is not None and w > now for w in self._sleepers.values()):
+                    return
+                self._cond.wait(0.001)
+
+    def local_to_global(self, east, north):
+        return to_global(east, north, self.home[0], self.home[1])
@@ -0,0 +1,220 @@
+import os
+import re
+import math
+from collections import OrderedDict
+import numpy as np
+
+# --- CONFIGURATION ---
+DEM_DIR = "dem"          # Local folder with SRTM .hgt and/or GeoTIFF tiles (no network needed)
+TILE_CACHE_SIZE = 16     # Tiles kept memory-mapped at once (LRU)
+HGT_VOID = -32768        # SRTM "no data" value
+
+# GeoTIFF GeoKeys (GeoKeyDirectoryTag)
+GEOKEY_MODEL_TYPE = 1024      # GTModelTypeGeoKey: 2 = geographic lat/lon
+GEOKEY_RASTER_TYPE = 1025     # GTRasterTypeGeoKey: 1 = PixelIsArea, 2 = PixelIsPoint
+GEOKEY_GEOGRAPHIC_TYPE = 2048 # GeographicTypeGeoKey: 4326 = WGS 84
+MODEL_TYPE_GEOGRAPHIC = 2
+RASTER_PIXEL_IS_POINT = 2
+EPSG_WGS84 = 4326
+
+HGT_NAME = re.compile(r"^([NS])(\d{2})([EW])(\d{3})\.hgt$", re.IGNORECASE)
+
+
+class DEMTile:
+    """
+    One elevation raster. `data` is row-major, row 0 = north edge, col 0 = west edge,
+    sampled on grid points (SRTM convention: edges overlap with the neighbours).
+    """
+    def __init__(self, data, lat_north, lon_west, lat_step, lon_step, nodata=None):
+        self.data = data # np.memmap - pages are only read when touched
+        self.lat_north = lat_north
+        self.lon_west = lon_west
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+        self.nodata = nodata
+        self.rows, self.cols = data.shape
+
+    def contains(self, lats, lons):
+        r = (self.lat_north - lats) / self.lat_step
+        c = (lons - self.lon_west) / self.lon_step
+        return (r >= 0) & (r <= self.rows - 1) & (c >= 0) & (c <= self.cols - 1)
+
+    def bilinear(self, lats, lons):
+        """Vectorized bilinear interpolation. Returns NaN where any corner is void."""
+        r = (self.lat_north - lats) / self.lat_step
+        c = (lons - self.lon_west) / self.lon_step
+        r0 = np.clip(np.floor(r).astype(np.intp), 0, self.rows - 2)
+        c0 = np.clip(np.floor(c).astype(np.intp), 0, self.cols - 2)
+        fr = r - r0
+        fc = c - c0
+
+        # Fancy indexing on the memmap only pulls the 4 neighbours of each query point
+        z00 = self.data[r0, c0].astype(np.float64)
+        z01 = self.data[r0, c0 + 1].astype(np.float64)
+        z10 = self.data[r0 + 1, c0].astype(np.float64)
+        z11 = self.data[r0 + 1, c0 + 1].astype(np.float64)
+        if self.nodata is not None:
+            for z in (z00, z01, z10, z11):
+                z[z == self.nodata] = np.nan
+
+        top = z00 * (1 - fc) + z01 * fc
+        bottom = z10 * (1 - fc) + z11 * fc
+        return top * (1 - fr) + bottom * fr
+
+
+def open_hgt(path):
+    """SRTM .hgt: big-endian int16, square (1201 = 3", 3601 = 1"), named by SW corner"""
+    m = HGT_NAME.match(os.path.basename(path))
+    if not m:
+        raise ValueError(f"Not an SRTM tile name: {path}")
+    lat = int(m.group(2)) * (1 if m.group(1).upper() == 'N' else -1)
+    lon = int(m.group(4)) * (1 if m.group(3).upper() == 'E' else -1)
+    n = int(math.isqrt(os.path.getsize(path) // 2))
+    data = np.memmap(path, dtype='>i2', mode='r', shape=(n, n))
+    step = 1.0 / (n - 1)
+    return DEMTile(data, lat + 1, lon, step, step, nodata=HGT_VOID)
+
+
+def _geokeys(page):
+    """Short-valued GeoKeys stored inline in the GeoKeyDirectoryTag: {key id: value}"""
+    tag = page.tags.get('GeoKeyDirectoryTag')
+    if tag is None:
+        raise ValueError("no GeoKeyDirectoryTag")
+    d = tag.value # header (version, revision, minor, n) then n x (key, location, count, value)
+    return {d[i]: d[i + 3] for i in range(4, 4 + 4 * d[3], 4) if d[i + 1] == 0}
+
+def _check_memmappable(page):
+    """open_geotiff can only map uncompressed, strip-organised, north-up EPSG:4326 rasters"""
+    keys = _geokeys(page)
+    if int(page.compression) != 1:
+        raise ValueError(f"compressed ({page.compression}), re-export uncompressed")
+    if page.is_tiled:
+        raise ValueError("tiled layout, re-export with strips")
+    if not page.is_memmappable:
+        raise ValueError("image data is not contiguous in the file")
+    if 'ModelTransformationTag' in page.tags or 'ModelPixelScaleTag' not in page.tags:
+        raise ValueError("not north-up (affine transform instead of pixel scale)")
+    if keys.get(GEOKEY_MODEL_TYPE) != MODEL_TYPE_GEOGRAPHIC or keys.get(GEOKEY_GEOGRAPHIC_TYPE) != EPSG_WGS84:
+        raise ValueError("not EPSG:4326 lat/lon")
+    return keys
+
+def _geotiff_georef(tif):
+    page = tif.pages[0]
+    keys = _check_memmappable(page)
+    scale = page.tags['ModelPixelScaleTag'].value    # (sx, sy, sz)
+    tie = page.tags['ModelTiepointTag'].value        # (i, j, k, x, y, z)
+    nodata = page.tags.get('GDAL_NODATA')
+    nodata = float(nodata.value) if nodata is not None else None
+    lon_west = tie[3] - tie[0] * scale[0]
+    lat_north = tie[4] + tie[1] * scale[1]
+    if keys.get(GEOKEY_RASTER_TYPE) != RASTER_PIXEL_IS_POINT:
+        # PixelIsArea (the default): tie points are pixel corners, shift to pixel centres
+        lat_north, lon_west = lat_north - scale[1] / 2, lon_west + scale[0] / 2
+    return lat_north, lon_west, scale[1], scale[0], nodata, page.shape[:2]
+
+def open_geotiff(path):
+    """Uncompressed, north-up, EPSG:4326 GeoTIFF (memory-mapped via tifffile)"""
+    import tifffile # Optional dependency, only needed for GeoTIFF DEMs
+    with tifffile.TiffFile(path) as tif:
+        lat_north, lon_west, lat_step, lon_step, nodata, _ = _geotiff_georef(tif)
+    data = tifffile.memmap(path, mode='r')
+    if data.ndim > 2:
+        data = data[..., 0]
+    return DEMTile(data, lat_north, lon_west, lat_step, lon_step, nodata=nodata)
+
+
+class TerrainModel:
+    """
+    Offline terrain elevation (meters AMSL) from local DEM tiles.
+    Tiles are indexed once at startup and opened lazily through an LRU cache.
+    """
+    def __init__(self, dem_dir=DEM_DIR, cache_size=TILE_CACHE_SIZE):
+        self.dem_dir = dem_dir
+        self.cache_size = cache_size
+        self.cache = OrderedDict() # path -> DEMTile
+        self.hgt_index = {}        # (lat_sw, lon_sw) -> path
+        self.tif_index = []        # [(lat_s, lat_n, lon_w, lon_e, path)]
+        self._scan()
+
+    def _scan(self):
+        if not os.path.isdir(self.dem_dir):
+            print(f"[Terrain] ⚠️ DEM folder not found: {self.dem_dir}")
+            return
+        for name in sorted(os.listdir(self.dem_dir)):
+            path = os.path.join(self.dem_dir, name)
+            m = HGT_NAME.match(name)
+            if m:
+                lat = int(m.group(2)) * (1 if m.group(1).upper() == 'N' else -1)
+                lon = int(m.group(4)) * (1 if m.group(3).upper() == 'E' else -1)
+                self.hgt_index[(lat, lon)] = path
+            elif name.lower().endswith(('.tif', '.tiff')):
+                try:
+                    import tifffile
+                    with tifffile.TiffFile(path) as tif:
+                        lat_n, lon_w, lat_step, lon_step, _, (rows, cols) = _geotiff_georef(tif)
+                    self.tif_index.append((lat_n - (rows - 1) * lat_step, lat_n,
+                                           lon_w, lon_w + (cols - 1) * lon_step, path))
+                except ImportError:
+                    print(f"[Terrain] ⚠️ tifffile not installed, skipping {name}")
+                except Exception as e:
+                    print(f"[Terrain] ⚠️ Bad GeoTIFF {name}: {e}")
+        print(f"[Terrain] Indexed {len(self.hgt_index)} HGT + {len(self.tif_index)} GeoTIFF tiles")
+
+    def _tile(self, path):
+        tile = self.cache.get(path)
+        if tile is not None:
+            self.cache.move_to_end(path)
+            return tile
+        tile = open_hgt(path) if path.lower().endswith('.hgt') else open_geotiff(path)
+        self.cache[path] = tile
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False) # memmap is released with the tile
+        return tile
+
+    def elevations(self, lats, lons):
+        """Vectorized lookup. Returns float64 array, NaN where no tile / void."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        out = np.full(lats.shape, np.nan)
+
+        # GeoTIFFs first (usually higher resolution), then SRTM fills the gaps
+        for lat_s, lat_n, lon_w, lon_e, path in self.tif_index:
+            todo = np.isnan(out) & (lats >= lat_s) & (lats <= lat_n) & (lons >= lon_w) & (lons <= lon_e)
+            if todo.any():
+                out[todo] = self._tile(path).bilinear(lats[todo], lons[todo])
+
+        todo = np.isnan(out)
+        if todo.any() and self.hgt_index:
+            keys = np.stack([np.floor(lats), np.floor(lons)], axis=-1).astype(np.int64)
+            for key in np.unique(keys[todo], axis=0):
+                path = self.hgt_index.get((int(key[0]), int(key[1])))
+                if path is None:
+                    continue
+                sel = todo & (keys[..., 0] == key[0]) & (keys[..., 1] == key[1])
+                out[sel] = self._tile(path).bilinear(lats[sel], lons[sel])
+        return out
+
+    def elevation(self, lat, lon):
+        z = self.elevations([lat], [lon])[0]
+        return None if np.isnan(z) else float(z)
+
+    def relative_altitudes(self, waypoints, agl, home):
+        """
+        Per-waypoint altitude relative to HOME that keeps `agl` meters above ground.
+        waypoints: [(lat, lon)], home: (lat, lon). Falls back to plain `agl` where
+        the DEM has no data.
+        """
+        if not waypoints:
+            return []
+        lats = np.fromiter((w[0] for w in waypoints), dtype=np.float64, count=len(waypoints))
+        lons = np.fromiter((w[1] for w in waypoints), dtype=np.float64, count=len(waypoints))
+        ground = self.elevations(lats, lons)
+        home_z = self.elevation(home[0], home[1])
+        if home_z is None:
+            print("[Terrain] ⚠️ No DEM data at home. Using flat altitudes.")
+            return [float(agl)] * len(waypoints)
+        missing = int(np.isnan(ground).sum())
+        if missing:
+            print(f"[Terrain] ⚠️ No DEM data for {missing} waypoint(s). Using flat altitude there.")
+        alts = np.where(np.isnan(ground), agl, agl + ground - home_z)
+        return alts.tolist()
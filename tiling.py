@@ -0,0 +1,202 @@
+import time
+import numpy as np
+from detectors import EMPTY, IOU_THRESHOLD, MAX_DETECTIONS, MAX_WH, STRIDE
+
+# --- CONFIGURATION ---
+ROI_MARGIN = 1.0           # crop = target box grown by this many box sizes on every side
+ROI_MIN_SIZE = 96          # px (source), smallest crop side around a target
+ROI_UPSCALE = 2.0          # crop is fed at this many input px per source px (small targets get bigger)
+TILE_OVERLAP = 0.2         # fraction of a tile shared with its neighbour
+TILE_MIN_FRAME = 2.0       # tile only frames whose long side exceeds this many network input sizes
+MERGE_IOS = 0.7            # intersection / smaller box above this = same object cut by a tile edge
+
+MODE_FULL = "FULL"         # whole frame at the detector input size (search)
+MODE_ROI = "ROI"           # magnified crop around the tracked target
+MODE_TILES = "TILES"       # overlapping native-resolution tiles + a low-res full pass (large frames)
+
+
+def tile_grid(width, height, size, overlap=TILE_OVERLAP):
+    """(x0, y0, x1, y1) windows of size x size covering the frame with the given overlap; edge tiles are shifted in"""
+    def starts(length):
+        if length <= size:
+            return [0]
+        step = max(int(size * (1 - overlap)), 1)
+        n = int(np.ceil((length - size) / step)) + 1
+        return [min(i * step, length - size) for i in range(n)]
+    return [(x, y, min(x + size, width), min(y + size, height)) for y in starts(height) for x in starts(width)]
+
+def roi_window(box, frame_shape, margin=ROI_MARGIN, min_size=ROI_MIN_SIZE):
+    """Crop window (x0, y0, x1, y1) around an x1 y1 x2 y2 box, kept inside the frame"""
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = box
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    side = max((x2 - x1) * (1 + 2 * margin), (y2 - y1) * (1 + 2 * margin), min_size)
+    side = min(side, w, h)
+    x0 = int(np.clip(cx - side / 2, 0, w - side))
+    y0 = int(np.clip(cy - side / 2, 0, h - side))
+    return x0, y0, x0 + int(side), y0 + int(side)
+
+def merge_detections(dets, iou=IOU_THRESHOLD, ios=MERGE_IOS, max_det=MAX_DETECTIONS):
+    """
+    Per-class greedy NMS over detections from several crops. Besides IoU, a box mostly
+    inside a better one (a person cut by a tile edge) is dropped.
+    """
+    if len(dets) == 0:
+        return EMPTY
+    dets = dets[np.argsort(-dets[:, 4], kind='stable')]
+    boxes = dets[:, :4] + (dets[:, 5] * MAX_WH)[:, None]
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = np.arange(len(dets))
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = w * h
+        over = (inter / (areas[i] + areas[rest] - inter + 1e-9) > iou) | \
+               (inter / (np.minimum(areas[i], areas[rest]) + 1e-9) > ios)
+        order = rest[~over]
+    return dets[keep]
+
+
+class TiledDetector:
+    """
+    Detector wrapper that decides per frame where the network looks (drop-in for VisionPipeline):
+      FULL  - whole frame at the detector input size: cheap search pass
+      ROI   - set_roi(box): only a crop around the tracked target, magnified ROI_UPSCALE x
+      TILES - frames much larger than the input: overlapping native-res tiles plus FULL
+    Crops of one frame go through infer_batch() together; results are merged in frame pixels.
+    """
+    def __init__(self, detector, tiles=True):
+        self.detector = detector
+        self.tiles = tiles
+        self.roi = None          # x1 y1 x2 y2 of the target, set by the control loop
+        self.mode = MODE_FULL    # mode of the last preprocessed frame
+        self.window = None       # ROI crop window of the last frame (for drawing)
+        self.input_px = 0        # network input pixels, last frame (cost proxy)
+        self.name = f"tiled-{getattr(detector, 'name', 'detector')}"
+
+    def set_roi(self, box):
+        """Target box in frame pixels, or None to go back to full-frame search"""
+        self.roi = None if box is None else tuple(float(v) for v in box)
+
+    # --- PIPELINE INTERFACE ---
+
+    def _windows(self, frame, full_size=None):
+        """[(x0, y0, x1, y1, input size or None for the detector default)]"""
+        h, w = frame.shape[:2]
+        size = full_size or self.detector.imgsz
+        roi = self.roi
+        if roi is not None:
+            x0, y0, x1, y1 = roi_window(roi, frame.shape)
+            side = int(np.ceil((x1 - x0) * ROI_UPSCALE / STRIDE) * STRIDE)
+            self.mode, self.window = MODE_ROI, (x0, y0, x1, y1)
+            return [(x0, y0, x1, y1, min(side, size))]
+        self.window = None
+        if self.tiles and max(h, w) > TILE_MIN_FRAME * size:
+            self.mode = MODE_TILES
+            return [(0, 0, w, h, full_size)] + [(*t, None) for t in tile_grid(w, h, self.detector.imgsz)]
+        self.mode = MODE_FULL
+        return [(0, 0, w, h, full_size)]
+
+    def preprocess(self, frame, size=None, slot=0):
+        """size: input side of the full-frame pass and upper bound of the ROI crop (scheduler degrade)"""
+        blobs, metas = [], []
+        for i, (x0, y0, x1, y1, crop_size) in enumerate(self._windows(frame, size)):
+            blob, meta = self.detector.preprocess(frame[y0:y1, x0:x1], crop_size, (slot, i)) # own buffers per tile
+            blobs.append(blob)
+            metas.append(((x0, y0), meta))
+        self.input_px = sum(int(np.prod(b.shape[-2:])) for b in blobs if hasattr(b, 'shape'))
+        return blobs, metas
+
+    def infer(self, blobs):
+        # Same-shape crops (the tiles) share one batched call
+        outs = [None] * len(blobs)
+        groups = {}
+        for i, b in enumerate(blobs):
+            groups.setdefault(getattr(b, 'shape', i), []).append(i)
+        for idx in groups.values():
+            for i, out in zip(idx, self.detector.infer_batch([blobs[i] for i in idx])):
+                outs[i] = out
+        return outs
+
+    def postprocess(self, outs, metas):
+        parts = []
+        for out, ((x0, y0), meta) in zip(outs, metas):
+            dets = self.detector.postprocess(out, meta)
+            if len(dets):
+                dets = dets.copy()
+                dets[:, [0, 2]] += x0
+                dets[:, [1, 3]] += y0
+                parts.append(dets)
+        if not parts:
+            return EMPTY
+        if len(parts) == 1:
+            return parts[0]
+        return merge_detections(np.concatenate(parts), self.detector.iou)
+
+    def detect(self, frame):
+        blobs, metas = self.preprocess(frame)
+        return self.postprocess(self.infer(blobs), metas)
+
+    def warmup(self, shape=(240, 320, 3), runs=2):
+        self.detector.warmup(shape, runs)
+
+    def close(self):
+        if hasattr(self.detector, 'close'):
+            self.detector.close()
+
+
+# --- BENCHMARK ---
+
+class _CostDetector:
+    """Stand-in network: cost proportional to input pixels (1 ms per 320x320), finds nothing"""
+    name = "cost"
+    imgsz = 320
+    iou = IOU_THRESHOLD
+
+    def preprocess(self, frame, size=None, slot=0):
+        from detectors import letterbox, to_blob
+        img, scale, pad = letterbox(frame, size or self.imgsz)
+        return to_blob(img), (scale, pad, frame.shape)
+
+    def infer_batch(self, blobs):
+        for b in blobs:
+            time.sleep(b.shape[1] * b.shape[2] / (320 * 320) * 0.001)
+        return [None] * len(blobs)
+
+    def postprocess(self, out, meta):
+        return EMPTY
+
+
+def benchmark(runs=20):
+    """Network input pixels and time per frame for each mode, plus a tile-edge merge check"""
+    det = _CostDetector()
+    tiled = TiledDetector(det)
+    cases = [("320x240 search", (240, 320), None),
+             ("320x240 target 8x16 px", (240, 320), (150, 110, 158, 126)),
+             ("1280x960 search", (960, 1280), None),
+             ("1280x960 target 24x48 px", (960, 1280), (600, 400, 624, 448))]
+    print(f"{'case':<26} {'mode':<6} {'crops':>5} {'input px':>9} {'target px/src px':>17} {'ms':>6}")
+    for label, shape, roi in cases:
+        frame = np.zeros((*shape, 3), dtype=np.uint8)
+        tiled.set_roi(roi)
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            blobs, metas = tiled.preprocess(frame)
+            tiled.postprocess(tiled.infer(blobs), metas)
+        ms = (time.perf_counter() - t0) / runs * 1000
+        magnification = metas[0][1][0] if tiled.mode == MODE_ROI else max(m[1][0] for m in metas)
+        print(f"{label:<26} {tiled.mode:<6} {len(blobs):>5} {tiled.input_px:>9} {magnification:>17.2f} {ms:>6.1f}")
+
+    # A person across a tile edge: whole box from one tile, cut-off part from its neighbour
+    dets = np.array([[300, 100, 330, 180, 0.9, 0], [300, 100, 320, 180, 0.6, 0], [500, 100, 530, 180, 0.8, 0]],
+                    dtype=np.float32)
+    print(f"tile-edge merge: {len(dets)} boxes -> {len(merge_detections(dets))} (expected 2)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,250 @@
+import itertools
+import numpy as np
+import cv2
+from detectors import box_iou
+
+# --- CONFIGURATION ---
+HIGH_CONF = 0.5            # detections that can start or confirm a track
+LOW_CONF = 0.1             # weaker detections only keep existing tracks alive (ByteTrack 2nd pass)
+MATCH_IOU = 0.3            # min IoU between a predicted track box and a detection
+LOW_MATCH_IOU = 0.5        # stricter for the low-confidence pass
+MIN_HITS = 2               # detections before a new track is confirmed
+MAX_LOST_S = 1.5           # s a track may coast (Kalman + flow) without a detection
+FLOW_POINTS = 20           # corners tracked inside each box between detector frames
+FLOW_MIN_POINTS = 4        # fewer good points -> no flow measurement, predict only
+
+# Kalman noise (pixels / pixels per second)
+POS_NOISE = 10.0           # process noise on box centre and size
+VEL_NOISE = 40.0
+DET_NOISE = 4.0            # measurement noise of a detector box
+FLOW_NOISE = 10.0          # optical flow is a weaker measurement
+
+TENTATIVE = "TENTATIVE"
+TRACKED = "TRACKED"
+LOST = "LOST"
+
+_ids = itertools.count(1)
+
+
+def _xyxy_to_z(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+
+def _z_to_xyxy(z):
+    cx, cy, w, h = z[:4]
+    return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    """One target: constant-velocity Kalman filter on (cx, cy, w, h)"""
+    def __init__(self, det, timestamp):
+        self.id = next(_ids)
+        self.cls = int(det[5])
+        self.score = float(det[4])
+        self.state = TENTATIVE
+        self.hits = 1
+        self.last_seen = timestamp  # last detector match
+        self.timestamp = timestamp  # time the filter state refers to
+        self.x = np.zeros(8)
+        self.x[:4] = _xyxy_to_z(det[:4])
+        self.P = np.diag([DET_NOISE ** 2] * 4 + [VEL_NOISE ** 2] * 4)
+
+    @property
+    def box(self):
+        return _z_to_xyxy(self.x)
+
+    @property
+    def center(self):
+        return float(self.x[0]), float(self.x[1])
+
+    @property
+    def velocity(self):
+        return float(self.x[4]), float(self.x[5])
+
+    def predict(self, timestamp):
+        dt = max(timestamp - self.timestamp, 0.0)
+        if dt == 0:
+            return
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        Q = np.diag([(POS_NOISE * dt) ** 2] * 4 + [(VEL_NOISE * dt) ** 2] * 4)
+        self.x = F @ self.x
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0) # no negative sizes
+        self.P = F @ self.P @ F.T + Q
+        self.timestamp = timestamp
+
+    def correct(self, box, noise):
+        H = np.eye(4, 8)
+        R = np.eye(4) * noise ** 2
+        y = _xyxy_to_z(box) - H @ self.x
+        S = H @ self.P @ H.T + R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ H) @ self.P
+
+    def update(self, det, timestamp):
+        self.correct(det[:4], DET_NOISE)
+        self.score = float(det[4])
+        self.hits += 1
+        self.last_seen = timestamp
+        if self.state == LOST or (self.state == TENTATIVE and self.hits >= MIN_HITS):
+            self.state = TRACKED
+
+
+def _greedy_match(iou, threshold):
+    """Highest-IoU-first one-to-one matching. Returns [(row, col)]."""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    iou = iou.copy()
+    while True:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        if iou[r, c] < threshold:
+            return pairs
+        pairs.append((int(r), int(c)))
+        iou[r, :] = -1
+        iou[:, c] = -1
+
+
+class Tracker:
+    """
+    ByteTrack-style multi-object tracker with stable IDs.
+    update() runs on detector frames: predict every track to the frame time, match
+    high-confidence boxes first, then let low-confidence boxes rescue the leftovers.
+    propagate() runs on the frames in between: Kalman prediction corrected by
+    Lucas-Kanade optical flow inside each box, so the detector can skip frames.
+    """
+    def __init__(self, classes=None):
+        self.classes = classes  # only track these class ids (None = all)
+        self.tracks = []
+        self.prev_gray = None
+        self.frames = 0
+        self.detector_frames = 0
+
+    # --- QUERIES ---
+
+    def active(self):
+        """Confirmed tracks (currently tracked or briefly coasting)"""
+        return [t for t in self.tracks if t.state != TENTATIVE]
+
+    def get(self, track_id):
+        for t in self.tracks:
+            if t.id == track_id and t.state != TENTATIVE:
+                return t
+        return None
+
+    def has_tracks(self):
+        return any(t.state != TENTATIVE for t in self.tracks)
+
+    # --- DETECTOR FRAMES ---
+
+    def update(self, detections, timestamp, frame=None):
+        """detections: (N, 6) x1 y1 x2 y2 conf cls. Returns active tracks."""
+        self.frames += 1
+        self.detector_frames += 1
+        dets = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        if self.classes is not None and len(dets):
+            dets = dets[np.isin(dets[:, 5].astype(int), self.classes)]
+        for t in self.tracks:
+            t.predict(timestamp)
+
+        high = dets[dets[:, 4] >= HIGH_CONF]
+        low = dets[(dets[:, 4] >= LOW_CONF) & (dets[:, 4] < HIGH_CONF)]
+
+        # 1. High-confidence detections against every track
+        pool = list(self.tracks)
+        unmatched = set(range(len(high)))
+        if pool and len(high):
+            boxes = np.array([t.box for t in pool])
+            matched = set()
+            for r, c in _greedy_match(box_iou(boxes, high[:, :4]), MATCH_IOU):
+                pool[r].update(high[c], timestamp)
+                unmatched.discard(c)
+                matched.add(r)
+            pool = [t for i, t in enumerate(pool) if i not in matched]
+
+        # 2. Low-confidence detections keep confirmed tracks alive (occlusion, blur)
+        confirmed = [t for t in pool if t.state != TENTATIVE]
+        if confirmed and len(low):
+            boxes = np.array([t.box for t in confirmed])
+            for r, c in _greedy_match(box_iou(boxes, low[:, :4]), LOW_MATCH_IOU):
+                confirmed[r].update(low[c], timestamp)
+                pool.remove(confirmed[r])
+
+        # 3. Leftover tracks coast or die, leftover strong detections start tracks
+        for t in pool:
+            if t.state == TRACKED:
+                t.state = LOST
+        self.tracks = [t for t in self.tracks
+                       if not (t.state == TENTATIVE and t.last_seen < timestamp)
+                       and timestamp - t.last_seen <= MAX_LOST_S]
+        for c in sorted(unmatched):
+            self.tracks.append(Track(high[c], timestamp))
+
+        if frame is not None:
+            self.prev_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self.active()
+
+    # --- FRAMES WITHOUT DETECTOR ---
+
+    def propagate(self, frame, timestamp):
+        """Moves every track with optical flow (falls back to the motion model). Returns active tracks."""
+        self.frames += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        for t in self.tracks:
+            before = t.box
+            t.predict(timestamp)
+            if self.prev_gray is None:
+                continue
+            x1, y1, x2, y2 = np.clip(before, 0, [w, h, w, h]).astype(int)
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                continue
+            p0 = cv2.goodFeaturesToTrack(self.prev_gray[y1:y2, x1:x2], FLOW_POINTS, 0.01, 3) # corners in the box only
+            if p0 is None or len(p0) < FLOW_MIN_POINTS:
+                continue
+            p0 = p0 + np.array([x1, y1], dtype=np.float32)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, p0, None, winSize=(15, 15), maxLevel=2)
+            good = status.reshape(-1) == 1
+            if good.sum() < FLOW_MIN_POINTS:
+                continue
+            dx, dy = np.median((p1 - p0).reshape(-1, 2)[good], axis=0)
+            t.correct(before + np.array([dx, dy, dx, dy]), FLOW_NOISE)
+        self.tracks = [t for t in self.tracks if timestamp - t.last_seen <= MAX_LOST_S]
+        self.prev_gray = gray
+        return self.active()
+
+
+# --- BENCHMARK ---
+
+def benchmark(tracks=5, frames=300, size=(240, 320)):
+    """Per-frame cost of update() and propagate() with N people walking across a textured scene"""
+    import time
+    rng = np.random.default_rng(0)
+    h, w = size
+    background = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    patch = rng.integers(0, 255, (56, 24, 3), dtype=np.uint8)
+    start = rng.uniform([20, 40], [w - 60, h - 80], (tracks, 2))
+    speed = rng.uniform(-20, 20, (tracks, 2))
+    tracker = Tracker()
+    t_update, t_flow = [], []
+    for i in range(frames):
+        ts = i / 15.0
+        frame = background.copy()
+        dets = []
+        for (x, y) in np.clip(start + speed * ts, 0, [w - 24, h - 56]).astype(int):
+            frame[y:y + 56, x:x + 24] = patch
+            dets.append((x, y, x + 24, y + 56, 0.9, 0))
+        t0 = time.perf_counter()
+        if i % 3 == 0:
+            tracker.update(np.array(dets), ts, frame)
+            t_update.append(time.perf_counter() - t0)
+        else:
+            tracker.propagate(frame, ts)
+            t_flow.append(time.perf_counter() - t0)
+    print(f"{tracks} tracks, {w}x{h}: update {np.mean(t_update) * 1000:.2f} ms, "
+          f"propagate {np.mean(t_flow) * 1000:.2f} ms, ids {sorted(t.id for t in tracker.active())}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,306 @@
+import queue
+import threading
+import time
+from collections import deque
+from clock import get_clock
+from frame_scheduler import FrameScheduler, DETECT, TRACK, SKIP
+
+# --- CONFIGURATION ---
+QUEUE_SIZE = 1             # items waiting between stages; older ones are dropped, never queued up
+STATS_WINDOW = 100         # samples per stage kept for the timing percentiles
+GET_TIMEOUT = 0.5          # s, workers wake up this often to notice stop()
+PREP_SLOTS = QUEUE_SIZE + 2 # blob buffers in flight: waiting for infer, being inferred, being written
+
+STAGES = ("preprocess", "infer", "postprocess", "render")
+
+
+class DropQueue(queue.Queue):
+    """Bounded queue that replaces the oldest item when full (stale work is dropped)"""
+    def __init__(self, maxsize=QUEUE_SIZE, on_drop=None):
+        super().__init__(maxsize)
+        self.dropped = 0
+        self.on_drop = on_drop # callback(item) for a dropped item (frees what it holds)
+
+    def put_latest(self, item):
+        while True:
+            try:
+                self.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    old = self.get_nowait()
+                    self.dropped += 1
+                    if self.on_drop:
+                        self.on_drop(old)
+                except queue.Empty:
+                    pass
+
+
+class StageStats:
+    """Busy time per item of one stage, over a sliding window"""
+    def __init__(self):
+        self.samples = deque(maxlen=STATS_WINDOW)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'count': self.count, 'mean_ms': 0.0, 'p95_ms': 0.0}
+        s = sorted(self.samples)
+        return {'count': self.count,
+                'mean_ms': sum(s) / len(s) * 1000,
+                'p95_ms': s[min(int(len(s) * 0.95), len(s) - 1)] * 1000}
+
+
+class VisionPipeline:
+    """
+    capture -> preprocess -> infer -> postprocess (+ control) -> render, one worker each.
+
+    Capture is the FrameGrabber thread. Every hop is a DropQueue of size QUEUE_SIZE, so
+    while frame N is in inference frame N+1 is already being preprocessed, and a slow
+    stage drops frames instead of delaying the ones behind it. Blobs live in the
+    detector's reused buffers (preprocess.py): each frame leases one of PREP_SLOTS
+    buffer slots and gives it back once inferred or dropped, so a blob is never
+    rewritten while it is still queued or in inference. The control callback runs
+    right after postprocess, before any drawing: rendering can never hold up a decision.
+
+        on_detections(frame, detections, captured)  - control decision (postprocess thread)
+        on_render(frame, detections, captured)      - drawing / GUI hand-off (render thread)
+
+    A FrameScheduler decides per frame: DETECT, TRACK (tracker-only: the frame skips the
+    detector and reaches the callbacks with detections=None) or SKIP. With detect_every
+    = N > 1 only every Nth frame is a DETECT. Tracker-only frames are held back while a
+    detection is in flight so results stay in order. The default scheduler only counts
+    deadline misses; pass an adaptive one to hold the deadline (frame_scheduler.py).
+    """
+    def __init__(self, grabber, detector, on_detections, on_render=None, clock=None, scheduler=None):
+        self.grabber = grabber
+        self.detector = detector
+        self.on_detections = on_detections
+        self.on_render = on_render
+        self.clock = clock or get_clock()
+        self.running = False
+        self.threads = []
+        self.queues = {name: DropQueue() for name in ("infer", "postprocess", "render")}
+        self.queues["infer"].on_drop = lambda item: self._release(item[2])
+        self._free_slots = queue.Queue()
+        for slot in range(PREP_SLOTS):
+            self._free_slots.put_nowait(slot)
+        self.stats = {name: StageStats() for name in STAGES}
+        self.latency = StageStats()  # capture -> control decision
+        self.errors = 0
+        self.scheduler = scheduler or FrameScheduler(adaptive=False, clock=self.clock)
+        self.tracker_frames = 0      # frames that skipped the detector
+        self._in_flight = threading.Event() # a detector frame is between preprocess and control
+
+    @property
+    def detect_every(self):
+        return self.scheduler.detect_every
+
+    @detect_every.setter
+    def detect_every(self, n):
+        self.scheduler.detect_every = n # run the detector on every Nth frame (see docstring)
+
+    # --- LIFECYCLE ---
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        workers = [self._preprocess_worker, self._infer_worker, self._postprocess_worker]
+        if self.on_render:
+            workers.append(self._render_worker)
+        for fn in workers:
+            t = threading.Thread(target=fn, daemon=True, name=fn.__name__.strip('_'))
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.running = False
+        for t in self.threads:
+            if t is not threading.current_thread():
+                t.join(timeout=2.0)
+        self.threads = []
+
+    # --- WORKERS ---
+
+    def _run(self, stage, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception as e:
+            self.errors += 1
+            print(f"[Pipeline] 💥 {stage} error: {e}")
+            return None
+        finally:
+            self.stats[stage].add(time.perf_counter() - t0)
+
+    def _take(self, name):
+        try:
+            return self.queues[name].get(timeout=GET_TIMEOUT)
+        except queue.Empty:
+            return None
+
+    def _release(self, slot):
+        self._free_slots.put_nowait(slot) # its blob may be rewritten from now on
+
+    def _preprocess_worker(self):
+        seq = 0
+        while self.running:
+            frame, captured, seq = self.grabber.read(seq, timeout=GET_TIMEOUT)
+            if frame is None:
+                continue
+            # A tracker-only frame must not overtake a detection still in flight
+            action, size = self.scheduler.decide(captured, busy=self._in_flight.is_set())
+            if action == SKIP:
+                continue
+            if action == TRACK:
+                self.tracker_frames += 1
+                self.queues["postprocess"].put_latest((frame, captured, None, None))
+                continue
+            try: # one slot is always free: at most one blob queued and one in inference
+                slot = self._free_slots.get(timeout=GET_TIMEOUT)
+            except queue.Empty:
+                continue
+            self._in_flight.set()
+            prepared = self._run("preprocess", self.detector.preprocess, frame, size, slot)
+            if prepared is not None:
+                self.queues["infer"].put_latest((frame, captured, slot, prepared))
+            else:
+                self._release(slot)
+                self._in_flight.clear()
+
+    def _infer_worker(self):
+        while self.running:
+            item = self._take("infer")
+            if item is None:
+                continue
+            frame, captured, slot, (blob, meta) = item
+            out = self._run("infer", self.detector.infer, blob)
+            self._release(slot)
+            if out is not None:
+                self.queues["postprocess"].put_latest((frame, captured, out, meta))
+            else:
+                self._in_flight.clear()
+
+    def _postprocess_worker(self):
+        while self.running:
+            item = self._take("postprocess")
+            if item is None:
+                continue
+            frame, captured, out, meta = item
+            detections = None
+            if out is not None: # None: tracker-only frame
+                detections = self._run("postprocess", self.detector.postprocess, out, meta)
+                if detections is None:
+                    self._in_flight.clear()
+                    continue
+            # Decide first, draw later
+            try:
+                self.on_detections(frame, detections, captured)
+            except Exception as e:
+                self.errors += 1
+                print(f"[Pipeline] 💥 control error: {e}")
+            if out is not None:
+                self._in_flight.clear()
+            decided = self.clock.time()
+            self.latency.add(decided - captured)
+            self.scheduler.record(TRACK if out is None else DETECT, captured, decided)
+            if self.on_render:
+                self.queues["render"].put_latest((frame, detections, captured))
+
+    def _render_worker(self):
+        while self.running:
+            item = self._take("render")
+            if item is None:
+                continue
+            self._run("render", self.on_render, *item)
+
+    # --- STATS ---
+
+    def get_stats(self):
+        """Per-stage timing and drops, plus capture -> decision latency"""
+        out = {name: st.summary() for name, st in self.stats.items()}
+        for name, q in self.queues.items():
+            out[name]['dropped'] = q.dropped # dropped while waiting for this stage
+        out['capture'] = {'count': self.grabber.grabbed, 'dropped': self.grabber.dropped}
+        out['tracker_frames'] = self.tracker_frames
+        out['scheduler'] = self.scheduler.get_stats()
+        out['latency'] = self.latency.summary()
+        return out
+
+    def format_stats(self):
+        s = self.get_stats()
+        parts = [f"{name} {s[name]['mean_ms']:.1f}ms" for name in STAGES if s[name]['count']]
+        if self.tracker_frames:
+            parts.append(f"tracker-only frames {self.tracker_frames}")
+        return (" | ".join(parts) + f" | decision latency {s['latency']['mean_ms']:.0f}ms (p95 {s['latency']['p95_ms']:.0f})"
+                f" | {self.scheduler.format_stats()}")
+
+
+# --- BENCHMARK ---
+
+class _SleepDetector:
+    """Stage costs as sleeps (C extensions release the GIL the same way)"""
+    def __init__(self, pre, infer, post):
+        self.cost = (pre, infer, post)
+
+    def preprocess(self, frame, size=None, slot=0):
+        time.sleep(self.cost[0])
+        return frame, None
+
+    def infer(self, blob):
+        time.sleep(self.cost[1])
+        return blob
+
+    def postprocess(self, out, meta):
+        time.sleep(self.cost[2])
+        return []
+
+
+def benchmark(duration=3.0, fps=30.0, pre=0.010, infer=0.040, post=0.005, render=0.015):
+    """Decisions per second and capture -> decision latency: serial loop vs pipeline"""
+    from frame_grabber import FrameGrabber, _BufferedStream
+    print(f"stream {fps:.0f} fps; stages pre {pre * 1000:.0f} / infer {infer * 1000:.0f} / "
+          f"post {post * 1000:.0f} / render {render * 1000:.0f} ms")
+    det = _SleepDetector(pre, infer, post)
+
+    def report(label, lat, n):
+        lat = sorted(lat)
+        print(f"  {label:<9} {n / duration:6.1f} decisions/s  latency p50 {lat[len(lat) // 2] * 1000:6.1f} ms"
+              f"  p95 {lat[int(len(lat) * 0.95)] * 1000:6.1f} ms")
+
+    # 1. Serial: newest frame, then every step on one thread (the old AIPilot loop)
+    grabber = FrameGrabber("synthetic", opener=lambda src: _BufferedStream(fps))
+    grabber.start()
+    lat = []
+    seq = 0
+    end = time.time() + duration
+    while time.time() < end:
+        frame, captured, seq = grabber.read(seq)
+        if frame is None:
+            continue
+        blob, meta = det.preprocess(frame)
+        det.postprocess(det.infer(blob), meta)
+        lat.append(time.time() - captured)
+        time.sleep(render)
+    grabber.stop()
+    report("serial", lat, len(lat))
+
+    # 2. Pipelined
+    grabber = FrameGrabber("synthetic", opener=lambda src: _BufferedStream(fps))
+    grabber.start()
+    pipe = VisionPipeline(grabber, det, lambda f, d, c: None, lambda f, d, c: time.sleep(render))
+    pipe.start()
+    time.sleep(duration)
+    pipe.stop()
+    grabber.stop()
+    report("pipeline", list(pipe.latency.samples), pipe.latency.count)
+    print(f"  stages: {pipe.format_stats()}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,328 @@
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+NO_ALT = float('nan')   # Waypoint uses the mission altitude
+NO_SPEED = float('nan') # Waypoint keeps the current speed
+
+# Per-waypoint action on arrival (guided missions)
+ACTION_NONE = 0
+ACTION_DROP = 1         # Trigger the next payload drop
+ACTION_HOVER = 2        # Hold here until resume_mission()
+
+MAX_UNDO = 200          # Undo steps kept per drone
+INITIAL_CAPACITY = 64
+
+COLUMNS = ('lat', 'lon', 'alt', 'speed', 'action')
+_DTYPES = {'lat': np.float64, 'lon': np.float64, 'alt': np.float64, 'speed': np.float64, 'action': np.int16}
+_DEFAULTS = {'alt': NO_ALT, 'speed': NO_SPEED, 'action': ACTION_NONE}
+
+
+class WaypointStore:
+    """
+    Columnar waypoint list backed by growable NumPy arrays (lat, lon, alt, speed, action).
+    Behaves like the old list of (lat, lon) tuples (len, index, iterate, append, pop,
+    item assignment) so existing code keeps working.
+
+    Every edit is recorded as a small inverse operation, so undo/redo costs the same
+    as the edit itself (no snapshots). Listeners get fine-grained change events:
+        callback(store, event, index, count)
+        event: 'inserted' | 'removed' | 'moved' (lat/lon) | 'updated' (alt/speed/action)
+    """
+    def __init__(self, points=None):
+        self._n = 0
+        self._cols = {c: np.empty(INITIAL_CAPACITY, dtype=_DTYPES[c]) for c in COLUMNS}
+        self._undo = deque(maxlen=MAX_UNDO)
+        self._redo = []
+        self._group = None  # list of ops while inside transaction()
+        self.listeners = []
+        if points:
+            lats, lons = zip(*((p[0], p[1]) for p in points))
+            self.extend_columns(lats, lons, record=False)
+
+    # --- COLUMN VIEWS (read-only, edits must go through the methods) ---
+
+    def _view(self, name):
+        v = self._cols[name][:self._n]
+        v.flags.writeable = False
+        return v
+
+    lat = property(lambda self: self._view('lat'))
+    lon = property(lambda self: self._view('lon'))
+    alt = property(lambda self: self._view('alt'))
+    speed = property(lambda self: self._view('speed'))
+    action = property(lambda self: self._view('action'))
+
+    # --- SEQUENCE PROTOCOL ---
+
+    def __len__(self):
+        return self._n
+
+    def __bool__(self):
+        return self._n > 0
+
+    def _index(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("waypoint index out of range")
+        return i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(zip(self._cols['lat'][:self._n][i].tolist(), self._cols['lon'][:self._n][i].tolist()))
+        i = self._index(i)
+        return (float(self._cols['lat'][i]), float(self._cols['lon'][i]))
+
+    def __setitem__(self, i, point):
+        self.set_point(i, *point)
+
+    def __iter__(self):
+        return zip(self._cols['lat'][:self._n].tolist(), self._cols['lon'][:self._n].tolist())
+
+    def __repr__(self):
+        return f"WaypointStore({self._n} points)"
+
+    def row(self, i):
+        """(lat, lon, alt, speed, action) of waypoint i"""
+        i = self._index(i)
+        return tuple(self._cols[c][i].item() for c in COLUMNS)
+
+    # --- EVENTS ---
+
+    def add_listener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _emit(self, event, index, count=1):
+        for cb in list(self.listeners):
+            try:
+                cb(self, event, index, count)
+            except Exception as e:
+                print(f"[Waypoints] Listener error ({event}): {e}")
+
+    # --- RAW EDITS (no op-log) ---
+
+    def _reserve(self, n):
+        cap = len(self._cols['lat'])
+        if n <= cap:
+            return
+        while cap < n:
+            cap *= 2
+        for c in COLUMNS:
+            grown = np.empty(cap, dtype=_DTYPES[c])
+            grown[:self._n] = self._cols[c][:self._n]
+            self._cols[c] = grown
+
+    def _insert_rows(self, i, cols):
+        k = len(cols['lat'])
+        self._reserve(self._n + k)
+        for c in COLUMNS:
+            a = self._cols[c]
+            a[i + k:self._n + k] = a[i:self._n] # overlapping move is safe in NumPy
+            a[i:i + k] = cols[c]
+        self._n += k
+        self._emit('inserted', i, k)
+
+    def _remove_rows(self, i, k):
+        removed = {c: self._cols[c][i:i + k].copy() for c in COLUMNS}
+        for c in COLUMNS:
+            a = self._cols[c]
+            a[i:self._n - k] = a[i + k:self._n]
+        self._n -= k
+        self._emit('removed', i, k)
+        return removed
+
+    def _set_row(self, i, values):
+        moved = (values['lat'] != self._cols['lat'][i]) or (values['lon'] != self._cols['lon'][i])
+        for c, v in values.items():
+            self._cols[c][i] = v
+        self._emit('moved' if moved else 'updated', i)
+
+    # --- OP-LOG ---
+    # op = (kind, index, payload). Inverse: insert <-> remove, set <-> set(old)
+
+    def _record(self, op):
+        if self._group is not None:
+            self._group.append(op)
+        else:
+            self._undo.append(op)
+            self._redo.clear()
+
+    def _apply(self, op, reverse):
+        kind, i, payload = op
+        if kind == 'group':
+            for sub in (reversed(payload) if reverse else payload):
+                self._apply(sub, reverse)
+        elif kind == 'insert':
+            if reverse:
+                self._remove_rows(i, len(payload['lat']))
+            else:
+                self._insert_rows(i, payload)
+        elif kind == 'remove':
+            if reverse:
+                self._insert_rows(i, payload)
+            else:
+                self._remove_rows(i, len(payload['lat']))
+        elif kind == 'set':
+            old, new = payload
+            self._set_row(i, old if reverse else new)
+
+    def undo(self):
+        if not self._undo:
+            return False
+        op = self._undo.pop()
+        self._apply(op, reverse=True)
+        self._redo.append(op)
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        op = self._redo.pop()
+        self._apply(op, reverse=False)
+        self._undo.append(op)
+        return True
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    @contextmanager
+    def transaction(self):
+        """Groups the edits inside into one undo step"""
+        if self._group is not None: # nested: join the outer group
+            yield
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            ops, self._group = self._group, None
+            if ops:
+                self._record(('group', 0, ops) if len(ops) > 1 else ops[0])
+
+    # --- PUBLIC EDITS ---
+
+    @staticmethod
+    def _row_cols(lat, lon, alt=None, speed=None, action=None):
+        return {'lat': [lat], 'lon': [lon],
+                'alt': [NO_ALT if alt is None else alt],
+                'speed': [NO_SPEED if speed is None else speed],
+                'action': [ACTION_NONE if action is None else action]}
+
+    def insert(self, i, point):
+        i = max(0, min(i if i >= 0 else i + self._n, self._n))
+        cols = self._row_cols(*point)
+        self._insert_rows(i, cols)
+        self._record(('insert', i, cols))
+
+    def append(self, point):
+        self.insert(self._n, point)
+
+    def pop(self, i=-1):
+        i = self._index(i)
+        removed = self._remove_rows(i, 1)
+        self._record(('remove', i, removed))
+        return (float(removed['lat'][0]), float(removed['lon'][0]))
+
+    def set_point(self, i, lat, lon, alt=None, speed=None, action=None):
+        """Moves waypoint i. alt/speed/action are left as they are unless given."""
+        i = self._index(i)
+        old = {c: self._cols[c][i].item() for c in COLUMNS}
+        new = dict(old, lat=lat, lon=lon)
+        for c, v in (('alt', alt), ('speed', speed), ('action', action)):
+            if v is not None:
+                new[c] = v
+        self._set_row(i, new)
+        self._record(('set', i, (old, new)))
+
+    def set_attr(self, i, **attrs):
+        """set_attr(i, alt=.., speed=.., action=..) without moving the point"""
+        i = self._index(i)
+        self.set_point(i, self._cols['lat'][i].item(), self._cols['lon'][i].item(), **attrs)
+
+    def clear(self):
+        if self._n == 0:
+            return
+        removed = self._remove_rows(0, self._n)
+        self._record(('remove', 0, removed))
+
+    def extend_columns(self, lats, lons, alts=None, speeds=None, actions=None, record=True):
+        """Bulk append from equal-length sequences (one event, one undo step)"""
+        cols = {'lat': np.asarray(lats, dtype=np.float64), 'lon': np.asarray(lons, dtype=np.float64)}
+        k = len(cols['lat'])
+        for c, v in (('alt', alts), ('speed', speeds), ('action', actions)):
+            cols[c] = np.full(k, _DEFAULTS[c], dtype=_DTYPES[c]) if v is None else np.asarray(v, dtype=_DTYPES[c])
+        if any(len(v) != k for v in cols.values()):
+            raise ValueError("waypoint columns differ in length")
+        if k == 0:
+            return
+        i = self._n
+        self._insert_rows(i, cols)
+        if record:
+            self._record(('insert', i, cols))
+
+    def replace(self, points):
+        """Clear + load [(lat, lon)] as a single undo step"""
+        pts = list(points)
+        with self.transaction():
+            self.clear()
+            if pts:
+                lats, lons = zip(*((p[0], p[1]) for p in pts))
+                self.extend_columns(lats, lons)
+
+    # --- QUERIES ---
+
+    def altitudes(self, default):
+        """Per-waypoint altitude, stored value or `default` where unset"""
+        a = self._cols['alt'][:self._n]
+        return np.where(np.isnan(a), default, a).tolist()
+
+    def has_altitudes(self):
+        return bool(self._n) and not np.isnan(self._cols['alt'][:self._n]).all()
+
+
+# --- BENCHMARK ---
+
+def benchmark(sizes=(100, 1000, 10000), edits=MAX_UNDO):
+    """Per-edit and per-undo cost vs mission size (snapshot undo would grow linearly).
+    Half appends, half moves, then everything undone and redone."""
+    import time
+    import random
+    rng = random.Random(1)
+    print(f"{'wps':>7} {'edit us':>8} {'undo us':>8} {'redo us':>8} {'snapshot us':>12}")
+    for n in sizes:
+        s = WaypointStore()
+        s.extend_columns([12.97] * n, [77.59] * n)
+        t0 = time.perf_counter()
+        for k in range(edits // 2):
+            s.append((12.97, 77.59 + k * 1e-6))
+        for k in range(edits // 2):
+            s.set_point(rng.randrange(len(s)), 12.98, 77.6)
+        t_edit = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for k in range(edits):
+            s.undo()
+        t_undo = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for k in range(edits):
+            s.redo()
+        t_redo = time.perf_counter() - t0
+        snapshot = list(s) # what a copy-the-list undo would pay per edit
+        t0 = time.perf_counter()
+        for k in range(100):
+            list(snapshot)
+        t_snap = (time.perf_counter() - t0) / 100
+        us = 1e6 / edits
+        print(f"{n:>7} {t_edit * us:>8.1f} {t_undo * us:>8.1f} {t_redo * us:>8.1f} {t_snap * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()